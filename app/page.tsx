@@ -15,23 +15,52 @@ export default async function Home() {
     if (!url || !key) return [];
 
     const select =
-      "id,name,is_mobile,adresse,bezirk,typ,lat,lng,kaeltehilfe_capacity_status,kaeltehilfe_capacity_status_men,kaeltehilfe_capacity_status_women,kaeltehilfe_capacity_status_diverse,kaeltehilfe_capacity_url,kaeltehilfe_capacity_checked_at,kaeltehilfe_capacity_updated_at,telefon,email,website,oeffnung_von,oeffnung_bis,letzter_einlass,bietet_dusche,bietet_essen,bietet_betreuung,bietet_kleidung,bietet_medizin,behindertengerecht";
+      "id,name,is_mobile,adresse,bezirk,typ,lat,lng,kaeltehilfe_capacity_status,kaeltehilfe_capacity_status_men,kaeltehilfe_capacity_status_women,kaeltehilfe_capacity_status_diverse,kaeltehilfe_capacity_url,kaeltehilfe_capacity_updated_at,telefon,email,website,oeffnung_von,oeffnung_bis,letzter_einlass,bietet_dusche,bietet_essen,bietet_betreuung,bietet_kleidung,bietet_medizin,behindertengerecht";
 
     const params = new URLSearchParams({
       select,
       order: "name.asc",
     });
 
-    const res = await fetch(`${url}/rest/v1/unterkuenfte?${params.toString()}`, {
-      headers: {
-        apikey: key,
-        Authorization: `Bearer ${key}`,
-      },
-      next: { revalidate: 60 },
+    // Scrape freshness is stored per run/source (one row per run), not on every shelter row.
+    const freshnessParams = new URLSearchParams({
+      select: "source,checked_at",
+      source: "like.kaeltehilfe:*",
     });
 
+    const headers = {
+      apikey: key,
+      Authorization: `Bearer ${key}`,
+    };
+
+    const [res, freshnessRes] = await Promise.all([
+      fetch(`${url}/rest/v1/unterkuenfte?${params.toString()}`, {
+        headers,
+        next: { revalidate: 60 },
+      }),
+      fetch(`${url}/rest/v1/scrape_source_freshness?${freshnessParams.toString()}`, {
+        headers,
+        next: { revalidate: 60 },
+      }),
+    ]);
+
     if (!res.ok) return [];
-    return (await res.json()) as UnterkunftForMap[];
+    const rows = (await res.json()) as Omit<UnterkunftForMap, "kaeltehilfe_capacity_checked_at">[];
+
+    const checkedAtBySource = new Map<string, string | null>();
+    if (freshnessRes.ok) {
+      const freshness = (await freshnessRes.json()) as { source: string; checked_at: string | null }[];
+      for (const f of freshness) checkedAtBySource.set(f.source, f.checked_at);
+    }
+
+    return rows.map((u) => ({
+      ...u,
+      // Only rows the scraper matched (they have a Kaeltehilfe URL) were checked by the run.
+      kaeltehilfe_capacity_checked_at:
+        u.kaeltehilfe_capacity_url && u.typ
+          ? checkedAtBySource.get(`kaeltehilfe:${u.typ}`) ?? null
+          : null,
+    })) satisfies UnterkunftForMap[];
   })();
 
   return (
@@ -29,7 +29,6 @@ export type UnterkunftForMap = Pick<
   | "kaeltehilfe_capacity_status_women"
   | "kaeltehilfe_capacity_status_diverse"
   | "kaeltehilfe_capacity_url"
-  | "kaeltehilfe_capacity_checked_at"
   | "kaeltehilfe_capacity_updated_at"
   | "telefon"
   | "email"
@@ -43,7 +42,11 @@ export type UnterkunftForMap = Pick<
   | "bietet_kleidung"
   | "bietet_medizin"
   | "behindertengerecht"
->;
+> & {
+  // From the latest succeeded scrape run for the row's source (view `scrape_source_freshness`),
+  // not from the unterkuenfte row itself.
+  kaeltehilfe_capacity_checked_at: string | null;
+};
 
 type UnterkunftTyp = UnterkunftRow["typ"];
 type UnterkunftTypKey = Database["public"]["Enums"]["unterkunft_typ"];
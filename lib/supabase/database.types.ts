@@ -38,6 +38,45 @@ export type Database = {
         }
         Relationships: []
       }
+      scrape_runs: {
+        Row: {
+          changed_count: number | null
+          error: string | null
+          failed_count: number | null
+          finished_at: string | null
+          id: number
+          matched_count: number | null
+          offers_count: number | null
+          source: string
+          started_at: string
+          status: string
+        }
+        Insert: {
+          changed_count?: number | null
+          error?: string | null
+          failed_count?: number | null
+          finished_at?: string | null
+          id?: never
+          matched_count?: number | null
+          offers_count?: number | null
+          source: string
+          started_at?: string
+          status?: string
+        }
+        Update: {
+          changed_count?: number | null
+          error?: string | null
+          failed_count?: number | null
+          finished_at?: string | null
+          id?: never
+          matched_count?: number | null
+          offers_count?: number | null
+          source?: string
+          started_at?: string
+          status?: string
+        }
+        Relationships: []
+      }
       unterkuenfte: {
         Row: {
           adresse: string | null
@@ -74,6 +113,8 @@ export type Database = {
             | null
           kaeltehilfe_capacity_updated_at: string
           kaeltehilfe_capacity_url: string | null
+          kaeltehilfe_details: Json | null
+          kaeltehilfe_details_updated_at: string | null
           kapazitaet_belegt: number | null
           kapazitaet_max_allgemein: number
           kapazitaet_max_frauen: number
@@ -134,6 +175,8 @@ export type Database = {
             | null
           kaeltehilfe_capacity_updated_at?: string
           kaeltehilfe_capacity_url?: string | null
+          kaeltehilfe_details?: Json | null
+          kaeltehilfe_details_updated_at?: string | null
           kapazitaet_belegt?: number | null
           kapazitaet_max_allgemein?: number
           kapazitaet_max_frauen?: number
@@ -194,6 +237,8 @@ export type Database = {
             | null
           kaeltehilfe_capacity_updated_at?: string
           kaeltehilfe_capacity_url?: string | null
+          kaeltehilfe_details?: Json | null
+          kaeltehilfe_details_updated_at?: string | null
           kapazitaet_belegt?: number | null
           kapazitaet_max_allgemein?: number
           kapazitaet_max_frauen?: number
@@ -338,7 +383,15 @@ export type Database = {
       }
     }
     Views: {
-      [_ in never]: never
+      scrape_source_freshness: {
+        Row: {
+          checked_at: string | null
+          run_id: number | null
+          source: string | null
+          started_at: string | null
+        }
+        Relationships: []
+      }
     }
     Functions: {
       [_ in never]: never
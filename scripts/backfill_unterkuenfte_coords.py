@@ -39,6 +39,8 @@ except ModuleNotFoundError:  # pragma: no cover
 # Allow running as module or directly
 try:
     from scripts.env import load_dotenv
+    from scripts.http_resilience import CircuitOpenError, add_resilience_arguments, configure_from_args, send
+    from scripts.supabase_rest import get_client
 except ModuleNotFoundError:  # pragma: no cover
     import sys
 
@@ -46,12 +48,15 @@ except ModuleNotFoundError:  # pragma: no cover
     if str(repo_root) not in sys.path:
         sys.path.insert(0, str(repo_root))
     from scripts.env import load_dotenv
+    from scripts.http_resilience import CircuitOpenError, add_resilience_arguments, configure_from_args, send
+    from scripts.supabase_rest import get_client
 
 logger = logging.getLogger("backfill_unterkuenfte_coords")
 
 # Berlin bounding box: minLon,minLat,maxLon,maxLat (kept in sync with app/api/geocode/photon/route.ts)
 BERLIN_BBOX = "13.0884,52.3383,13.7611,52.6755"
-PHOTON_URL = "https://photon.komoot.io/api/"
+# PHOTON_URL points at a stand-in geocoder (see scripts/fake_upstreams.py).
+PHOTON_URL = os.getenv("PHOTON_URL") or "https://photon.komoot.io/api/"
 
 
 def _build_query_candidates(*, adresse: str, strasse: str) -> list[str]:
@@ -124,7 +129,7 @@ def photon_geocode(*, q: str, bbox: str = BERLIN_BBOX, limit: int = 6, timeout_s
         "user-agent": "warmebetten.berlin (photon geocoding)",
         "accept-language": "de",
     }
-    res = requests.get(PHOTON_URL, params=params, headers=headers, timeout=timeout_s)
+    res = send("GET", PHOTON_URL, params=params, headers=headers, timeout=timeout_s)
     res.raise_for_status()
     data = res.json()
     feats = data.get("features") if isinstance(data, dict) else None
@@ -146,10 +151,6 @@ def photon_geocode(*, q: str, bbox: str = BERLIN_BBOX, limit: int = 6, timeout_s
 
 
 def fetch_targets(url: str, key: str, limit: int | None = None) -> list[dict[str, Any]]:
-    if requests is None:
-        raise RuntimeError("Missing dependency: requests. Install requirements.txt (or pip install requests).")
-
-    endpoint = f"{url.rstrip('/')}/rest/v1/unterkuenfte"
     params: dict[str, str] = {
         "select": "id,name,adresse,strasse,lat,lng,is_mobile",
         "is_mobile": "eq.false",
@@ -160,33 +161,11 @@ def fetch_targets(url: str, key: str, limit: int | None = None) -> list[dict[str
     if limit is not None:
         params["limit"] = str(limit)
 
-    headers = {
-        "apikey": key,
-        "Authorization": f"Bearer {key}",
-        "Content-Type": "application/json",
-    }
-    resp = requests.get(endpoint, params=params, headers=headers, timeout=60)
-    resp.raise_for_status()
-    rows = resp.json()
-    return rows if isinstance(rows, list) else []
+    return get_client(url, key).select("unterkuenfte", params)
 
 
 def update_coords(url: str, key: str, unterkunft_id: str, lat: float, lng: float) -> None:
-    if requests is None:
-        raise RuntimeError("Missing dependency: requests. Install requirements.txt (or pip install requests).")
-
-    endpoint = f"{url.rstrip('/')}/rest/v1/unterkuenfte"
-    params = {"id": f"eq.{unterkunft_id}"}
-    headers = {
-        "apikey": key,
-        "Authorization": f"Bearer {key}",
-        "Content-Type": "application/json",
-        "Prefer": "return=minimal",
-    }
-    payload = {"lat": lat, "lng": lng}
-    resp = requests.patch(endpoint, params=params, headers=headers, json=payload, timeout=60)
-    if resp.status_code >= 400:
-        raise RuntimeError(f"Update failed ({resp.status_code}): {resp.text}")
+    get_client(url, key).update("unterkuenfte", {"id": f"eq.{unterkunft_id}"}, {"lat": lat, "lng": lng})
 
 
 def main() -> None:
@@ -194,10 +173,12 @@ def main() -> None:
     parser.add_argument("--commit", action="store_true", help="Actually update rows (default: dry-run)")
     parser.add_argument("--limit", type=int, default=None, help="Limit number of rows processed")
     parser.add_argument("--photon-sleep-ms", type=int, default=150, help="Sleep between Photon calls")
+    add_resilience_arguments(parser)
     parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
     args = parser.parse_args()
 
     logging.basicConfig(level=getattr(logging, args.log_level), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    configure_from_args(args)
 
     url, key = get_supabase_config()
     rows = fetch_targets(url, key, limit=args.limit)
@@ -221,11 +202,20 @@ def main() -> None:
 
         coords = None
         used_q = None
-        for q in qs:
-            coords = photon_geocode(q=q)
-            if coords is not None:
-                used_q = q
-                break
+        try:
+            for q in qs:
+                coords = photon_geocode(q=q)
+                if coords is not None:
+                    used_q = q
+                    break
+        except CircuitOpenError as ex:
+            failed += len(rows) - i + 1
+            logger.error("(%s/%s) Stopping: %s", i, len(rows), ex)
+            break
+        except Exception as ex:
+            failed += 1
+            logger.error("(%s/%s) Photon failed for %s (%s): %s", i, len(rows), name, uid, ex)
+            continue
         if coords is None:
             skipped += 1
             logger.warning("(%s/%s) Photon: no coordinates for %s | tried=%s", i, len(rows), name, qs)
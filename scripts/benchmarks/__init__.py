@@ -0,0 +1 @@
+# Offline benchmarks for the scripts (no network, no DB). Run as `python -m scripts.benchmarks.<name>`.
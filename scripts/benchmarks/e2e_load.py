@@ -0,0 +1,184 @@
+"""
+End-to-end load test of the scripts against the local fake upstreams (`scripts.fake_upstreams`).
+
+Starts the fake Kaeltehilfe site, Photon and PostgREST in-process, then runs the real scripts as
+subprocesses pointed at them (env overrides), one after another:
+- scrape   `scripts.scrape_kaeltehilfe_capacity --commit` (own http/match cache, history, run report)
+- backfill `scripts.backfill_unterkuenfte_coords --commit` (rows without lat/lng)
+- import   `scripts.import_unterkuenfte_one_time --commit` on a generated extraction file
+           (`shelters.structured.json` entries repeated with renamed copies up to the scale)
+
+Reports wall time and exit code per script, the requests/statuses each fake saw, and the phase
+timings of the scraper's run report. `--scale 100` = 100x today's size (offers, rows, entries).
+
+Usage:
+  python -m scripts.benchmarks.e2e_load --scale 100
+  python -m scripts.benchmarks.e2e_load --scale 10 --latency-ms 80 --jitter-ms 40 --error-rate 0.02 --runs scrape
+  python -m scripts.benchmarks.e2e_load --scale 100 --scrape-args "--details --details-unverified --details-rate 50" --out tmp_logs/e2e.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import time as time_mod
+from pathlib import Path
+from typing import Any
+
+from scripts.fake_upstreams import EXTRACTION_PATH, PAGE_SIZE, TODAY_ENTRIES, add_fake_arguments, fakes_from_args
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+RUNS = ("scrape", "backfill", "import")
+
+
+def _scaled_extraction(path: Path, *, entries: int) -> dict[str, Any]:
+    base = json.loads(path.read_text(encoding="utf-8")).get("unterkuenfte") or []
+    if not base:
+        raise RuntimeError(f"No unterkuenfte in {path}")
+    out: list[dict[str, Any]] = []
+    for i in range(entries):
+        e = dict(base[i % len(base)])
+        copy = i // len(base)
+        if copy:
+            # Renamed copies, so the import's dedupe keeps them.
+            e["name"] = f"{e.get('name') or 'Unterkunft'} ({copy + 1})"
+        out.append(e)
+    return {"unterkuenfte": out}
+
+
+def _commands(args: argparse.Namespace, work: Path, *, offers: int) -> dict[str, list[str]]:
+    py = [sys.executable, "-m"]
+    # The scraper's pagination safety limit (200 pages) is below the larger scales.
+    max_pages = offers // PAGE_SIZE + 10
+    return {
+        "scrape": py
+        + [
+            "scripts.scrape_kaeltehilfe_capacity",
+            "--commit",
+            "--sleep-ms",
+            "0",
+            "--max-pages",
+            str(max_pages),
+            "--http-cache",
+            str(work / "http_cache.json"),
+            "--match-cache",
+            str(work / "match_cache.json"),
+            "--history",
+            str(work / "history"),
+            "--metrics-json",
+            str(work / "scrape_run.json"),
+            "--log-level",
+            args.script_log_level,
+        ]
+        + shlex.split(args.scrape_args),
+        "backfill": py
+        + ["scripts.backfill_unterkuenfte_coords", "--commit", "--photon-sleep-ms", "0", "--log-level", args.script_log_level]
+        + shlex.split(args.backfill_args),
+        "import": py
+        + [
+            "scripts.import_unterkuenfte_one_time",
+            "--commit",
+            "--in",
+            str(work / "extraction.json"),
+            "--photon-sleep-ms",
+            "0",
+            "--log-level",
+            args.script_log_level,
+        ]
+        + shlex.split(args.import_args),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_fake_arguments(parser)
+    parser.add_argument("--entries", type=int, default=None, help=f"Import entries (default: {TODAY_ENTRIES} x --scale)")
+    parser.add_argument("--runs", nargs="+", choices=RUNS, default=list(RUNS), help="Scripts to run, in this order")
+    parser.add_argument("--scrape-args", default="", help="Extra arguments for the scraper (one string)")
+    parser.add_argument("--backfill-args", default="", help="Extra arguments for the backfill (one string)")
+    parser.add_argument("--import-args", default="", help="Extra arguments for the import (one string)")
+    parser.add_argument("--script-log-level", default="WARNING", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    parser.add_argument("--timeout-s", type=float, default=1800.0, help="Per script")
+    parser.add_argument("--out", default=None, help="Write the results as JSON")
+    args = parser.parse_args()
+
+    try:
+        fakes = fakes_from_args(args)
+    except ValueError as ex:
+        parser.error(str(ex))
+    entries = args.entries if args.entries is not None else max(1, round(TODAY_ENTRIES * args.scale))
+
+    results: dict[str, Any] = {
+        "offers": len(fakes.dataset.offers),
+        "rows": len(fakes.dataset.tables["unterkuenfte"]),
+        "entries": entries,
+        "faults": {name: vars(server.faults) for name, server in fakes.servers.items()},
+        "runs": {},
+    }
+    print(f"offers={results['offers']} rows={results['rows']} entries={entries}")
+
+    with tempfile.TemporaryDirectory(prefix="e2e_load_") as tmp, fakes:
+        work = Path(tmp)
+        (work / "extraction.json").write_text(json.dumps(_scaled_extraction(EXTRACTION_PATH, entries=entries), ensure_ascii=False), encoding="utf-8")
+        env = {**os.environ, **fakes.env()}
+        commands = _commands(args, work, offers=len(fakes.dataset.offers))
+
+        for name in args.runs:
+            before = fakes.stats()
+            t0 = time_mod.perf_counter()
+            try:
+                proc = subprocess.run(commands[name], cwd=REPO_ROOT, env=env, capture_output=True, text=True, timeout=args.timeout_s)
+                code: int | str = proc.returncode
+                stderr_tail = proc.stderr.strip().splitlines()[-5:]
+            except subprocess.TimeoutExpired:
+                code, stderr_tail = "timeout", []
+            seconds = time_mod.perf_counter() - t0
+            after = fakes.stats()
+            requests = {
+                svc: {k: v - before[svc].get(k, 0) for k, v in stats.items() if v - before[svc].get(k, 0)}
+                for svc, stats in after.items()
+            }
+            run: dict[str, Any] = {"seconds": round(seconds, 3), "exit_code": code, "requests": requests}
+            if code != 0:
+                run["stderr_tail"] = stderr_tail
+            report_path = work / "scrape_run.json"
+            if name == "scrape" and report_path.exists():
+                report = json.loads(report_path.read_text(encoding="utf-8"))
+                run["phases"] = {k: v["wall_seconds"] for k, v in report.get("phases", {}).items()}
+                run["counters"] = report.get("counters", {})
+            results["runs"][name] = run
+
+            print(f"\n{name}: exit={code} {seconds:.2f}s")
+            for svc, stats in requests.items():
+                if stats:
+                    print(f"  {svc:<12} " + " ".join(f"{k}={v}" for k, v in stats.items()))
+            for k, v in (run.get("phases") or {}).items():
+                print(f"  phase {k:<18} {v:8.3f}s")
+            for line in run.get("stderr_tail", []):
+                print(f"  ! {line}")
+
+        results["db"] = {
+            "unterkuenfte": len(fakes.dataset.tables["unterkuenfte"]),
+            "with_coords": sum(1 for r in fakes.dataset.tables["unterkuenfte"] if r.get("lat") is not None),
+            "with_capacity": sum(1 for r in fakes.dataset.tables["unterkuenfte"] if r.get("kaeltehilfe_capacity_status")),
+            "scrape_runs": len(fakes.dataset.tables["scrape_runs"]),
+        }
+    print("\ndb: " + " ".join(f"{k}={v}" for k, v in results["db"].items()))
+
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Wrote {out}")
+
+    if any(r["exit_code"] != 0 for r in results["runs"].values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+"""
+Compare the fuzzy (last-resort) matching backends: difflib SequenceMatcher vs trigram TF-IDF.
+
+Data:
+- Offers and labeled pairs come from `tmp_logs/kaeltehilfe_name_compare.json`
+  (output of `scripts.compare_kaeltehilfe_names`): every reported match is taken as
+  ground truth (db name -> Kaeltehilfe URL).
+- Each labeled DB name is perturbed a few times (typos, dropped/abbreviated words,
+  "e.V."/"gGmbH" suffixes) so the queries actually need the fuzzy stage.
+- `--scale N` adds N-1 perturbed copies of every offer as distractors to measure scaling.
+
+Reports, per backend:
+- precision / recall of the fuzzy stage alone at a sweep of thresholds
+- wall time to score all queries against all offers
+
+Usage:
+  python -m scripts.benchmarks.fuzzy_match
+  python -m scripts.benchmarks.fuzzy_match --scale 20 --variants 10 --out tmp_logs/fuzzy_bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import time as time_mod
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from scripts.kaeltehilfe_match import FUZZY_BACKENDS, OfferMatcher, _normalize_name
+
+DEFAULT_REPORT = "tmp_logs/kaeltehilfe_name_compare.json"
+
+_ABBREVIATIONS = {
+    "straße": "str.",
+    "strasse": "str.",
+    "Straße": "Str.",
+    "Strasse": "Str.",
+    "Notübernachtung": "Notüb.",
+}
+_SUFFIXES = (" e.V.", " gGmbH", " Berlin", " (Kältehilfe)")
+
+
+@dataclass(frozen=True)
+class _Offer:
+    name: str
+    url: str | None
+
+
+def _load_report(path: Path) -> tuple[list[_Offer], list[tuple[str, str]]]:
+    raw = json.loads(path.read_text(encoding="utf-8"))
+    offers: list[_Offer] = []
+    seen: set[str] = set()
+    for page in raw.get("kaeltehilfe", {}).get("pages", []):
+        for o in page.get("offers", []):
+            key = (o.get("url") or "").strip().lower() or _normalize_name(o.get("name") or "")
+            if not key or key in seen:
+                continue
+            seen.add(key)
+            offers.append(_Offer(name=o["name"], url=o.get("url")))
+    labeled = [
+        (m["db_name"], (m["kaeltehilfe_url"] or "").strip().lower())
+        for m in raw.get("matches", {}).get("rows", [])
+        if m.get("kaeltehilfe_url")
+    ]
+    return offers, labeled
+
+
+def _perturb(name: str, rng: random.Random) -> str:
+    s = name
+    op = rng.randrange(5)
+    if op == 0:
+        # 1-2 character typos
+        chars = list(s)
+        for _ in range(rng.randint(1, 2)):
+            i = rng.randrange(len(chars))
+            chars[i] = rng.choice("abcdefghiklmnorstuüe")
+        s = "".join(chars)
+    elif op == 1:
+        words = s.split()
+        if len(words) > 2:
+            del words[rng.randrange(1, len(words))]
+        s = " ".join(words)
+    elif op == 2:
+        for long, short in _ABBREVIATIONS.items():
+            s = s.replace(long, short)
+    elif op == 3:
+        s = s + rng.choice(_SUFFIXES)
+    else:
+        words = s.split()
+        if len(words) > 2:
+            i = rng.randrange(len(words) - 1)
+            words[i], words[i + 1] = words[i + 1], words[i]
+        s = " ".join(words)
+    return s
+
+
+def _queries(labeled: list[tuple[str, str]], *, variants: int, rng: random.Random) -> list[tuple[str, str]]:
+    out: list[tuple[str, str]] = []
+    for db_name, url in labeled:
+        out.append((db_name, url))
+        for _ in range(variants):
+            out.append((_perturb(db_name, rng), url))
+    return out
+
+
+def _distractors(offers: list[_Offer], *, scale: int, rng: random.Random) -> list[_Offer]:
+    out = list(offers)
+    for copy in range(1, max(1, scale)):
+        for i, o in enumerate(offers):
+            out.append(_Offer(name=_perturb(o.name, rng) + f" {copy}", url=f"distractor:{copy}:{i}"))
+    return out
+
+
+def run_backend(backend: str, offers: list[_Offer], queries: list[tuple[str, str]], thresholds: list[float]) -> dict[str, Any]:
+    t0 = time_mod.perf_counter()
+    matcher = OfferMatcher(offers, fuzzy_backend=backend)
+    t_build = time_mod.perf_counter() - t0
+
+    t0 = time_mod.perf_counter()
+    matcher.prepare(q for q, _ in queries)
+    results = [matcher.best_fuzzy(q) for q, _ in queries]
+    t_score = time_mod.perf_counter() - t0
+
+    sweep: list[dict[str, float]] = []
+    for th in thresholds:
+        returned = correct = 0
+        for (offer, score), (_q, url) in zip(results, queries, strict=True):
+            if offer is None or score < th:
+                continue
+            returned += 1
+            if (offer.url or "").strip().lower() == url:
+                correct += 1
+        sweep.append(
+            {
+                "threshold": th,
+                "returned": returned,
+                "correct": correct,
+                "precision": correct / returned if returned else 1.0,
+                "recall": correct / len(queries) if queries else 0.0,
+            }
+        )
+
+    top1 = sum(
+        1 for (offer, _s), (_q, url) in zip(results, queries, strict=True) if offer is not None and (offer.url or "").strip().lower() == url
+    )
+    return {
+        "backend": backend,
+        "build_s": t_build,
+        "score_s": t_score,
+        "per_query_ms": 1000.0 * t_score / max(1, len(queries)),
+        "top1_accuracy": top1 / max(1, len(queries)),
+        "sweep": sweep,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--report", default=DEFAULT_REPORT, help="compare_kaeltehilfe_names JSON report")
+    parser.add_argument("--variants", type=int, default=5, help="Perturbed queries per labeled DB name")
+    parser.add_argument("--scale", type=int, default=1, help="Multiply the offer list with perturbed distractors")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--backends", default=",".join(FUZZY_BACKENDS))
+    parser.add_argument("--out", default=None, help="Optional JSON output path")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    offers, labeled = _load_report(Path(args.report))
+    offers = _distractors(offers, scale=args.scale, rng=rng)
+    queries = _queries(labeled, variants=args.variants, rng=rng)
+    thresholds = [round(0.4 + 0.05 * i, 2) for i in range(11)]
+
+    print(f"offers={len(offers)} labeled={len(labeled)} queries={len(queries)}")
+    results: list[dict[str, Any]] = []
+    for backend in [b.strip() for b in args.backends.split(",") if b.strip()]:
+        r = run_backend(backend, offers, queries, thresholds)
+        results.append(r)
+        print(
+            f"\n[{backend}] build={r['build_s'] * 1000:.1f}ms score={r['score_s'] * 1000:.1f}ms "
+            f"({r['per_query_ms']:.3f} ms/query) top1={r['top1_accuracy']:.3f}"
+        )
+        print("  threshold  returned  precision  recall")
+        for row in r["sweep"]:
+            print(f"  {row['threshold']:>9.2f}  {row['returned']:>8}  {row['precision']:>9.3f}  {row['recall']:>6.3f}")
+
+    if args.out:
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {"offers": len(offers), "queries": len(queries), "results": results}
+        out_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        print(f"\nWrote {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""
+Throughput and memory of the scraper hot paths, with a stored baseline to compare against.
+
+Cases:
+- scrape_page      `_scrape_page` (listing parser, default backend) on every `scripts/html/*.html`
+                   fixture, and on synthetic 10-card listing pages covering N offers
+- normalize_name   `_normalize_name` over N DB row names
+- match_tokens     `_match_tokens` over N DB row names
+- best_offer_match `_best_offer_match` (one throwaway matcher per call) for `--queries` DB names
+                   against N offers
+- dedupe_entries   `_dedupe_entries` over N PDF extraction entries (~10% duplicates)
+
+Data: the fixtures, plus synthetic corpora per `--scales` (default 10k, 100k, 1M) built with a
+fixed seed: offer names in the style of the listing, DB names derived from them (exact, reordered /
+abbreviated, typos, unknown), extraction entries with case/whitespace-only duplicates.
+
+Per case: median wall time of `--repeat` runs -> items/s, and the peak traced allocation of a
+separate run (tracemalloc: Python objects and numpy buffers; libxml2's own memory is not traced).
+Limits that keep a run finite are part of the result (`pages` parsed per scale is capped by
+`--max-pages`; `best_offer_match` is skipped when the dense TF-IDF matrix would exceed
+`--max-matrix-mb`).
+
+Baseline: `--save-baseline` writes all results to `--baseline`; `--compare` prints the change per
+case against it and exits non-zero if throughput dropped or peak memory grew by more than
+`--tolerance`. Only compare runs made on the same machine.
+
+Usage:
+  python -m scripts.benchmarks.hot_paths --save-baseline
+  python -m scripts.benchmarks.hot_paths --compare
+  python -m scripts.benchmarks.hot_paths --scales 10000 --cases normalize_name,match_tokens --compare
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import platform
+import random
+import statistics
+import sys
+import time as time_mod
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+from scripts.benchmarks.parse_listing import FIXTURES_DIR, _synthetic_page
+from scripts.kaeltehilfe_listing import _scrape_page
+from scripts.kaeltehilfe_match import _best_offer_match, _match_tokens, _normalize_name, _trigrams, default_fuzzy_backend
+from scripts.kaeltehilfe_parse import ScrapedOffer, default_parser_backend
+
+CASES = ("scrape_page", "normalize_name", "match_tokens", "best_offer_match", "dedupe_entries")
+DEFAULT_SCALES = "10000,100000,1000000"
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "hot_paths_baseline.json"
+BASELINE_VERSION = 1
+
+_PREFIXES = ("Notübernachtung", "Nachtcafé", "Frauennotübernachtung", "Wärmestube", "Notunterkunft", "Kältehilfe")
+_SYLLABLES = ("ko", "pen", "ha", "ge", "ner", "lich", "ten", "berg", "wal", "de", "mar", "ien", "fel", "burg", "sta", "dt")
+_STREET_KINDS = ("straße", "str.", "weg", "platz", "allee", "damm", "ufer")
+_DISTRICTS = ("Mitte", "Kreuzberg", "Neukölln", "Wedding", "Pankow", "Lichtenberg", "Spandau", "Moabit", "Tegel")
+_CARRIERS = ("Stadtmission", "Caritas", "Diakonie", "Johanniter", "Heilsarmee", "GEBEWO")
+
+
+def _street(rng: random.Random) -> str:
+    word = "".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4)))
+    return word.capitalize() + rng.choice(_STREET_KINDS)
+
+
+def synthetic_offers(n: int, *, seed: int) -> list[ScrapedOffer]:
+    rng = random.Random(seed)
+    offers: list[ScrapedOffer] = []
+    for i in range(n):
+        name = f"{rng.choice(_PREFIXES)} {_street(rng)} {rng.randint(1, 200)}"
+        if rng.random() < 0.3:
+            name += f" ({rng.choice(_CARRIERS)} {rng.choice(_DISTRICTS)})"
+        offers.append(ScrapedOffer(name, f"/kaeltehilfe-angebot/bench-{i}", "plenty", None, None, None))
+    return offers
+
+
+def _typo(name: str, rng: random.Random) -> str:
+    chars = list(name)
+    i = rng.randrange(len(chars))
+    chars[i] = rng.choice("aeiklnrstu")
+    return "".join(chars)
+
+
+def synthetic_db_names(offers: list[ScrapedOffer], n: int, *, seed: int) -> list[str]:
+    """
+    DB names as they relate to the listing: ~70% exact, ~15% reordered/abbreviated, ~10% typos,
+    ~5% not listed at all.
+    """
+    rng = random.Random(seed + 1)
+    names: list[str] = []
+    for _ in range(n):
+        base = offers[rng.randrange(len(offers))].name
+        r = rng.random()
+        if r < 0.70:
+            names.append(base)
+        elif r < 0.85:
+            words = base.replace("straße", "str.").split()
+            rng.shuffle(words)
+            names.append(" ".join(words))
+        elif r < 0.95:
+            names.append(_typo(base, rng))
+        else:
+            names.append(f"Unterkunft {_street(rng)} {rng.choice(_DISTRICTS)}")
+    return names
+
+
+def synthetic_entries(n: int, *, seed: int) -> list[dict[str, Any]]:
+    """
+    PDF extraction entries; ~10% repeat an earlier one with other case/whitespace (and phone order).
+    """
+    rng = random.Random(seed + 2)
+    entries: list[dict[str, Any]] = []
+    for i in range(n):
+        if entries and rng.random() < 0.1:
+            prev = entries[rng.randrange(len(entries))]
+            tel = prev["telefon"]
+            entries.append(
+                {
+                    **prev,
+                    "name": f"  {str(prev['name']).upper()} ",
+                    "adresse": (prev["adresse"] or "").lower(),
+                    "telefon": list(reversed(tel)) if isinstance(tel, list) else tel,
+                }
+            )
+            continue
+        phones = [f"030 {rng.randint(1000000, 9999999)}" for _ in range(rng.randint(1, 2))]
+        entries.append(
+            {
+                "name": f"{rng.choice(_PREFIXES)} {_street(rng)} {i}",
+                "adresse": f"{_street(rng)} {rng.randint(1, 200)}, 1{rng.randint(1000, 4999)} Berlin" if rng.random() < 0.9 else None,
+                "telefon": phones if len(phones) > 1 else phones[0],
+                "bezirk": rng.choice(_DISTRICTS),
+            }
+        )
+    return entries
+
+
+def _tfidf_matrix_mb(offers: list[ScrapedOffer]) -> float:
+    """
+    Size of the dense offers x trigram-vocabulary float32 matrix `OfferMatcher` builds (tfidf backend).
+    """
+    if default_fuzzy_backend() != "tfidf":
+        return 0.0
+    vocab: set[str] = set()
+    for o in offers:
+        vocab.update(_trigrams(_normalize_name(o.name)))
+    return len(offers) * len(vocab) * 4 / (1024 * 1024)
+
+
+def _measure(fn: Callable[[], Any], *, repeat: int, memory: bool) -> dict[str, Any]:
+    samples: list[float] = []
+    for _ in range(max(1, repeat)):
+        gc.collect()
+        t0 = time_mod.perf_counter()
+        fn()
+        samples.append(time_mod.perf_counter() - t0)
+    out: dict[str, Any] = {"seconds": statistics.median(samples)}
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            out["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return out
+
+
+def _result(items: int, measured: dict[str, Any], **extra: Any) -> dict[str, Any]:
+    seconds = measured["seconds"]
+    return {
+        "items": items,
+        "seconds": round(seconds, 6),
+        "items_per_s": round(items / seconds, 1) if seconds > 0 else None,
+        **({"peak_bytes": measured["peak_bytes"]} if "peak_bytes" in measured else {}),
+        **extra,
+    }
+
+
+def _load_dedupe() -> Callable[[list[dict[str, Any]]], list[dict[str, Any]]] | None:
+    try:
+        from scripts.extract_shelters_structured import _dedupe_entries
+    except ModuleNotFoundError as ex:
+        print(f"{ex.name} not installed; skipping dedupe_entries")
+        return None
+    return _dedupe_entries
+
+
+def run_cases(args: argparse.Namespace) -> dict[str, dict[str, Any]]:
+    cases = [c.strip() for c in args.cases.split(",") if c.strip()]
+    unknown = sorted(set(cases) - set(CASES))
+    if unknown:
+        raise SystemExit(f"Unknown cases: {', '.join(unknown)} (known: {', '.join(CASES)})")
+    scales = [int(s) for s in args.scales.split(",") if s.strip()]
+    dedupe = _load_dedupe() if "dedupe_entries" in cases else None
+    results: dict[str, dict[str, Any]] = {}
+
+    def _record(key: str, result: dict[str, Any]) -> None:
+        results[key] = result
+        if result.get("skipped"):
+            print(f"{key:<36} skipped: {result['skipped']}")
+            return
+        peak = f"{result['peak_bytes'] / (1024 * 1024):>9.1f}" if "peak_bytes" in result else f"{'-':>9}"
+        print(f"{key:<36} {result['items']:>9} {1000 * result['seconds']:>11.2f} {result['items_per_s'] or 0:>13.0f} {peak}")
+
+    print(f"{'case/data':<36} {'items':>9} {'ms':>11} {'items/s':>13} {'peak MiB':>9}")
+
+    fixture_paths = sorted(FIXTURES_DIR.glob("*.html"))
+    fixtures = [p.read_text(encoding="utf-8") for p in fixture_paths]
+    if "scrape_page" in cases:
+        for path, html in zip(fixture_paths, fixtures, strict=True):
+            n = len(_scrape_page(html))
+            m = _measure(lambda html=html: _scrape_page(html), repeat=args.fixture_repeat, memory=args.memory)
+            _record(f"scrape_page/{path.name}", _result(n, m, bytes=len(html.encode("utf-8"))))
+
+    for scale in scales:
+        label = f"n={scale}"
+        offers = synthetic_offers(scale, seed=args.seed)
+        names = synthetic_db_names(offers, scale, seed=args.seed)
+
+        if "scrape_page" in cases:
+            # Distinct 10-card pages (renamed fixture cards) inside the real page chrome.
+            n_pages = min(-(-scale // 10), args.max_pages)
+            pool = [_synthetic_page(fixtures, cards=10, chrome_kb=args.chrome_kb).replace("bench-", f"bench-p{p}-") for p in range(20)]
+
+            def _pages(n_pages: int = n_pages, pool: list[str] = pool) -> None:
+                for p in range(n_pages):
+                    _scrape_page(pool[p % len(pool)])
+
+            m = _measure(_pages, repeat=args.repeat, memory=args.memory)
+            _record(f"scrape_page/{label}", _result(n_pages * 10, m, pages=n_pages, capped=n_pages * 10 < scale))
+
+        if "normalize_name" in cases:
+            m = _measure(lambda names=names: [_normalize_name(x) for x in names], repeat=args.repeat, memory=args.memory)
+            _record(f"normalize_name/{label}", _result(len(names), m))
+
+        if "match_tokens" in cases:
+            m = _measure(lambda names=names: [_match_tokens(x) for x in names], repeat=args.repeat, memory=args.memory)
+            _record(f"match_tokens/{label}", _result(len(names), m))
+
+        if "best_offer_match" in cases:
+            matrix_mb = _tfidf_matrix_mb(offers)
+            queries = names[: max(1, args.queries)]
+            if matrix_mb > args.max_matrix_mb:
+                _record(
+                    f"best_offer_match/{label}",
+                    {"items": len(queries), "skipped": f"dense TF-IDF matrix ~{matrix_mb:.0f} MiB > --max-matrix-mb {args.max_matrix_mb}"},
+                )
+            else:
+
+                def _best(queries: list[str] = queries, offers: list[ScrapedOffer] = offers) -> None:
+                    for q in queries:
+                        _best_offer_match(db_name=q, offers=offers)
+
+                m = _measure(_best, repeat=args.repeat, memory=args.memory)
+                _record(f"best_offer_match/{label}", _result(len(queries), m, offers=scale, matrix_mb=round(matrix_mb, 1)))
+
+        if dedupe is not None:
+            entries = synthetic_entries(scale, seed=args.seed)
+            m = _measure(lambda entries=entries: dedupe(entries), repeat=args.repeat, memory=args.memory)
+            _record(f"dedupe_entries/{label}", _result(len(entries), m, unique=len(dedupe(entries))))
+
+    return results
+
+
+def compare(results: dict[str, dict[str, Any]], baseline: dict[str, Any], *, tolerance: float) -> list[str]:
+    """
+    Print the change per case against `baseline`; returns the regressed case keys.
+    """
+    base = baseline.get("results") or {}
+    regressions: list[str] = []
+    print(f"\nvs baseline {baseline.get('created_at')} ({baseline.get('machine')}, Python {baseline.get('python')})")
+    print(f"{'case/data':<36} {'items/s':>9} {'peak mem':>9}")
+    for key, r in results.items():
+        b = base.get(key)
+        if b is None or r.get("skipped") or b.get("skipped"):
+            print(f"{key:<36} {'new' if b is None else 'skipped':>9}")
+            continue
+        speed = (r["items_per_s"] or 0) / b["items_per_s"] - 1.0 if b.get("items_per_s") else 0.0
+        mem = r["peak_bytes"] / b["peak_bytes"] - 1.0 if r.get("peak_bytes") and b.get("peak_bytes") else None
+        worse = speed < -tolerance or (mem is not None and mem > tolerance)
+        if worse:
+            regressions.append(key)
+        print(
+            f"{key:<36} {speed:>+9.1%} {(f'{mem:+.1%}' if mem is not None else '-'):>9}"
+            + ("  REGRESSION" if worse else "")
+        )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", default=",".join(CASES), help="Comma-separated subset of: " + ", ".join(CASES))
+    parser.add_argument("--scales", default=DEFAULT_SCALES, help="Synthetic corpus sizes (offers = DB rows = entries)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per scaled case (median)")
+    parser.add_argument("--fixture-repeat", type=int, default=50, help="Timed runs per fixture (median)")
+    parser.add_argument("--no-memory", dest="memory", action="store_false", help="Skip the tracemalloc run per case")
+    parser.add_argument("--max-pages", type=int, default=2000, help="scrape_page: pages parsed per scale at most")
+    parser.add_argument("--chrome-kb", type=int, default=60, help="scrape_page: non-card markup per synthetic page")
+    parser.add_argument("--queries", type=int, default=20, help="best_offer_match: DB names matched per scale")
+    parser.add_argument("--max-matrix-mb", type=float, default=1024, help="best_offer_match: skip scales above this TF-IDF size")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="Baseline JSON path")
+    parser.add_argument("--save-baseline", action="store_true", help="Write this run's results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="Compare against the baseline; exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed throughput drop / memory growth (fraction)")
+    parser.add_argument("--out", default=None, help="Optional JSON output path")
+    args = parser.parse_args()
+
+    baseline: dict[str, Any] | None = None
+    if args.compare:
+        baseline_path = Path(args.baseline)
+        if not baseline_path.exists():
+            raise SystemExit(f"No baseline at {baseline_path} (create one with --save-baseline)")
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+
+    print(f"parser={default_parser_backend()} fuzzy={default_fuzzy_backend()} scales={args.scales}\n")
+    results = run_cases(args)
+    payload = {
+        "version": BASELINE_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()} ({platform.node()})",
+        "parser_backend": default_parser_backend(),
+        "fuzzy_backend": default_fuzzy_backend(),
+        "results": results,
+    }
+
+    for path in [p for p in (args.out, args.baseline if args.save_baseline else None) if p]:
+        out_path = Path(path)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps(payload, indent=2), encoding="utf-8")
+        print(f"\nWrote {out_path}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, tolerance=args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}", file=sys.stderr)
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
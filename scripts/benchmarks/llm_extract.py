@@ -0,0 +1,110 @@
+"""
+LLM extraction (`scripts.extract_shelters_structured`) against the fake OpenAI endpoint, by concurrency.
+
+Starts the fake upstreams in-process (`scripts.fake_upstreams`; only the `openai` service is used),
+warms the PDF page cache once (`--only-dump-pages`), then runs the extraction as a subprocess once
+per `--concurrency` value. Reports wall time and the requests/429s the fake saw per run, and
+checks that every run wrote byte-identical JSON (results are merged in page order).
+
+The fake answers after `--llm-latency-ms` (+ uniform `--llm-jitter-ms`, + `--openai-ms-per-token`
+per output token) and throttles `--llm-throttle-rate` of the requests with 429 + `Retry-After: 1`.
+
+Usage:
+  python -m scripts.benchmarks.llm_extract
+  python -m scripts.benchmarks.llm_extract --concurrency 1 4 8 16 --llm-throttle-rate 0.1 --out tmp_logs/llm_extract.json
+  python -m scripts.benchmarks.llm_extract --extract-args "--start-page 4 --end-page 10"
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+import tempfile
+import time as time_mod
+from pathlib import Path
+from typing import Any
+
+from scripts.fake_upstreams import add_fake_arguments, fakes_from_args
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_fake_arguments(parser)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8], help="--llm-concurrency values to run")
+    parser.add_argument("--llm-latency-ms", type=float, default=800.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=400.0)
+    parser.add_argument("--llm-throttle-rate", type=float, default=0.05, help="Share of OpenAI requests answered with 429")
+    parser.add_argument("--extract-args", default="", help="Extra arguments for the extraction (one string)")
+    parser.add_argument("--script-log-level", default="WARNING", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    parser.add_argument("--timeout-s", type=float, default=1800.0, help="Per run")
+    parser.add_argument("--out", default=None, help="Write the results as JSON")
+    args = parser.parse_args()
+
+    # Before any user --service-faults for openai, so those still override these.
+    args.service_faults.insert(
+        0,
+        f"openai:latency_ms={args.llm_latency_ms},jitter_ms={args.llm_jitter_ms},throttle_rate={args.llm_throttle_rate}",
+    )
+    try:
+        fakes = fakes_from_args(args)
+    except ValueError as ex:
+        parser.error(str(ex))
+
+    results: dict[str, Any] = {"faults": vars(fakes.servers["openai"].faults), "runs": {}}
+    with tempfile.TemporaryDirectory(prefix="llm_extract_") as tmp, fakes:
+        work = Path(tmp)
+        env = {**os.environ, **fakes.env()}
+        base = [sys.executable, "-m", "scripts.extract_shelters_structured", "--log-level", args.script_log_level]
+        base += shlex.split(args.extract_args)
+        subprocess.run(base + ["--only-dump-pages"], cwd=REPO_ROOT, env=env, capture_output=True, check=True, timeout=args.timeout_s)
+
+        for concurrency in args.concurrency:
+            out_path = work / f"shelters_c{concurrency}.json"
+            before = fakes.stats()["openai"]
+            t0 = time_mod.perf_counter()
+            try:
+                cmd = base + ["--llm-concurrency", str(concurrency), "--out", str(out_path)]
+                proc = subprocess.run(cmd, cwd=REPO_ROOT, env=env, capture_output=True, text=True, timeout=args.timeout_s)
+                code: int | str = proc.returncode
+                stderr_tail = proc.stderr.strip().splitlines()[-5:]
+            except subprocess.TimeoutExpired:
+                code, stderr_tail = "timeout", []
+            seconds = time_mod.perf_counter() - t0
+            after = fakes.stats()["openai"]
+            requests = {k: v - before.get(k, 0) for k, v in after.items() if v - before.get(k, 0)}
+            run: dict[str, Any] = {"seconds": round(seconds, 3), "exit_code": code, "requests": requests}
+            if code != 0:
+                run["stderr_tail"] = stderr_tail
+            elif out_path.exists():
+                run["entries"] = len(json.loads(out_path.read_text(encoding="utf-8")).get("unterkuenfte") or [])
+            results["runs"][str(concurrency)] = run
+
+            print(
+                f"concurrency={concurrency:<3} exit={code} {seconds:7.2f}s entries={run.get('entries', '-')} "
+                f"requests={requests.get('requests', 0)} 429={requests.get('status_429', 0)}"
+            )
+            for line in run.get("stderr_tail", []):
+                print(f"  ! {line}")
+
+        outputs = {c: (work / f"shelters_c{c}.json").read_bytes() for c in args.concurrency if (work / f"shelters_c{c}.json").exists()}
+        results["identical_output"] = len(set(outputs.values())) <= 1 and len(outputs) == len(args.concurrency)
+    print(f"identical output across runs: {results['identical_output']}")
+
+    if args.out:
+        out = Path(args.out)
+        out.parent.mkdir(parents=True, exist_ok=True)
+        out.write_text(json.dumps(results, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"Wrote {out}")
+
+    if any(r["exit_code"] != 0 for r in results["runs"].values()) or not results["identical_output"]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
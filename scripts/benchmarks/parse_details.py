@@ -0,0 +1,94 @@
+"""
+Check the Kaeltehilfe detail page parser (`scripts.kaeltehilfe_details.parse_detail_page`) on saved pages.
+
+Data:
+- `scripts/html/detail/expected.json`: {page path relative to that directory: expected fields},
+  reviewed by hand against the page. Saved offer pages live next to it as `<slug>.html`
+  (not in `scripts/html/` itself, whose `*.html` are listing card fixtures).
+- `../case.html` (a real listing card) covers the blocks detail pages share with the cards.
+
+Every page must parse to exactly its expected fields (missing, extra and different fields are
+listed); also reports parse time per page (median of `--repeat` runs). The scraper runs the same
+check (`fixture_problems()`) before `--details --commit` and refuses while it fails or no offer
+page is saved yet.
+
+`--save URL` fetches a live offer page into `scripts/html/detail/<slug>.html` and adds its current
+parse to `expected.json`; review that entry against the page before committing both.
+
+Usage:
+  python -m scripts.benchmarks.parse_details
+  python -m scripts.benchmarks.parse_details --save https://kaeltehilfe-berlin.de/kaeltehilfe-angebot/notuebernachtung-evas-haltestelle
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time as time_mod
+from urllib.parse import urlsplit
+
+from scripts.http_resilience import send
+from scripts.kaeltehilfe_details import (
+    FIXTURES_DIR,
+    FIXTURES_EXPECTED,
+    diff_fields,
+    load_fixture_expectations,
+    parse_detail_page,
+)
+
+
+def _save_page(url: str) -> None:
+    slug = urlsplit(url).path.rstrip("/").rsplit("/", 1)[-1]
+    if not slug:
+        raise SystemExit(f"No offer slug in {url!r}")
+    resp = send("GET", url, timeout=30)
+    resp.raise_for_status()
+    FIXTURES_DIR.mkdir(parents=True, exist_ok=True)
+    page = FIXTURES_DIR / f"{slug}.html"
+    page.write_text(resp.text, encoding="utf-8")
+    expected = load_fixture_expectations()
+    expected[page.name] = parse_detail_page(resp.text)
+    FIXTURES_EXPECTED.write_text(json.dumps(expected, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    print(f"Wrote {page} and its parse to {FIXTURES_EXPECTED} (review it against the page):")
+    print(json.dumps(expected[page.name], ensure_ascii=False, indent=2))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--save", metavar="URL", default=None, help="Save a live offer page as a fixture first")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    if args.save:
+        _save_page(args.save)
+
+    expected = load_fixture_expectations()
+    if not expected:
+        raise SystemExit(f"No expectations in {FIXTURES_EXPECTED}")
+
+    failed = False
+    print(f"{'page':<48} {'KB':>6} {'fields':>6} {'ms':>8}  ok")
+    for name, want in sorted(expected.items()):
+        html = (FIXTURES_DIR / name).read_text(encoding="utf-8")
+        got = parse_detail_page(html)
+        samples: list[float] = []
+        for _ in range(max(1, args.repeat)):
+            t0 = time_mod.perf_counter()
+            parse_detail_page(html)
+            samples.append(time_mod.perf_counter() - t0)
+        problems = diff_fields(got, want)
+        failed = failed or bool(problems)
+        print(
+            f"{name:<48} {len(html.encode('utf-8')) / 1024:>6.1f} {len(got):>6} "
+            f"{1000.0 * statistics.median(samples):>8.3f}  {not problems}"
+        )
+        for line in problems:
+            print(f"  ! {line}")
+
+    if failed:
+        raise SystemExit("Parsed fields differ from the expectations (see above)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Compare the Kaeltehilfe listing parser backends (`scripts.kaeltehilfe_parse`).
+
+Data:
+- every `scripts/html/*.html` card fixture on its own
+- a synthetic listing page: `--cards` fixture cards (renamed per card) inside page chrome,
+  padded with `--chrome-kb` of unrelated markup (menus/footer of the real site)
+- optionally real pages saved with `--html path [path ...]`
+
+Checks that every backend returns exactly the same offers as bs4, then reports
+parse time per page (median of `--repeat` runs) per backend.
+
+Usage:
+  python -m scripts.benchmarks.parse_listing
+  python -m scripts.benchmarks.parse_listing --cards 50 --repeat 50 --out tmp_logs/parse_bench.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import time as time_mod
+from pathlib import Path
+from typing import Any
+
+from scripts.kaeltehilfe_parse import PARSER_BACKENDS, lxml_html, parse_listing
+
+FIXTURES_DIR = Path(__file__).resolve().parents[1] / "html"
+
+_CHROME_BLOCK = (
+    '<nav class="uk-navbar-container"><ul class="uk-navbar-nav">'
+    + "".join(f'<li><a href="/menu/{i}">Menüpunkt {i}</a></li>' for i in range(20))
+    + '</ul></nav><div class="uk-section"><p>Text &amp; Hinweise zur Kältehilfe.</p></div>\n'
+)
+
+
+def _synthetic_page(fixtures: list[str], *, cards: int, chrome_kb: int) -> str:
+    body: list[str] = []
+    for i in range(cards):
+        html = fixtures[i % len(fixtures)]
+        body.append(html.replace('href="/kaeltehilfe-angebot/', f'href="/kaeltehilfe-angebot/bench-{i}-'))
+    chrome = _CHROME_BLOCK * max(1, (chrome_kb * 1024) // len(_CHROME_BLOCK))
+    return (
+        '<!DOCTYPE html><html lang="de"><head><meta charset="utf-8"><title>Angebote</title></head><body>'
+        + chrome
+        + '<div class="uk-grid">'
+        + "\n".join(body)
+        + "</div>"
+        + chrome
+        + "</body></html>"
+    )
+
+
+def _time_backend(backend: str, html: str, *, repeat: int) -> float:
+    samples: list[float] = []
+    for _ in range(max(1, repeat)):
+        t0 = time_mod.perf_counter()
+        parse_listing(html, backend=backend)
+        samples.append(time_mod.perf_counter() - t0)
+    return statistics.median(samples)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=10, help="Cards on the synthetic listing page (site uses 10)")
+    parser.add_argument("--chrome-kb", type=int, default=60, help="Approx. KB of non-card markup around the cards")
+    parser.add_argument("--html", nargs="*", default=[], help="Additional saved listing pages to benchmark")
+    parser.add_argument("--repeat", type=int, default=30)
+    parser.add_argument("--backends", default=",".join(PARSER_BACKENDS))
+    parser.add_argument("--out", default=None, help="Optional JSON output path")
+    args = parser.parse_args()
+
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    if lxml_html is None and "lxml" in backends:
+        print("lxml not installed; skipping the lxml backend")
+        backends.remove("lxml")
+
+    fixture_paths = sorted(FIXTURES_DIR.glob("*.html"))
+    fixtures = [p.read_text(encoding="utf-8") for p in fixture_paths]
+    pages: list[tuple[str, str]] = [(p.name, html) for p, html in zip(fixture_paths, fixtures, strict=True)]
+    pages.append((f"synthetic({args.cards} cards)", _synthetic_page(fixtures, cards=args.cards, chrome_kb=args.chrome_kb)))
+    for path in args.html:
+        pages.append((Path(path).name, Path(path).read_text(encoding="utf-8")))
+
+    results: list[dict[str, Any]] = []
+    print(f"{'page':<28} {'KB':>6} {'cards':>5}  " + "  ".join(f"{b + ' ms':>10}" for b in backends) + "  identical")
+    for label, html in pages:
+        reference = parse_listing(html, backend="bs4")
+        identical = all(parse_listing(html, backend=b) == reference for b in backends)
+        timings = {b: _time_backend(b, html, repeat=args.repeat) for b in backends}
+        results.append(
+            {
+                "page": label,
+                "bytes": len(html.encode("utf-8")),
+                "cards": len(reference),
+                "identical": identical,
+                "ms_per_page": {b: 1000.0 * t for b, t in timings.items()},
+            }
+        )
+        print(
+            f"{label:<28} {len(html.encode('utf-8')) / 1024:>6.1f} {len(reference):>5}  "
+            + "  ".join(f"{1000.0 * timings[b]:>10.3f}" for b in backends)
+            + f"  {identical}"
+        )
+
+    if args.out:
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps({"results": results}, indent=2), encoding="utf-8")
+        print(f"\nWrote {out_path}")
+
+    if not all(r["identical"] for r in results):
+        raise SystemExit("Parser backends disagree (see 'identical' column)")
+
+
+if __name__ == "__main__":
+    main()
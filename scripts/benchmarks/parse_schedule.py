@@ -0,0 +1,68 @@
+"""
+Check the opening-hours parsers of `scripts.kaeltehilfe_schedule` on known `general_opening_hours` strings.
+
+Cases: `DAY_CASES` (text -> weekdays, 0 = Monday, from `parse_days`) and `TIME_CASES`
+(text -> (opening, closing, last entry) as "HH:MM" or None, from `parse_times`). Strings come from
+the listing/detail pages and from rows the schedule got wrong before; add a case with every fix.
+
+Prints each mismatch and exits non-zero if there is one.
+
+Usage:
+  python -m scripts.benchmarks.parse_schedule
+"""
+
+from __future__ import annotations
+
+from scripts.kaeltehilfe_schedule import parse_days, parse_times
+
+ALL_DAYS = {0, 1, 2, 3, 4, 5, 6}
+
+DAY_CASES: tuple[tuple[str, set[int]], ...] = (
+    ("01.10.25 - 30.4.26 I täglich I 18-08 Uhr I letzter Einlass: 20 Uhr", ALL_DAYS),
+    ("Mo-Fr", {0, 1, 2, 3, 4}),
+    ("Mo, Mi, Fr", {0, 2, 4}),
+    ("Sa/So", {5, 6}),
+    ("Fr-Mo", {4, 5, 6, 0}),
+    ("am Wochenende", {5, 6}),
+    ("Sonntag geschlossen", ALL_DAYS - {6}),
+    ("Mo-Fr I Sa/So geschlossen", {0, 1, 2, 3, 4}),
+    ("außer Mo I täglich 18-8 Uhr", ALL_DAYS - {0}),
+    # "i" in day names must not end the "außer"/"geschlossen" clause (only the " I " separator does).
+    ("täglich außer Mittwoch", ALL_DAYS - {2}),
+    ("Mo-So außer Di", ALL_DAYS - {1}),
+    ("Mo-Sa, Freitag geschlossen", {0, 1, 2, 3, 5}),
+    ("", ALL_DAYS),
+)
+
+TIME_CASES: tuple[tuple[str, tuple[str | None, str | None, str | None]], ...] = (
+    ("01.10.25 - 30.4.26 I täglich I 18-08 Uhr I letzter Einlass: 20 Uhr", ("18:00", "08:00", "20:00")),
+    ("täglich, 19–8 Uhr I Letzter Einlass um 23 Uhr", ("19:00", "08:00", "23:00")),
+    ("Mo-Fr 18:00-08:00", ("18:00", "08:00", None)),
+    ("01.10.25 - 30.4.26", (None, None, None)),
+)
+
+
+def _hhmm(minutes: int | None) -> str | None:
+    return None if minutes is None else f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def main() -> None:
+    failures: list[str] = []
+    for text, want_days in DAY_CASES:
+        got_days = parse_days(text)
+        if got_days != want_days:
+            failures.append(f"parse_days({text!r}) = {sorted(got_days)}, want {sorted(want_days)}")
+    for text, want_times in TIME_CASES:
+        got_times = tuple(_hhmm(m) for m in parse_times(text))
+        if got_times != want_times:
+            failures.append(f"parse_times({text!r}) = {got_times}, want {want_times}")
+
+    print(f"{len(DAY_CASES)} day cases, {len(TIME_CASES)} time cases, {len(failures)} failed")
+    for line in failures:
+        print(f"  ! {line}")
+    if failures:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Per-page benchmark of the PDF text layout step (`scripts.pdf_layout` vs the old double extraction
+with its fixed `width / 2` column split).
+
+Per page of `--pdf`:
+- parse:  pdfminer content-stream parsing into `page.chars` (shared by both paths, timed once)
+- legacy: `extract_text(layout=True)` + `extract_words()` + dict-of-lists line rendering
+          (what `_extract_page_text` did before)
+- numpy:  `_page_layout` + `_render_page_text` (XY-cut columns) on the same, already parsed page
+
+Checks that both paths produce the same words, marks pages whose text (reading order) changed,
+then reports the median of `--repeat` runs per page and the layout speedup. On spreads (page at
+least as wide as high) it also checks that no rendered line mixes words from both sides of the
+fold (one word ending left of the page centre and one starting right of it).
+
+With `--validate-dir` (page dumps from `extract_shelters_structured --dump-page-text-dir`,
+`page_<n>.txt`), the word order of both paths is scored against each dump (difflib ratio over
+whitespace-separated words); it fails if the numpy path reads worse than the legacy one.
+
+Usage:
+  python -m scripts.benchmarks.pdf_layout
+  python -m scripts.benchmarks.pdf_layout --pages 4-24 --repeat 20 --out tmp_logs/pdf_layout_bench.json
+  python -m scripts.benchmarks.pdf_layout --validate-dir tmp_pages
+"""
+
+from __future__ import annotations
+
+import argparse
+import difflib
+import json
+import statistics
+import time as time_mod
+from pathlib import Path
+from typing import Any, Callable
+
+import numpy as np
+import pdfplumber
+
+from scripts.pdf_layout import Words, layout_blocks
+from scripts.pdf_page_cache import PageLayout
+from scripts.pdf_text import _page_layout, _render_page_text
+
+
+def _legacy_page_text(page: pdfplumber.page.Page) -> str:
+    # Old `_extract_page_text` (before the single-pass engine), kept for comparison.
+    txt = (page.extract_text(layout=True, x_tolerance=2, y_tolerance=2) or "").strip()
+    words = page.extract_words() or []
+    if not words:
+        return txt
+
+    def render_word_block(block_words: list[dict]) -> str:
+        lines: dict[int, list[dict]] = {}
+        for w in block_words:
+            lines.setdefault(int(round(float(w.get("top", 0)))), []).append(w)
+        out_lines: list[str] = []
+        for top in sorted(lines.keys()):
+            line_words = sorted(lines[top], key=lambda w: float(w.get("x0", 0)))
+            out_lines.append(" ".join(w.get("text", "").strip() for w in line_words if w.get("text")))
+        return "\n".join(out_lines).strip()
+
+    mid_x = float(page.width) / 2.0 if page.width else None
+    if mid_x is not None:
+        left = [w for w in words if float(w.get("x0", 0)) < mid_x]
+        right = [w for w in words if float(w.get("x0", 0)) >= mid_x]
+        total = len(words) or 1
+        if len(left) / total > 0.2 and len(right) / total > 0.2:
+            combined = (render_word_block(left) + "\n\n" + render_word_block(right)).strip()
+            if combined:
+                return combined
+    rendered = render_word_block(words)
+    return rendered if rendered else txt
+
+
+def _fold_mixed_lines(layout: PageLayout) -> list[str] | None:
+    """
+    Rendered lines with words on both sides of a spread's fold; None if the page is no spread.
+    """
+    if not layout.width or not layout.height or layout.width < layout.height:
+        return None
+    words = Words.from_dicts(layout.words)
+    mid = layout.width / 2.0
+    mixed: list[str] = []
+    for block in layout_blocks(words, width=layout.width):
+        sub = words.take(block)
+        line = np.rint(sub.top)
+        for value in np.unique(line):
+            on_line = line == value
+            if (sub.x1[on_line] <= mid).any() and (sub.x0[on_line] >= mid).any():
+                mixed.append(" ".join(t for t, keep in zip(sub.text, on_line.tolist(), strict=True) if keep))
+    return mixed
+
+
+def _order_score(reference: str, text: str) -> float:
+    return difflib.SequenceMatcher(None, reference.split(), text.split(), autojunk=False).ratio()
+
+
+def _median_s(fn: Callable[[], Any], *, repeat: int, before: Callable[[], None] | None = None) -> float:
+    samples: list[float] = []
+    for _ in range(max(1, repeat)):
+        if before is not None:
+            before()
+        t0 = time_mod.perf_counter()
+        fn()
+        samples.append(time_mod.perf_counter() - t0)
+    return statistics.median(samples)
+
+
+def _parse_pages(spec: str | None, total: int) -> list[int]:
+    if not spec:
+        return list(range(1, total + 1))
+    out: set[int] = set()
+    for part in spec.split(","):
+        a, _, b = part.strip().partition("-")
+        out.update(range(int(a), int(b or a) + 1))
+    return sorted(n for n in out if 1 <= n <= total)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", default="shelter.pdf")
+    parser.add_argument("--pages", default=None, help="e.g. 4-24 or 1,5,15 (default: all)")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--out", default=None, help="Optional JSON output path")
+    parser.add_argument("--validate-dir", default=None, help="Folder with page_<n>.txt dumps to score reading order against")
+    args = parser.parse_args()
+
+    results: list[dict[str, Any]] = []
+    with pdfplumber.open(args.pdf) as pdf:
+        page_numbers = _parse_pages(args.pages, len(pdf.pages))
+        print(f"{'page':>4} {'chars':>6} {'parse ms':>10} {'legacy ms':>10} {'numpy ms':>10} {'speedup':>8}  same words / text / fold ok")
+        for n in page_numbers:
+            page = pdf.pages[n - 1]
+            t0 = time_mod.perf_counter()
+            chars = page.chars
+            parse_s = time_mod.perf_counter() - t0
+
+            legacy_text = _legacy_page_text(page)
+            layout = _page_layout(page)
+            numpy_text = _render_page_text(layout)
+            mixed = _fold_mixed_lines(layout)
+            same_words = sorted(legacy_text.split()) == sorted(numpy_text.split())
+            same_text = legacy_text == numpy_text
+            # `get_textmap` is memoized per page; clear it so every legacy run lays out again.
+            legacy_s = _median_s(lambda: _legacy_page_text(page), repeat=args.repeat, before=page.get_textmap.cache_clear)
+            numpy_s = _median_s(lambda: _render_page_text(_page_layout(page)), repeat=args.repeat)
+            speedup = legacy_s / numpy_s if numpy_s > 0 else float("inf")
+            results.append(
+                {
+                    "page": n,
+                    "chars": len(chars),
+                    "parse_ms": 1000.0 * parse_s,
+                    "legacy_ms": 1000.0 * legacy_s,
+                    "numpy_ms": 1000.0 * numpy_s,
+                    "speedup": speedup,
+                    "same_words": same_words,
+                    "same_text": same_text,
+                    "fold_mixed_lines": mixed,
+                }
+            )
+            dump = Path(args.validate_dir) / f"page_{n}.txt" if args.validate_dir else None
+            if dump is not None and dump.exists():
+                reference = dump.read_text(encoding="utf-8")
+                results[-1]["order_score"] = {"legacy": _order_score(reference, legacy_text), "numpy": _order_score(reference, numpy_text)}
+            print(
+                f"{n:>4} {len(chars):>6} {1000.0 * parse_s:>10.2f} {1000.0 * legacy_s:>10.3f} {1000.0 * numpy_s:>10.3f} "
+                f"{speedup:>7.1f}x  {same_words} / {same_text} / {'-' if mixed is None else not mixed}"
+            )
+            page.close()
+
+    legacy_total = sum(r["legacy_ms"] for r in results)
+    numpy_total = sum(r["numpy_ms"] for r in results)
+    parse_total = sum(r["parse_ms"] for r in results)
+    print(
+        f"\nlayout total: legacy {legacy_total:.1f} ms, numpy {numpy_total:.1f} ms "
+        f"({legacy_total / numpy_total if numpy_total else 0:.1f}x); pdfminer parse {parse_total:.1f} ms"
+    )
+
+    if args.out:
+        out_path = Path(args.out)
+        out_path.parent.mkdir(parents=True, exist_ok=True)
+        out_path.write_text(json.dumps({"pdf": args.pdf, "results": results}, indent=2), encoding="utf-8")
+        print(f"Wrote {out_path}")
+
+    scored = [r for r in results if "order_score" in r]
+    for r in scored:
+        print(f"page {r['page']}: reading order vs dump: legacy {r['order_score']['legacy']:.3f}, numpy {r['order_score']['numpy']:.3f}")
+    if args.validate_dir and not scored:
+        print(f"No page_<n>.txt dumps for these pages in {args.validate_dir}")
+
+    for r in results:
+        for line in r["fold_mixed_lines"] or []:
+            print(f"page {r['page']}: line across the fold: {line}")
+
+    if not all(r["same_words"] for r in results):
+        raise SystemExit("Words differ between legacy and numpy layout (see 'same words' column)")
+    if any(r["order_score"]["numpy"] < r["order_score"]["legacy"] for r in scored):
+        raise SystemExit("Numpy reading order matches the page dumps worse than legacy (see order scores)")
+    if any(r["fold_mixed_lines"] for r in results):
+        raise SystemExit("Lines mix text from both sides of a spread's fold (see above)")
+
+
+if __name__ == "__main__":
+    main()
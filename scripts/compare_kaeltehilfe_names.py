@@ -27,15 +27,9 @@ from pathlib import Path
 from typing import Any
 
 from scripts.env import load_dotenv
-from scripts.scrape_kaeltehilfe_capacity import (
-    NOTUEBERNACHTUNG_LIST_URL,
-    _best_offer_match,
-    _http_get,
-    _normalize_name,
-    _scrape_page,
-    fetch_db_unterkuenfte,
-    get_supabase_config,
-)
+from scripts.kaeltehilfe_db import fetch_db_unterkuenfte, get_supabase_config
+from scripts.kaeltehilfe_listing import NOTUEBERNACHTUNG_LIST_URL, _http_get, _scrape_page
+from scripts.kaeltehilfe_match import OfferMatcher, _normalize_name
 
 logger = logging.getLogger("compare_kaeltehilfe_names")
 
@@ -139,21 +133,17 @@ def main() -> None:
         for o in p["offers"]:
             all_offers.append(
                 # Minimal shape compatible with ScrapedOffer usage inside matcher:
-                # we only use .name and .url for matching in _best_offer_match.
+                # OfferMatcher only uses .name and .url.
                 type("Offer", (), {"name": o["name"], "url": o.get("url")})()  # type: ignore
             )
 
-    offers_by_norm = {}
-    for o in all_offers:
-        k = _normalize_name(o.name)
-        if k and k not in offers_by_norm:
-            offers_by_norm[k] = o
+    matcher = OfferMatcher(all_offers)
 
     # Suggested matches
     matches = []
     unmatched = []
     for r in db_names:
-        offer, kind = _best_offer_match(db_name=r["name"], offers=all_offers, offers_by_norm=offers_by_norm)  # type: ignore[arg-type]
+        offer, kind = matcher.match(r["name"])
         if offer is None:
             unmatched.append(r)
         else:
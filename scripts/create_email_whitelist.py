@@ -22,14 +22,10 @@ import logging
 from pathlib import Path
 from typing import Any
 
-try:
-    import requests
-except ModuleNotFoundError:  # pragma: no cover
-    requests = None  # type: ignore
-
 # Allow running as module or directly
 try:
     from scripts.env import load_dotenv
+    from scripts.supabase_rest import get_client
 except ModuleNotFoundError:
     import sys
 
@@ -37,6 +33,7 @@ except ModuleNotFoundError:
     if str(repo_root) not in sys.path:
         sys.path.insert(0, str(repo_root))
     from scripts.env import load_dotenv
+    from scripts.supabase_rest import get_client
 
 import os
 
@@ -66,24 +63,12 @@ def fetch_unterkuenfte_with_emails(url: str, key: str) -> list[dict[str, Any]]:
     Fetch all unterkuenfte that have at least one email.
     Returns list of {id, email} where email is string[].
     """
-    if requests is None:
-        raise RuntimeError(
-            "Missing dependency: requests. Install requirements.txt (or pip install requests)."
-        )
-    endpoint = f"{url}/rest/v1/unterkuenfte"
     params = {
         "select": "id,email",
         # Filter: email array is not empty. (Avoid scanning every row when email defaults to '{}'.)
         "email": "not.eq.{}",
     }
-    headers = {
-        "apikey": key,
-        "Authorization": f"Bearer {key}",
-        "Content-Type": "application/json",
-    }
-    resp = requests.get(endpoint, params=params, headers=headers, timeout=30)
-    resp.raise_for_status()
-    return resp.json()
+    return get_client(url, key).select("unterkuenfte", params, timeout_s=30)
 
 
 def fetch_existing_whitelist(url: str, key: str) -> set[tuple[str, str]]:
@@ -91,20 +76,8 @@ def fetch_existing_whitelist(url: str, key: str) -> set[tuple[str, str]]:
     Fetch all existing (unterkunft_id, email) pairs from whitelist.
     Returns a set of tuples for fast lookup.
     """
-    if requests is None:
-        raise RuntimeError(
-            "Missing dependency: requests. Install requirements.txt (or pip install requests)."
-        )
-    endpoint = f"{url}/rest/v1/unterkunft_email_whitelist"
     params = {"select": "unterkunft_id,email"}
-    headers = {
-        "apikey": key,
-        "Authorization": f"Bearer {key}",
-        "Content-Type": "application/json",
-    }
-    resp = requests.get(endpoint, params=params, headers=headers, timeout=30)
-    resp.raise_for_status()
-    rows = resp.json()
+    rows = get_client(url, key).select("unterkunft_email_whitelist", params, timeout_s=30)
     return {(r["unterkunft_id"], r["email"].lower().strip()) for r in rows}
 
 
@@ -115,20 +88,7 @@ def insert_whitelist_records(
     Insert whitelist records via Supabase REST API.
     records: list of {unterkunft_id, email}
     """
-    if requests is None:
-        raise RuntimeError(
-            "Missing dependency: requests. Install requirements.txt (or pip install requests)."
-        )
-    endpoint = f"{url}/rest/v1/unterkunft_email_whitelist"
-    headers = {
-        "apikey": key,
-        "Authorization": f"Bearer {key}",
-        "Content-Type": "application/json",
-        "Prefer": "return=representation",
-    }
-    resp = requests.post(endpoint, json=records, headers=headers, timeout=60)
-    resp.raise_for_status()
-    return resp.json()
+    return get_client(url, key).insert("unterkunft_email_whitelist", records, returning=True)
 
 
 def main() -> None:
@@ -15,16 +15,18 @@ from pydantic import BaseModel
 # and (fallback):
 #   python scripts/extract_shelters_structured.py
 try:
-    from scripts.openai_structured import call_openai_structured
-    from scripts.pdf_text import pdf_to_pages_text
+    from scripts.openai_structured import DEFAULT_RETRIES, map_openai_structured
+    from scripts.pdf_page_cache import PdfPageCache
+    from scripts.pdf_text import extract_pages_text, pdf_page_count
 except ModuleNotFoundError:  # pragma: no cover
     import sys
 
     repo_root = Path(__file__).resolve().parents[1]
     if str(repo_root) not in sys.path:
         sys.path.insert(0, str(repo_root))
-    from scripts.openai_structured import call_openai_structured
-    from scripts.pdf_text import pdf_to_pages_text
+    from scripts.openai_structured import DEFAULT_RETRIES, map_openai_structured
+    from scripts.pdf_page_cache import PdfPageCache
+    from scripts.pdf_text import extract_pages_text, pdf_page_count
 
 
 def _load_schema(schema_ref: str) -> Type[BaseModel]:
@@ -129,7 +131,26 @@ def main() -> None:
     parser.add_argument("--start-page", type=int, default=4, help="1-indexed, inclusive")
     parser.add_argument("--end-page", type=int, default=24, help="1-indexed, inclusive")
     parser.add_argument("--min-page-chars", type=int, default=0, help="Skip pages with less extracted text")
+    parser.add_argument(
+        "--pdf-workers",
+        type=int,
+        default=None,
+        help="Processes for PDF text extraction (default: one per CPU; 1 = in-process)",
+    )
+    parser.add_argument(
+        "--page-cache",
+        default=str(Path(__file__).resolve().parent / "pdf_page_cache"),
+        help="Cache of extracted page text/word boxes, keyed by PDF content hash (skips pdfplumber on repeat runs)",
+    )
+    parser.add_argument("--no-page-cache", action="store_true", help="Always extract pages from the PDF")
     parser.add_argument("--max-output-tokens", type=int, default=8000)
+    parser.add_argument(
+        "--llm-concurrency",
+        type=int,
+        default=4,
+        help="OpenAI calls in flight at once (1 = page by page); results are merged in page order",
+    )
+    parser.add_argument("--llm-retries", type=int, default=DEFAULT_RETRIES, help="Retries per call on 429/5xx/connection errors")
     parser.add_argument(
         "--dump-page-text-dir",
         default=None,
@@ -151,15 +172,20 @@ def main() -> None:
     schema_cls = _load_schema(args.schema)
     logger.info("Schema: %s", args.schema)
     logger.info("Model: %s", args.model)
-    pages = pdf_to_pages_text(args.pdf)
-    logger.info("PDF pages: %s (%s)", len(pages), args.pdf)
+    page_count = pdf_page_count(args.pdf)
+    logger.info("PDF pages: %s (%s)", page_count, args.pdf)
 
     start = max(1, args.start_page)
-    end = min(len(pages), args.end_page)
+    end = min(page_count, args.end_page)
     if start > end:
-        raise ValueError(f"Invalid page range: start={args.start_page} end={args.end_page} for pdf with {len(pages)} pages")
+        raise ValueError(f"Invalid page range: start={args.start_page} end={args.end_page} for pdf with {page_count} pages")
 
     logger.info("Processing pages %s..%s (inclusive)", start, end)
+    # Only the requested range is opened and laid out.
+    page_cache = None if args.no_page_cache else PdfPageCache(args.page_cache)
+    pages = extract_pages_text(args.pdf, range(start, end + 1), workers=args.pdf_workers, cache=page_cache)
+    if page_cache is not None:
+        logger.info("Page cache: %s hits, %s extracted (%s)", page_cache.hits, page_cache.misses, page_cache.root)
 
     dump_dir: Path | None = None
     if args.dump_page_text_dir:
@@ -168,12 +194,12 @@ def main() -> None:
         logger.info("Dumping extracted page text to: %s", dump_dir)
 
     merged: list[dict] = []
-    called = 0
     skipped = 0
+    to_call: list[tuple[int, str]] = []
 
     for page_no in range(start, end + 1):
-        logger.info("Page %s/%s (range %s..%s)", page_no, len(pages), start, end)
-        page_text = (pages[page_no - 1] or "").strip()
+        logger.info("Page %s/%s (range %s..%s)", page_no, page_count, start, end)
+        page_text = (pages[page_no] or "").strip()
         logger.info("Page %s: extracted text chars=%s", page_no, len(page_text))
 
         if dump_dir is not None:
@@ -200,17 +226,23 @@ def main() -> None:
         if args.only_dump_pages:
             continue
 
-        called += 1
-        logger.info("Calling OpenAI (page %s, %s chars)", page_no, len(page_text))
-
-        parsed = call_openai_structured(
-            schema=schema_cls,
-            user_text=f"PAGE {page_no}\n\n{page_text}",
-            system_prompt=DEFAULT_SYSTEM_PROMPT + "\n\nExtrahiere nur Unterkünfte, die auf DIESER Seite stehen. Leere Liste ist erlaubt.",
-            model=args.model,
-            max_output_tokens=args.max_output_tokens,
-        )
+        to_call.append((page_no, page_text))
+
+    called = len(to_call)
+    if to_call:
+        logger.info("Calling OpenAI for %s pages (%s at a time)", called, max(1, args.llm_concurrency))
+    results = map_openai_structured(
+        (f"PAGE {page_no}\n\n{page_text}" for page_no, page_text in to_call),
+        schema=schema_cls,
+        system_prompt=DEFAULT_SYSTEM_PROMPT + "\n\nExtrahiere nur Unterkünfte, die auf DIESER Seite stehen. Leere Liste ist erlaubt.",
+        concurrency=args.llm_concurrency,
+        model=args.model,
+        max_output_tokens=args.max_output_tokens,
+        retries=max(0, args.llm_retries),
+    )
 
+    # Results come back in page order, whatever order the calls finish in.
+    for (page_no, _), parsed in zip(to_call, results):
         parsed_dict = _to_jsonable(parsed)
         entries = _as_list(parsed_dict, "unterkuenfte")
         logger.info("Page %s: extracted %s unterkuenfte", page_no, len(entries))
@@ -0,0 +1,842 @@
+"""
+Local stand-ins for the upstreams of the scripts: Kaeltehilfe site, Photon geocoder, Supabase PostgREST,
+OpenAI Structured Outputs.
+
+Why:
+- The scraper, the coordinate backfill and the one-time import talk to live services, so their
+  performance could only be measured against production (at production size).
+- These fakes serve a generated dataset of any size with configurable latency and faults, so whole
+  runs can be load-tested offline (see `scripts.benchmarks.e2e_load`).
+
+Services (one port each, so per-host metrics stay separate):
+- kaeltehilfe  `/angebote/filter/<id>?start=N`: 10-card listing pages built from the
+               `scripts/html/*.html` fixtures (renamed per offer, status per fixture), with
+               pagination links and ETag/304; `/kaeltehilfe-angebot/<slug>`: offer detail pages.
+               With `--change-period-s`, `--change-rate` of the statuses change every period.
+- photon       `/api/?q=...`: canned responses (`--photon-canned`, JSON {query: response}), else a
+               deterministic point inside the Berlin bbox (`--photon-miss-rate` of queries find nothing).
+- postgrest    `/rest/v1/<table>`: GET (select / eq / neq / in / is / not. filters, order, limit,
+               offset), PATCH, POST for `unterkuenfte` (generated rows matching the offers) and
+               `scrape_runs`; `/rest/v1/rpc/apply_kaeltehilfe_capacity|apply_kaeltehilfe_details`.
+- openai       `POST /v1/responses` with a strict JSON schema (`text.format`, as sent by
+               `responses.parse`): a schema-valid answer built from the schema and the user text
+               (one item of the top-level array per upper-case heading line, `name` = heading,
+               `adresse` = the line below; other nullable fields null). Same request, same answer.
+               `--openai-ms-per-token` adds latency per output token (LLM-like).
+
+Faults (all services, or per service with `--service-faults photon:error_rate=0.2,latency_ms=300`):
+  latency_ms + uniform jitter_ms, slow_rate of requests get slow_ms more, error_rate answer 503,
+  throttle_rate answer 429 with `Retry-After: 1`.
+
+The scripts are pointed at the fakes through environment variables (read at import time):
+  KAELTEHILFE_BASE_URL, PHOTON_URL, NEXT_PUBLIC_SUPABASE_URL, SUPABASE_SERVICE_ROLE_KEY,
+  OPENAI_BASE_URL, OPENAI_API_KEY
+
+Usage:
+  python -m scripts.fake_upstreams --scale 100 --latency-ms 80 --jitter-ms 40 --error-rate 0.01
+  # prints the `export ...` lines for another shell; Ctrl-C prints request counts per service
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import logging
+import random
+import re
+import threading
+import time as time_mod
+import uuid
+from collections import Counter
+from dataclasses import dataclass, fields, replace
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable
+from urllib.parse import parse_qsl, urlsplit
+
+try:
+    from scripts.kaeltehilfe_parse import parse_listing
+except ModuleNotFoundError:  # pragma: no cover
+    import sys
+
+    repo_root = Path(__file__).resolve().parents[1]
+    if str(repo_root) not in sys.path:
+        sys.path.insert(0, str(repo_root))
+    from scripts.kaeltehilfe_parse import parse_listing
+
+logger = logging.getLogger("fake_upstreams")
+
+FIXTURES_DIR = Path(__file__).resolve().parent / "html"
+EXTRACTION_PATH = Path(__file__).resolve().parents[1] / "shelters.structured.json"
+SERVICES = ("kaeltehilfe", "photon", "postgrest", "openai")
+
+# Size of the real data when this was written (listing offers, DB rows, PDF extraction entries).
+TODAY_OFFERS = 50
+TODAY_ROWS = 50
+TODAY_ENTRIES = 34
+
+PAGE_SIZE = 10
+# Berlin bounding box: minLon,minLat,maxLon,maxLat (same as the geocoding scripts)
+BERLIN_BBOX = (13.0884, 52.3383, 13.7611, 52.6755)
+# Fixture file -> listing status it shows.
+_FIXTURE_STATUS = {"has_capacity.html": "plenty", "little_capacity.html": "little", "no_capacity.html": "none"}
+_STATUSES = ("plenty", "little", "none")
+_STREETS = ("Kopenhagener", "Frankfurter", "Turm", "Linien", "Wiener", "Berliner", "Kurfürsten", "Mühlen", "Garten", "Schloss")
+_STREET_KINDS = ("straße", "allee", "weg", "platz", "damm")
+_PREFIXES = ("Notübernachtung", "Nachtcafé", "Frauennotübernachtung", "Notunterkunft")
+
+
+@dataclass(frozen=True)
+class Faults:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    slow_rate: float = 0.0
+    slow_ms: float = 0.0
+    error_rate: float = 0.0
+    throttle_rate: float = 0.0
+
+    def with_overrides(self, spec: str) -> "Faults":
+        """
+        `key=value,key=value` (keys are the field names) applied on top of these faults.
+        """
+        known = {f.name for f in fields(self)}
+        values: dict[str, float] = {}
+        for part in (p.strip() for p in spec.split(",") if p.strip()):
+            k, sep, v = part.partition("=")
+            if not sep or k.strip() not in known:
+                raise ValueError(f"Invalid fault {part!r} (known: {', '.join(sorted(known))})")
+            values[k.strip()] = float(v)
+        return replace(self, **values)
+
+
+def _slug(text: str) -> str:
+    s = text.lower().replace("ä", "ae").replace("ö", "oe").replace("ü", "ue").replace("ß", "ss").replace("é", "e")
+    return re.sub(r"[^a-z0-9]+", "-", s).strip("-")
+
+
+def _h(*parts: Any) -> float:
+    """
+    Deterministic pseudo-random number in [0, 1) for the given key.
+    """
+    digest = hashlib.sha1("|".join(str(p) for p in parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big") / 2**64
+
+
+class FakeDataset:
+    """
+    Offers of the fake listing and the matching `unterkuenfte` rows (shared, mutable DB state).
+    """
+
+    def __init__(
+        self,
+        *,
+        offers: int,
+        rows: int,
+        seed: int = 7,
+        change_period_s: float = 0.0,
+        change_rate: float = 0.0,
+        missing_coords_rate: float = 0.5,
+    ) -> None:
+        self.seed = seed
+        self.change_period_s = change_period_s
+        self.change_rate = change_rate
+        self._templates = self._load_templates()
+
+        rng = random.Random(seed)
+        self.offers: list[dict[str, Any]] = []
+        for i in range(offers):
+            street = f"{rng.choice(_STREETS)}{rng.choice(_STREET_KINDS)}"
+            name = f"{rng.choice(_PREFIXES)} {street} {i + 1}"
+            self.offers.append(
+                {
+                    "name": name,
+                    "slug": f"{_slug(name)}-{i + 1}",
+                    "status": _STATUSES[rng.randrange(len(_STATUSES))],
+                    "adresse": f"{street} {rng.randint(1, 120)}, 1{rng.randint(1000, 4999)} Berlin",
+                }
+            )
+
+        self.lock = threading.Lock()
+        self.tables: dict[str, list[dict[str, Any]]] = {"unterkuenfte": [], "scrape_runs": []}
+        self._next_run_id = 1
+        for i in range(rows):
+            if i < len(self.offers):
+                o = self.offers[i]
+                # Most DB names equal the listing name; some differ like hand-typed names do.
+                name = o["name"] if rng.random() < 0.9 else o["name"].replace("Notübernachtung", "Notüb.").replace("straße", "str.")
+                adresse = o["adresse"]
+            else:
+                name = f"Unterkunft {rng.choice(_STREETS)}weg {i + 1}"
+                adresse = f"{rng.choice(_STREETS)}weg {rng.randint(1, 120)}, 1{rng.randint(1000, 4999)} Berlin"
+            has_coords = rng.random() >= missing_coords_rate
+            self.tables["unterkuenfte"].append(
+                {
+                    "id": str(uuid.uuid5(uuid.NAMESPACE_URL, f"fake-unterkunft-{seed}-{i}")),
+                    "name": name,
+                    "typ": "notuebernachtung",
+                    "is_mobile": False,
+                    "adresse": adresse,
+                    "strasse": adresse.split(",", 1)[0],
+                    "lat": round(52.52 + rng.uniform(-0.1, 0.1), 6) if has_coords else None,
+                    "lng": round(13.40 + rng.uniform(-0.2, 0.2), 6) if has_coords else None,
+                    "oeffnung_von": "19:00:00",
+                    "oeffnung_bis": "08:00:00",
+                    "letzter_einlass": "23:00:00",
+                    "general_opening_hours": "täglich 19-08 Uhr",
+                    "kaeltehilfe_capacity_status": None,
+                    "kaeltehilfe_capacity_status_men": None,
+                    "kaeltehilfe_capacity_status_women": None,
+                    "kaeltehilfe_capacity_status_diverse": None,
+                    "kaeltehilfe_capacity_url": None,
+                    "kaeltehilfe_details": None,
+                }
+            )
+
+    @staticmethod
+    def _load_templates() -> dict[str, tuple[str, str, str]]:
+        """
+        Listing status -> (card html, its offer slug path, its offer name).
+        """
+        out: dict[str, tuple[str, str, str]] = {}
+        for file_name, status in _FIXTURE_STATUS.items():
+            html = (FIXTURES_DIR / file_name).read_text(encoding="utf-8")
+            parsed = parse_listing(html)
+            if not parsed or not parsed[0].url:
+                raise RuntimeError(f"Fixture without an offer card: {file_name}")
+            out[status] = (html, urlsplit(parsed[0].url).path, parsed[0].name)
+        return out
+
+    def status_of(self, i: int, now: float | None = None) -> str:
+        status = self.offers[i]["status"]
+        if self.change_period_s > 0 and self.change_rate > 0:
+            epoch = int((now if now is not None else time_mod.time()) // self.change_period_s)
+            if _h(self.seed, i, epoch) < self.change_rate:
+                status = _STATUSES[int(_h(self.seed, i, epoch, "to") * len(_STATUSES))]
+        return status
+
+    def _card(self, i: int) -> str:
+        o = self.offers[i]
+        html, path, name = self._templates[self.status_of(i)]
+        return html.replace(path, f"/kaeltehilfe-angebot/{o['slug']}").replace(name, o["name"])
+
+    def listing_page(self, start: int) -> str:
+        cards = "\n".join(self._card(i) for i in range(max(0, start), min(len(self.offers), start + PAGE_SIZE)))
+        last_start = max(0, (len(self.offers) - 1) // PAGE_SIZE * PAGE_SIZE)
+        links = "".join(f'<li><a href="?start={s}">{s // PAGE_SIZE + 1}</a></li>' for s in range(0, last_start + 1, PAGE_SIZE))
+        return (
+            '<!DOCTYPE html><html lang="de"><head><meta charset="utf-8"><title>Angebote</title></head><body>'
+            f'<div class="uk-grid">{cards}</div><ul class="uk-pagination">{links}</ul></body></html>'
+        )
+
+    def detail_page(self, slug: str) -> str | None:
+        idx = next((i for i, o in enumerate(self.offers) if o["slug"] == slug), None)
+        if idx is None:
+            return None
+        o = self.offers[idx]
+        alt = {"plenty": "Viele Plätze verfügbar", "little": "Wenige Plätze verfügbar", "none": "Keine Plätze verfügbar"}[self.status_of(idx)]
+        places = 20 + idx % 60
+        return (
+            '<!DOCTYPE html><html lang="de"><head><meta charset="utf-8"></head><body>'
+            f'<h1>{o["name"]}</h1><div class="el-meta">Träger: Fake e.V.</div>'
+            f'<div class="fs-grid-text"><img alt="{alt}" src="/images/ampel.png"></div>'
+            '<div class="fs-grid-text"><img src="/images/icons/alarm-outline.svg"> täglich, 19–8 Uhr I Letzter Einlass um 23 Uhr</div>'
+            f'<div class="fs-grid-text"><img src="/images/icons/location-outline.svg"> {o["adresse"]}</div>'
+            f'<div class="fs-grid-text"><img src="/images/icons/call-outline.svg"> <a href="tel:030 {1000000 + idx}">030 {1000000 + idx}</a></div>'
+            f'<div class="fs-grid-text">{places} Plätze für alle Geschlechter</div>'
+            "</body></html>"
+        )
+
+    def insert(self, table: str, row: dict[str, Any]) -> dict[str, Any]:
+        row = dict(row)
+        if table == "scrape_runs":
+            row.setdefault("status", "running")
+            row.setdefault("started_at", datetime.now(timezone.utc).isoformat())
+            row["id"] = self._next_run_id
+            self._next_run_id += 1
+        else:
+            row.setdefault("id", str(uuid.uuid4()))
+        self.tables.setdefault(table, []).append(row)
+        return row
+
+
+# --- PostgREST query subset ----------------------------------------------------------------
+
+_RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+
+def _pg_text(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _filter(column: str, expr: str) -> Callable[[dict[str, Any]], bool]:
+    negate = expr.startswith("not.")
+    if negate:
+        expr = expr[len("not.") :]
+    op, _, arg = expr.partition(".")
+    if op == "eq":
+        test: Callable[[Any], bool] = lambda v: _pg_text(v) == arg  # noqa: E731
+    elif op == "neq":
+        test = lambda v: v is not None and _pg_text(v) != arg  # noqa: E731
+    elif op == "in":
+        values = {a.strip().strip('"') for a in arg.strip("()").split(",")}
+        test = lambda v: _pg_text(v) in values  # noqa: E731
+    elif op == "is":
+        test = lambda v: _pg_text(v) == arg  # noqa: E731
+    else:
+        raise ValueError(f"Unsupported filter operator: {op}")
+    return (lambda r: not test(r.get(column))) if negate else (lambda r: test(r.get(column)))
+
+
+def select_rows(rows: list[dict[str, Any]], params: list[tuple[str, str]]) -> list[dict[str, Any]]:
+    preds = [_filter(k, v) for k, v in params if k not in _RESERVED_PARAMS]
+    out = [r for r in rows if all(p(r) for p in preds)]
+    q = dict(params)
+    for spec in reversed([s for s in q.get("order", "").split(",") if s]):
+        col, _, direction = spec.partition(".")
+        desc = direction.startswith("desc")
+        with_value = [r for r in out if r.get(col) is not None]
+        nulls = [r for r in out if r.get(col) is None]
+        with_value.sort(key=lambda r: r[col], reverse=desc)
+        out = with_value + nulls
+    offset = int(q.get("offset") or 0)
+    limit = int(q["limit"]) if q.get("limit") else None
+    out = out[offset : offset + limit if limit is not None else None]
+    select = q.get("select", "*")
+    if select != "*":
+        cols = [c.strip() for c in select.split(",") if c.strip()]
+        out = [{c: r.get(c) for c in cols} for r in out]
+    return out
+
+
+# --- HTTP servers ------------------------------------------------------------------------------
+
+
+class _FakeServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, addr: tuple[str, int], handler: type[BaseHTTPRequestHandler], *, name: str, faults: Faults, dataset: FakeDataset, seed: int) -> None:
+        super().__init__(addr, handler)
+        self.name = name
+        self.faults = faults
+        self.dataset = dataset
+        self.stats: Counter[str] = Counter()
+        self.stats_lock = threading.Lock()
+        self.rng = random.Random(f"{seed}-{name}")
+        self.rng_lock = threading.Lock()
+        self.photon_canned: dict[str, Any] = {}
+        self.photon_miss_rate = 0.0
+        self.openai_ms_per_token = 0.0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: _FakeServer
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        logger.debug("%s %s", self.server.name, format % args)
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self.server.stats_lock:
+            self.server.stats[key] += n
+
+    def _send(self, status: int, body: bytes = b"", *, content_type: str = "application/json", headers: dict[str, str] | None = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if body and self.command != "HEAD":
+            self.wfile.write(body)
+        self._count("requests")
+        self._count(f"status_{status}")
+        self._count("bytes_out", len(body))
+
+    def _send_json(self, status: int, value: Any, *, headers: dict[str, str] | None = None) -> None:
+        self._send(status, json.dumps(value, ensure_ascii=False).encode("utf-8"), headers=headers)
+
+    def _read_json(self) -> Any:
+        n = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(n)) if n else None
+
+    def _inject_faults(self) -> bool:
+        """
+        Sleep the configured latency; returns True if a fault response was sent.
+        """
+        f = self.server.faults
+        with self.server.rng_lock:
+            r_jitter, r_slow, r_fail = self.server.rng.random(), self.server.rng.random(), self.server.rng.random()
+        delay_ms = f.latency_ms + r_jitter * f.jitter_ms + (f.slow_ms if r_slow < f.slow_rate else 0.0)
+        if delay_ms > 0:
+            time_mod.sleep(delay_ms / 1000.0)
+        if r_fail < f.error_rate:
+            if self.command in ("POST", "PATCH"):
+                self._read_json()
+            self._send_json(503, {"message": "fake upstream error"})
+            return True
+        if r_fail < f.error_rate + f.throttle_rate:
+            if self.command in ("POST", "PATCH"):
+                self._read_json()
+            self._send_json(429, {"message": "fake rate limit"}, headers={"Retry-After": "1"})
+            return True
+        return False
+
+
+class _KaeltehilfeHandler(_Handler):
+    def do_GET(self) -> None:  # noqa: N802
+        if self._inject_faults():
+            return
+        parts = urlsplit(self.path)
+        ds = self.server.dataset
+        if parts.path.startswith("/angebote/filter/"):
+            start = int(dict(parse_qsl(parts.query)).get("start") or 0)
+            html = ds.listing_page(start)
+        elif parts.path.startswith("/kaeltehilfe-angebot/"):
+            page = ds.detail_page(parts.path.rsplit("/", 1)[-1])
+            if page is None:
+                self._send(404, b"not found", content_type="text/plain")
+                return
+            html = page
+        else:
+            self._send(404, b"not found", content_type="text/plain")
+            return
+        body = html.encode("utf-8")
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()[:16]
+        if self.headers.get("If-None-Match") == etag:
+            self._send(304, headers={"ETag": etag})
+            return
+        self._send(200, body, content_type="text/html; charset=utf-8", headers={"ETag": etag})
+
+
+class _PhotonHandler(_Handler):
+    def do_GET(self) -> None:  # noqa: N802
+        if self._inject_faults():
+            return
+        q = dict(parse_qsl(urlsplit(self.path).query)).get("q", "")
+        canned = self.server.photon_canned.get(q)
+        if canned is not None:
+            self._send_json(200, canned)
+            return
+        if not q or _h("photon-miss", q) < self.server.photon_miss_rate:
+            self._send_json(200, {"type": "FeatureCollection", "features": []})
+            return
+        min_lon, min_lat, max_lon, max_lat = BERLIN_BBOX
+        lon = round(min_lon + _h("lon", q) * (max_lon - min_lon), 6)
+        lat = round(min_lat + _h("lat", q) * (max_lat - min_lat), 6)
+        feature = {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [lon, lat]},
+            "properties": {"name": q, "city": "Berlin", "countrycode": "DE"},
+        }
+        self._send_json(200, {"type": "FeatureCollection", "features": [feature]})
+
+
+class _PostgrestHandler(_Handler):
+    _RPC_PREFIX = "/rest/v1/rpc/"
+    _TABLE_PREFIX = "/rest/v1/"
+    _RPC_COLUMNS = {
+        "apply_kaeltehilfe_capacity": (
+            "kaeltehilfe_capacity_status",
+            "kaeltehilfe_capacity_status_men",
+            "kaeltehilfe_capacity_status_women",
+            "kaeltehilfe_capacity_status_diverse",
+            "kaeltehilfe_capacity_url",
+            "kaeltehilfe_capacity_checked_at",
+        ),
+        "apply_kaeltehilfe_details": ("kaeltehilfe_details",),
+    }
+
+    def _table(self) -> tuple[str, list[tuple[str, str]]] | None:
+        parts = urlsplit(self.path)
+        if not parts.path.startswith(self._TABLE_PREFIX) or parts.path.startswith(self._RPC_PREFIX):
+            return None
+        return parts.path[len(self._TABLE_PREFIX) :], parse_qsl(parts.query)
+
+    def _unknown(self, what: str) -> None:
+        self._send_json(404, {"code": "42P01", "message": f"relation or function {what} does not exist"})
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self._inject_faults():
+            return
+        target = self._table()
+        ds = self.server.dataset
+        if target is None or target[0] not in ds.tables:
+            self._unknown(self.path)
+            return
+        table, params = target
+        try:
+            with ds.lock:
+                rows = select_rows(ds.tables[table], params)
+        except ValueError as ex:
+            self._send_json(400, {"message": str(ex)})
+            return
+        self._send_json(200, rows)
+
+    def do_PATCH(self) -> None:  # noqa: N802
+        if self._inject_faults():
+            return
+        target = self._table()
+        ds = self.server.dataset
+        body = self._read_json()
+        if target is None or target[0] not in ds.tables:
+            self._unknown(self.path)
+            return
+        table, params = target
+        with ds.lock:
+            ids = {id(r) for r in select_rows(ds.tables[table], [(k, v) for k, v in params if k != "select"] + [("select", "*")])}
+            # select_rows copies only with an explicit select list; "*" keeps the row objects.
+            changed = [r for r in ds.tables[table] if id(r) in ids]
+            for r in changed:
+                r.update(body or {})
+        if "return=representation" in (self.headers.get("Prefer") or ""):
+            self._send_json(200, changed)
+        else:
+            self._send(204)
+
+    def do_POST(self) -> None:  # noqa: N802
+        if self._inject_faults():
+            return
+        path = urlsplit(self.path).path
+        body = self._read_json()
+        ds = self.server.dataset
+        if path.startswith(self._RPC_PREFIX):
+            columns = self._RPC_COLUMNS.get(path[len(self._RPC_PREFIX) :])
+            if columns is None:
+                self._unknown(path)
+                return
+            result: list[dict[str, Any]] = []
+            with ds.lock:
+                by_id = {r["id"]: r for r in ds.tables["unterkuenfte"]}
+                for u in (body or {}).get("updates") or []:
+                    row = by_id.get(str(u.get("id")))
+                    if row is None:
+                        result.append({"unterkunft_id": u.get("id"), "ok": False, "error": "unterkunft not found"})
+                        continue
+                    row.update({k: v for k, v in u.items() if k in columns})
+                    result.append({"unterkunft_id": row["id"], "ok": True, "error": None})
+            self._send_json(200, result)
+            return
+
+        target = self._table()
+        if target is None or target[0] not in ds.tables:
+            self._unknown(path)
+            return
+        with ds.lock:
+            inserted = [ds.insert(target[0], r) for r in (body if isinstance(body, list) else [body or {}])]
+        if "return=representation" in (self.headers.get("Prefer") or ""):
+            self._send_json(201, inserted)
+        else:
+            self._send(201)
+
+
+def _is_heading(line: str) -> bool:
+    letters = [c for c in line if c.isalpha()]
+    return len(letters) >= 8 and all(c.isupper() for c in letters) and "|" not in line
+
+
+def _resolve(schema: dict[str, Any], defs: dict[str, Any]) -> dict[str, Any]:
+    ref = schema.get("$ref")
+    if isinstance(ref, str) and ref.startswith("#/$defs/"):
+        return _resolve(defs.get(ref.rsplit("/", 1)[-1]) or {}, defs)
+    return schema
+
+
+def _fake_value(schema: dict[str, Any], defs: dict[str, Any], hints: dict[str, str], key: str, items: list[dict[str, str]]) -> Any:
+    schema = _resolve(schema, defs)
+    options = schema.get("anyOf")
+    if isinstance(options, list):
+        non_null = [o for o in options if _resolve(o, defs).get("type") != "null"]
+        if len(non_null) < len(options) and key not in hints:
+            return None
+        return _fake_value(non_null[0] if non_null else {}, defs, hints, key, items)
+    if "enum" in schema:
+        return schema["enum"][0]
+    kind = schema.get("type")
+    if kind == "object":
+        return {k: _fake_value(v, defs, hints, k, items) for k, v in (schema.get("properties") or {}).items()}
+    if kind == "array":
+        item_schema = _resolve(schema.get("items") or {}, defs)
+        if item_schema.get("type") != "object" or not items:
+            return []
+        return [_fake_value(item_schema, defs, h, "", []) for h in items]
+    if kind == "string":
+        return hints.get(key, "")
+    if kind in ("integer", "number"):
+        return 0
+    if kind == "boolean":
+        return False
+    return None
+
+
+def fake_structured_output(schema: dict[str, Any], text: str) -> Any:
+    """
+    Schema-valid value for a strict JSON schema; top-level arrays get one item per heading.
+    """
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    items = [
+        {"name": line, "adresse": lines[i + 1] if i + 1 < len(lines) else ""}
+        for i, line in enumerate(lines)
+        if _is_heading(line)
+    ]
+    return _fake_value(schema, schema.get("$defs") or {}, {}, "", items)
+
+
+class _OpenAIHandler(_Handler):
+    def _error(self, status: int, message: str) -> None:
+        self._send_json(status, {"error": {"message": message, "type": "invalid_request_error", "param": None, "code": None}})
+
+    def do_POST(self) -> None:  # noqa: N802
+        if self._inject_faults():
+            return
+        body = self._read_json() or {}
+        if urlsplit(self.path).path.rstrip("/") != "/v1/responses":
+            self._error(404, f"Unknown path {self.path}")
+            return
+        fmt = (body.get("text") or {}).get("format") or {}
+        if fmt.get("type") != "json_schema" or not isinstance(fmt.get("schema"), dict):
+            self._error(400, "Only structured outputs (text.format json_schema) are supported by the fake")
+            return
+
+        messages = body.get("input") if isinstance(body.get("input"), list) else []
+        user_text = "\n".join(str(m.get("content") or "") for m in messages if isinstance(m, dict) and m.get("role") == "user")
+        text = json.dumps(fake_structured_output(fmt["schema"], user_text), ensure_ascii=False)
+        # Rough token counts (~4 chars per token).
+        input_tokens = max(1, len(json.dumps(messages, ensure_ascii=False)) // 4)
+        output_tokens = max(1, len(text) // 4)
+        if self.server.openai_ms_per_token > 0:
+            time_mod.sleep(output_tokens * self.server.openai_ms_per_token / 1000.0)
+        self._count("output_tokens", output_tokens)
+
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:24]
+        self._send_json(
+            200,
+            {
+                "id": f"resp_{digest}",
+                "object": "response",
+                "created_at": int(time_mod.time()),
+                "status": "completed",
+                "model": body.get("model") or "fake",
+                "output": [
+                    {
+                        "type": "message",
+                        "id": f"msg_{digest}",
+                        "status": "completed",
+                        "role": "assistant",
+                        "content": [{"type": "output_text", "text": text, "annotations": []}],
+                    }
+                ],
+                "parallel_tool_calls": True,
+                "tool_choice": "auto",
+                "tools": [],
+                "temperature": body.get("temperature"),
+                "top_p": 1.0,
+                "error": None,
+                "incomplete_details": None,
+                "instructions": None,
+                "metadata": {},
+                "usage": {
+                    "input_tokens": input_tokens,
+                    "input_tokens_details": {"cached_tokens": 0},
+                    "output_tokens": output_tokens,
+                    "output_tokens_details": {"reasoning_tokens": 0},
+                    "total_tokens": input_tokens + output_tokens,
+                },
+            },
+        )
+
+
+_HANDLERS: dict[str, type[_Handler]] = {
+    "kaeltehilfe": _KaeltehilfeHandler,
+    "photon": _PhotonHandler,
+    "postgrest": _PostgrestHandler,
+    "openai": _OpenAIHandler,
+}
+
+
+class FakeUpstreams:
+    """
+    The fake services in background threads. `env()` points the scripts at them.
+    """
+
+    def __init__(
+        self,
+        dataset: FakeDataset,
+        *,
+        faults: Faults | None = None,
+        service_faults: dict[str, Faults] | None = None,
+        host: str = "127.0.0.1",
+        base_port: int = 0,
+        photon_canned: dict[str, Any] | None = None,
+        photon_miss_rate: float = 0.0,
+        openai_ms_per_token: float = 0.0,
+        seed: int = 7,
+    ) -> None:
+        self.dataset = dataset
+        self.servers: dict[str, _FakeServer] = {}
+        for offset, name in enumerate(SERVICES):
+            port = base_port + offset if base_port else 0
+            server = _FakeServer(
+                (host, port),
+                _HANDLERS[name],
+                name=name,
+                faults=(service_faults or {}).get(name, faults or Faults()),
+                dataset=dataset,
+                seed=seed,
+            )
+            server.photon_canned = dict(photon_canned or {})
+            server.photon_miss_rate = photon_miss_rate
+            server.openai_ms_per_token = openai_ms_per_token
+            self.servers[name] = server
+        self._threads: list[threading.Thread] = []
+
+    def url(self, service: str) -> str:
+        host, port = self.servers[service].server_address[:2]
+        return f"http://{host}:{port}"
+
+    def env(self) -> dict[str, str]:
+        return {
+            "KAELTEHILFE_BASE_URL": self.url("kaeltehilfe"),
+            "PHOTON_URL": f"{self.url('photon')}/api/",
+            "NEXT_PUBLIC_SUPABASE_URL": self.url("postgrest"),
+            "SUPABASE_SERVICE_ROLE_KEY": "fake-service-role-key",
+            "OPENAI_BASE_URL": f"{self.url('openai')}/v1",
+            "OPENAI_API_KEY": "fake-openai-key",
+        }
+
+    def start(self) -> "FakeUpstreams":
+        for name, server in self.servers.items():
+            t = threading.Thread(target=server.serve_forever, name=f"fake-{name}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self) -> None:
+        for server in self.servers.values():
+            server.shutdown()
+            server.server_close()
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        out: dict[str, dict[str, int]] = {}
+        for name, server in self.servers.items():
+            with server.stats_lock:
+                out[name] = dict(sorted(server.stats.items()))
+        return out
+
+    def __enter__(self) -> "FakeUpstreams":
+        return self.start()
+
+    def __exit__(self, *exc: object) -> None:
+        self.stop()
+
+
+def add_fake_arguments(parser: argparse.ArgumentParser) -> None:
+    """
+    Dataset/fault options shared by the server CLI and `scripts.benchmarks.e2e_load`.
+    """
+    parser.add_argument("--scale", type=float, default=1.0, help=f"Multiply today's size ({TODAY_OFFERS} offers, {TODAY_ROWS} rows)")
+    parser.add_argument("--offers", type=int, default=None, help="Listing offers (overrides --scale)")
+    parser.add_argument("--rows", type=int, default=None, help="unterkuenfte rows (overrides --scale)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--missing-coords-rate", type=float, default=0.5, help="Rows without lat/lng (backfill targets)")
+    parser.add_argument("--change-period-s", type=float, default=0.0, help="Listing statuses change every N seconds (0 = never)")
+    parser.add_argument("--change-rate", type=float, default=0.05, help="Share of offers whose status changes per period")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Uniform extra latency 0..N ms")
+    parser.add_argument("--slow-rate", type=float, default=0.0, help="Share of requests with --slow-ms extra latency")
+    parser.add_argument("--slow-ms", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests answered with 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of requests answered with 429 + Retry-After")
+    parser.add_argument(
+        "--service-faults",
+        action="append",
+        default=[],
+        metavar="SERVICE:KEY=VALUE[,KEY=VALUE]",
+        help=f"Faults for one service ({', '.join(SERVICES)}) on top of the global ones (repeatable)",
+    )
+    parser.add_argument("--photon-canned", default=None, help="JSON file {query: Photon response} served verbatim")
+    parser.add_argument("--photon-miss-rate", type=float, default=0.05, help="Share of queries Photon finds nothing for")
+    parser.add_argument("--openai-ms-per-token", type=float, default=0.0, help="Extra OpenAI latency per output token")
+
+
+def fakes_from_args(args: argparse.Namespace, *, base_port: int = 0, host: str = "127.0.0.1") -> FakeUpstreams:
+    faults = Faults(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        slow_rate=args.slow_rate,
+        slow_ms=args.slow_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+    )
+    service_faults: dict[str, Faults] = {}
+    for spec in args.service_faults:
+        service, sep, rest = spec.partition(":")
+        if not sep or service not in SERVICES:
+            raise ValueError(f"Invalid --service-faults {spec!r} (expected SERVICE:key=value with SERVICE in {', '.join(SERVICES)})")
+        service_faults[service] = service_faults.get(service, faults).with_overrides(rest)
+    offers = args.offers if args.offers is not None else max(1, round(TODAY_OFFERS * args.scale))
+    rows = args.rows if args.rows is not None else max(1, round(TODAY_ROWS * args.scale))
+    dataset = FakeDataset(
+        offers=offers,
+        rows=rows,
+        seed=args.seed,
+        change_period_s=args.change_period_s,
+        change_rate=args.change_rate,
+        missing_coords_rate=args.missing_coords_rate,
+    )
+    canned = json.loads(Path(args.photon_canned).read_text(encoding="utf-8")) if args.photon_canned else None
+    return FakeUpstreams(
+        dataset,
+        faults=faults,
+        service_faults=service_faults,
+        host=host,
+        base_port=base_port,
+        photon_canned=canned,
+        photon_miss_rate=args.photon_miss_rate,
+        openai_ms_per_token=args.openai_ms_per_token,
+        seed=args.seed,
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_fake_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8780, help="First port (kaeltehilfe; photon +1, postgrest +2, openai +3; 0 = any)")
+    parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+    args = parser.parse_args()
+
+    logging.basicConfig(level=getattr(logging, args.log_level), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try:
+        fakes = fakes_from_args(args, base_port=args.port, host=args.host)
+    except ValueError as ex:
+        parser.error(str(ex))
+
+    with fakes:
+        logger.info(
+            "Serving %s offers / %s rows (kaeltehilfe=%s photon=%s postgrest=%s openai=%s)",
+            len(fakes.dataset.offers),
+            len(fakes.dataset.tables["unterkuenfte"]),
+            fakes.url("kaeltehilfe"),
+            fakes.url("photon"),
+            fakes.url("postgrest"),
+            fakes.url("openai"),
+        )
+        for k, v in fakes.env().items():
+            print(f"export {k}={v}")
+        try:
+            while True:
+                time_mod.sleep(3600)
+        except KeyboardInterrupt:
+            pass
+        for name, stats in fakes.stats().items():
+            logger.info("%s: %s", name, stats)
+
+
+if __name__ == "__main__":
+    main()
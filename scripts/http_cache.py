@@ -0,0 +1,248 @@
+"""
+On-disk conditional-GET cache for scraped HTML pages.
+
+Why:
+- The Kaeltehilfe listing is re-downloaded and re-parsed on every run, although most
+  runs see exactly the same pages.
+- Per cache key (e.g. listing `start` offset) we keep ETag / Last-Modified, a sha256 of
+  the body and the parsed result. A run then sends conditional requests and skips
+  parsing when the server answers 304 or the body hash is unchanged.
+- The parsed result is only reused while the caller's `parse_version` matches the entry's;
+  after a parser change the page is fetched unconditionally (the body is not stored) and parsed again.
+- `committed` snapshots (digest of everything a run scraped + its counters) let a caller
+  detect "nothing changed since the last committed run" and stop before any DB work.
+
+Format (JSON):
+  {
+    "version": 1,
+    "entries": {
+      "<key>": {
+        "url": "https://...",
+        "etag": "\"abc\"",
+        "last_modified": "Tue, 13 Jan 2026 04:17:00 GMT",
+        "body_sha256": "<hex>",
+        "parsed": <JSON produced by the caller's parse function>,
+        "parse_version": <caller's parser version, or null>,
+        "fetched_at": "<iso timestamp>",
+        "validated_at": "<iso timestamp>"
+      }
+    },
+    "committed": {
+      "<scope>": {"digest": "<hex>", "stats": {...}, "committed_at": "<iso timestamp>", ...caller extras}
+    }
+  }
+
+Usage:
+  cache = HttpCache.load("scripts/kaeltehilfe_http_cache.json")
+  parsed = cache.get(url, key="start=0", params={"start": "0"}, parse=my_parse)
+  cache.save()
+
+Requires:
+  - requests (pip install -r requirements.txt)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Callable
+
+try:
+    import requests
+except ModuleNotFoundError:  # pragma: no cover
+    requests = None  # type: ignore
+
+try:
+    from scripts.http_resilience import send
+    from scripts.run_metrics import metrics
+except ModuleNotFoundError:  # pragma: no cover
+    import sys
+
+    repo_root = Path(__file__).resolve().parents[1]
+    if str(repo_root) not in sys.path:
+        sys.path.insert(0, str(repo_root))
+    from scripts.http_resilience import send
+    from scripts.run_metrics import metrics
+
+logger = logging.getLogger("http_cache")
+
+# Outcomes counted per `get()` call.
+OUTCOME_NOT_MODIFIED = "not_modified"  # server answered 304
+OUTCOME_SAME_BODY = "same_body"  # 200, but body hash unchanged -> parse skipped
+OUTCOME_FETCHED = "fetched"  # new/changed body, parsed
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def body_sha256(body: bytes) -> str:
+    return hashlib.sha256(body).hexdigest()
+
+
+def json_digest(value: Any) -> str:
+    """
+    Stable sha256 of a JSON-serializable value (used for run snapshots).
+    """
+    raw = json.dumps(value, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class HttpCache:
+    """
+    Thread-safe (one lock around entries/snapshots and file writes); HTTP requests run outside the lock.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.entries: dict[str, dict[str, Any]] = {}
+        self.committed: dict[str, dict[str, Any]] = {}
+        self.outcomes: Counter[str] = Counter()
+        self._lock = threading.Lock()
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path: str | Path) -> "HttpCache":
+        cache = cls(Path(path))
+        if not cache.path.exists():
+            return cache
+        try:
+            raw = json.loads(cache.path.read_text(encoding="utf-8"))
+        except Exception as ex:  # pragma: no cover
+            logger.warning("Failed to parse HTTP cache (%s): %s", cache.path, ex)
+            return cache
+        if not isinstance(raw, dict) or raw.get("version") != cls.VERSION:
+            return cache
+        entries = raw.get("entries")
+        if isinstance(entries, dict):
+            cache.entries = {str(k): v for k, v in entries.items() if isinstance(v, dict)}
+        committed = raw.get("committed")
+        if isinstance(committed, dict):
+            cache.committed = {str(k): v for k, v in committed.items() if isinstance(v, dict)}
+        return cache
+
+    def get(
+        self,
+        url: str,
+        *,
+        key: str,
+        parse: Callable[[str], Any],
+        parse_version: str | int | None = None,
+        params: dict[str, str] | None = None,
+        headers: dict[str, str] | None = None,
+        timeout_s: int = 30,
+        session: "requests.Session | None" = None,
+    ) -> Any:
+        """
+        Conditional GET of `url`; returns `parse(body_text)` (fresh or cached).
+
+        `parse` must return a JSON-serializable value; it is only called when the body changed
+        or the entry was parsed with another `parse_version` (bump it when `parse` changes).
+        """
+        if requests is None:
+            raise RuntimeError("Missing dependency: requests. Install requirements.txt (pip install -r requirements.txt).")
+
+        with self._lock:
+            prev = self.entries.get(key)
+        if prev is not None and (prev.get("url") != url or prev.get("parse_version") != parse_version):
+            # Another URL, or parsed by an older parser: neither a 304 nor an equal body may reuse it.
+            prev = None
+
+        req_headers = dict(headers or {})
+        if prev is not None:
+            if prev.get("etag"):
+                req_headers["If-None-Match"] = str(prev["etag"])
+            if prev.get("last_modified"):
+                req_headers["If-Modified-Since"] = str(prev["last_modified"])
+
+        logger.debug("HTTP GET %s params=%s conditional=%s", url, params, prev is not None)
+        resp = send("GET", url, session=session, params=params, headers=req_headers, timeout=timeout_s)
+
+        if resp.status_code == 304 and prev is not None:
+            self._validated(key, prev, resp, OUTCOME_NOT_MODIFIED)
+            return prev.get("parsed")
+
+        resp.raise_for_status()
+        digest = body_sha256(resp.content)
+        if prev is not None and prev.get("body_sha256") == digest:
+            self._validated(key, prev, resp, OUTCOME_SAME_BODY)
+            return prev.get("parsed")
+
+        with metrics().phase("parse"):
+            parsed = parse(resp.text)
+        now = _now_iso()
+        entry = {
+            "url": url,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "body_sha256": digest,
+            "parsed": parsed,
+            "parse_version": parse_version,
+            "fetched_at": now,
+            "validated_at": now,
+        }
+        with self._lock:
+            self.entries[key] = entry
+            self.outcomes[OUTCOME_FETCHED] += 1
+            self._dirty = True
+        return parsed
+
+    def _validated(self, key: str, prev: dict[str, Any], resp: "requests.Response", outcome: str) -> None:
+        entry = dict(prev)
+        entry["validated_at"] = _now_iso()
+        # A 304/200 may carry refreshed validators.
+        if resp.headers.get("ETag"):
+            entry["etag"] = resp.headers["ETag"]
+        if resp.headers.get("Last-Modified"):
+            entry["last_modified"] = resp.headers["Last-Modified"]
+        with self._lock:
+            self.entries[key] = entry
+            self.outcomes[outcome] += 1
+            self._dirty = True
+
+    def entries_with_prefix(self, key_prefix: str) -> dict[str, dict[str, Any]]:
+        """
+        Copy of the entries whose key starts with `key_prefix` (e.g. all pages of one listing).
+        """
+        with self._lock:
+            return {k: dict(e) for k, e in self.entries.items() if k.startswith(key_prefix)}
+
+    def committed_snapshot(self, scope: str) -> dict[str, Any] | None:
+        with self._lock:
+            return self.committed.get(scope)
+
+    def mark_committed(self, scope: str, *, digest: str, stats: dict[str, Any], **extra: Any) -> None:
+        """
+        Record what the last committed run for `scope` saw. `extra` must be JSON-serializable.
+        """
+        with self._lock:
+            self.committed[scope] = {"digest": digest, "stats": dict(stats), "committed_at": _now_iso(), **extra}
+            self._dirty = True
+
+    def forget_committed(self, scope: str) -> None:
+        with self._lock:
+            if self.committed.pop(scope, None) is not None:
+                self._dirty = True
+
+    def save(self) -> None:
+        # Held while writing: several scrapes may share one cache file.
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = {
+                "version": self.VERSION,
+                "entries": dict(sorted(self.entries.items())),
+                "committed": dict(sorted(self.committed.items())),
+            }
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+            tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+            tmp.replace(self.path)
+            self._dirty = False
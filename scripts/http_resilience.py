@@ -0,0 +1,355 @@
+"""
+Shared retry / backoff / circuit breaker / hedging layer for the scripts' outbound HTTP.
+
+Why:
+- The listing/detail fetches, Photon geocoding and the Supabase REST helpers failed the whole
+  item (or run) on the first timeout or 503, and one slow response stalled a sequential loop
+  for up to the full 20-60 s timeout.
+
+Behaviour of `send()`:
+- Retries on connection errors, timeouts and 429/500/502/503/504 with jittered exponential
+  backoff ("full jitter": uniform 0..min(cap, base * 2**attempt)). A `Retry-After` header
+  (seconds or HTTP date) is honoured as the minimum wait; responses asking for more than
+  `max_retry_after_s` are returned as they are instead of blocking the run.
+- Non-idempotent requests (POST) are only retried when they certainly were not processed:
+  connect timeouts and 429.
+- Per-host circuit breaker: after `breaker_threshold` consecutive failed requests (connection
+  errors, timeouts, 5xx after the last retry; retries of one request count once) the host is
+  "open" for `breaker_open_s`; requests fail fast with `CircuitOpenError`. Then one probe request
+  (with its retries) is let through; success closes the circuit.
+- Optional hedging (`hedge=True`, idempotent requests only): when a request has not answered
+  after the host's p95 latency (of the last successful requests), a duplicate is sent and the
+  first successful answer wins.
+
+Every attempt is recorded in the run metrics (`scripts.run_metrics`), together with the
+counters `http_retries`, `http_retry_wait_ms`, `http_hedged`, `http_hedge_wins`, `http_circuit_open`.
+
+Usage:
+  from scripts.http_resilience import send
+
+  resp = send("GET", url, session=session, params=params, headers=headers, timeout=30)
+  resp.raise_for_status()
+
+  # CLI scripts: add_resilience_arguments(parser); configure_from_args(args)
+
+Requires:
+  - requests (pip install -r requirements.txt)
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import random
+import threading
+import time as time_mod
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable
+from urllib.parse import urlsplit
+
+try:
+    import requests
+except ModuleNotFoundError:  # pragma: no cover
+    requests = None  # type: ignore
+
+try:
+    from scripts.run_metrics import metrics
+except ModuleNotFoundError:  # pragma: no cover
+    import sys
+    from pathlib import Path
+
+    repo_root = Path(__file__).resolve().parents[1]
+    if str(repo_root) not in sys.path:
+        sys.path.insert(0, str(repo_root))
+    from scripts.run_metrics import metrics
+
+logger = logging.getLogger("http_resilience")
+
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "PATCH", "DELETE"})
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    retries: int = 3
+    backoff_base_s: float = 0.5
+    backoff_cap_s: float = 20.0
+    max_retry_after_s: float = 60.0
+    breaker_threshold: int = 5
+    breaker_open_s: float = 30.0
+    hedge: bool = False
+    hedge_quantile: float = 0.95
+    hedge_min_samples: int = 20
+    hedge_min_delay_s: float = 0.05
+
+
+class CircuitOpenError(RuntimeError):
+    def __init__(self, host: str, retry_in_s: float) -> None:
+        super().__init__(f"Circuit open for {host} (consecutive failures; retry in {retry_in_s:.0f}s)")
+        self.host = host
+        self.retry_in_s = retry_in_s
+
+
+class _Breaker:
+    """
+    closed -> (threshold consecutive failed requests) -> open -> (open_s elapsed) -> one probe -> closed/open
+    """
+
+    def __init__(self, host: str) -> None:
+        self.host = host
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.open_until = 0.0
+        self._probe_in_flight = False
+
+    def before(self, policy: RetryPolicy) -> None:
+        with self._lock:
+            if self.failures < policy.breaker_threshold:
+                return
+            now = time_mod.monotonic()
+            if now < self.open_until or self._probe_in_flight:
+                raise CircuitOpenError(self.host, max(0.0, self.open_until - now))
+            self._probe_in_flight = True
+
+    def success(self) -> None:
+        with self._lock:
+            if self._probe_in_flight:
+                logger.info("Circuit closed for %s", self.host)
+            self.failures = 0
+            self._probe_in_flight = False
+
+    def failure(self, policy: RetryPolicy) -> None:
+        with self._lock:
+            self.failures += 1
+            self._probe_in_flight = False
+            if self.failures >= policy.breaker_threshold:
+                if time_mod.monotonic() >= self.open_until:
+                    logger.warning("Circuit open for %s after %s consecutive failures (%.0fs)", self.host, self.failures, policy.breaker_open_s)
+                self.open_until = time_mod.monotonic() + policy.breaker_open_s
+
+
+class _Latencies:
+    """
+    Durations of the last successful requests to one host (for the hedging threshold).
+    """
+
+    def __init__(self, size: int = 200) -> None:
+        self._lock = threading.Lock()
+        self._values: deque[float] = deque(maxlen=size)
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._values.append(seconds)
+
+    def quantile(self, q: float, *, min_samples: int) -> float | None:
+        with self._lock:
+            if len(self._values) < max(1, min_samples):
+                return None
+            values = sorted(self._values)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+
+class Resilience:
+    """
+    Per-process state: policy, breakers and latency windows per host, hedging pool.
+    """
+
+    def __init__(self, policy: RetryPolicy | None = None) -> None:
+        self.policy = policy or RetryPolicy()
+        self._lock = threading.Lock()
+        self._breakers: dict[str, _Breaker] = {}
+        self._latencies: dict[str, _Latencies] = {}
+        self._pool: ThreadPoolExecutor | None = None
+
+    def _host_state(self, host: str) -> tuple[_Breaker, _Latencies]:
+        with self._lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = _Breaker(host)
+                self._latencies[host] = _Latencies()
+            return breaker, self._latencies[host]
+
+    def _hedge_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="http-hedge")
+            return self._pool
+
+    def send(
+        self,
+        method: str,
+        url: str,
+        *,
+        session: "requests.Session | None" = None,
+        idempotent: bool | None = None,
+        hedge: bool | None = None,
+        retries: int | None = None,
+        **kwargs: Any,
+    ) -> "requests.Response":
+        """
+        `requests`-style request with retries; returns the last response (any status).
+        """
+        if requests is None:
+            raise RuntimeError("Missing dependency: requests. Install requirements.txt (pip install -r requirements.txt).")
+
+        policy = self.policy
+        method = method.upper()
+        idempotent = method in IDEMPOTENT_METHODS if idempotent is None else idempotent
+        hedge = (policy.hedge if hedge is None else hedge) and idempotent
+        attempts = 1 + max(0, policy.retries if retries is None else retries)
+        host = urlsplit(url).netloc or url
+        breaker, latencies = self._host_state(host)
+        do_request: Callable[[], "requests.Response"] = lambda: (session or requests).request(method, url, **kwargs)  # noqa: E731
+
+        # The breaker sees logical requests: admitted once, one success/failure after the last attempt.
+        try:
+            breaker.before(policy)
+        except CircuitOpenError:
+            metrics().incr("http_circuit_open")
+            raise
+
+        for attempt in range(attempts):
+            t0 = time_mod.perf_counter()
+            try:
+                if hedge:
+                    resp = self._hedged(do_request, latencies.quantile(policy.hedge_quantile, min_samples=policy.hedge_min_samples))
+                else:
+                    resp = do_request()
+            except requests.RequestException as ex:
+                metrics().observe_http(url, time_mod.perf_counter() - t0, status=None)
+                retryable = isinstance(ex, (requests.ConnectionError, requests.Timeout)) and (
+                    idempotent or isinstance(ex, requests.ConnectTimeout)
+                )
+                if not retryable or attempt + 1 >= attempts:
+                    breaker.failure(policy)
+                    raise
+                self._wait(url, attempt, None, reason=type(ex).__name__)
+                continue
+
+            seconds = time_mod.perf_counter() - t0
+            metrics().observe_http(url, seconds, status=resp.status_code, nbytes=len(resp.content))
+            status = resp.status_code
+            if status < 400:
+                latencies.add(seconds)
+
+            if status not in RETRY_STATUSES or attempt + 1 >= attempts or not (idempotent or status == 429):
+                return self._settle(breaker, resp)
+            retry_after = parse_retry_after(resp.headers.get("Retry-After"))
+            if retry_after is not None and retry_after > policy.max_retry_after_s:
+                logger.warning("%s %s: Retry-After %.0fs exceeds %.0fs; not retrying", method, host, retry_after, policy.max_retry_after_s)
+                return self._settle(breaker, resp)
+            self._wait(url, attempt, retry_after, reason=str(status))
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    def _settle(self, breaker: _Breaker, resp: "requests.Response") -> "requests.Response":
+        if resp.status_code >= 500:
+            breaker.failure(self.policy)
+        else:
+            breaker.success()
+        return resp
+
+    def _wait(self, url: str, attempt: int, retry_after: float | None, *, reason: str) -> None:
+        policy = self.policy
+        delay = random.uniform(0.0, min(policy.backoff_cap_s, policy.backoff_base_s * (2**attempt)))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        logger.info("Retrying %s in %.2fs (attempt %s, %s)", url, delay, attempt + 2, reason)
+        metrics().incr("http_retries")
+        metrics().incr("http_retry_wait_ms", int(delay * 1000))
+        time_mod.sleep(delay)
+
+    def _hedged(self, do_request: Callable[[], "requests.Response"], threshold_s: float | None) -> "requests.Response":
+        if threshold_s is None:
+            return do_request()
+        pool = self._hedge_pool()
+        primary = pool.submit(do_request)
+        done, _ = wait([primary], timeout=max(self.policy.hedge_min_delay_s, threshold_s))
+        if done:
+            return primary.result()
+
+        metrics().incr("http_hedged")
+        backup = pool.submit(do_request)
+        pending: set[Future["requests.Response"]] = {primary, backup}
+        first_error: BaseException | None = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                ex = fut.exception()
+                if ex is None:
+                    # The slower duplicate finishes in the background; its response is dropped.
+                    if fut is backup:
+                        metrics().incr("http_hedge_wins")
+                    return fut.result()
+                first_error = first_error or ex
+        assert first_error is not None
+        raise first_error
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """
+    `Retry-After` as seconds from now (delta-seconds or HTTP date); None if absent/invalid.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when is None:
+        return None
+    return max(0.0, when.timestamp() - time_mod.time())
+
+
+_current = Resilience()
+_current_lock = threading.Lock()
+
+
+def resilience() -> Resilience:
+    return _current
+
+
+def configure(policy: RetryPolicy) -> Resilience:
+    """
+    Replace the process-wide policy (breaker and latency state start fresh).
+    """
+    global _current
+    with _current_lock:
+        _current = Resilience(policy)
+        return _current
+
+
+def send(method: str, url: str, **kwargs: Any) -> "requests.Response":
+    return _current.send(method, url, **kwargs)
+
+
+def add_resilience_arguments(parser: argparse.ArgumentParser) -> None:
+    defaults = RetryPolicy()
+    parser.add_argument("--http-retries", type=int, default=defaults.retries, help="Retries per request on timeouts/429/5xx (0 = off)")
+    parser.add_argument(
+        "--breaker-threshold",
+        type=int,
+        default=defaults.breaker_threshold,
+        help=f"Consecutive failed requests (after retries) that open a host's circuit for {defaults.breaker_open_s:.0f}s",
+    )
+    parser.add_argument(
+        "--hedge",
+        action=argparse.BooleanOptionalAction,
+        default=defaults.hedge,
+        help="Send a duplicate GET when the first is slower than the host's p95 latency",
+    )
+
+
+def configure_from_args(args: argparse.Namespace) -> Resilience:
+    return configure(
+        RetryPolicy(
+            retries=max(0, args.http_retries),
+            breaker_threshold=max(1, args.breaker_threshold),
+            hedge=bool(args.hedge),
+        )
+    )
@@ -20,6 +20,8 @@ except ModuleNotFoundError:  # pragma: no cover
 #   python scripts/import_unterkuenfte_one_time.py
 try:
     from scripts.env import load_dotenv
+    from scripts.http_resilience import CircuitOpenError, add_resilience_arguments, configure_from_args, send
+    from scripts.supabase_rest import get_client
 except ModuleNotFoundError:  # pragma: no cover
     import sys
 
@@ -27,12 +29,15 @@ except ModuleNotFoundError:  # pragma: no cover
     if str(repo_root) not in sys.path:
         sys.path.insert(0, str(repo_root))
     from scripts.env import load_dotenv
+    from scripts.http_resilience import CircuitOpenError, add_resilience_arguments, configure_from_args, send
+    from scripts.supabase_rest import get_client
 
 logger = logging.getLogger("import_unterkuenfte_one_time")
 
 # Berlin bounding box: minLon,minLat,maxLon,maxLat (kept in sync with app/api/geocode/photon/route.ts)
 BERLIN_BBOX = "13.0884,52.3383,13.7611,52.6755"
-PHOTON_URL = "https://photon.komoot.io/api/"
+# PHOTON_URL points at a stand-in geocoder (see scripts/fake_upstreams.py).
+PHOTON_URL = os.getenv("PHOTON_URL") or "https://photon.komoot.io/api/"
 
 
 def _load_extraction(path: str | Path) -> list[dict]:
@@ -126,6 +131,9 @@ def _normalize_text_array(value: Any) -> list[str] | None:
 
 
 def geocode_photon(*, q: str, bbox: str = BERLIN_BBOX, limit: int = 6, timeout_s: int = 20) -> tuple[float, float] | None:
+    if requests is None:
+        raise RuntimeError("Missing dependency: requests. Install requirements.txt (pip install -r requirements.txt).")
+
     q = q.strip()
     if len(q) < 3:
         return None
@@ -136,7 +144,7 @@ def geocode_photon(*, q: str, bbox: str = BERLIN_BBOX, limit: int = 6, timeout_s
         "user-agent": "warmebetten.berlin (photon geocoding)",
         "accept-language": "de",
     }
-    res = requests.get(PHOTON_URL, params=params, headers=headers, timeout=timeout_s)
+    res = send("GET", PHOTON_URL, params=params, headers=headers, timeout=timeout_s)
     res.raise_for_status()
     data = res.json()
     features = data.get("features") if isinstance(data, dict) else None
@@ -170,27 +178,9 @@ def _supabase_rest_insert(
     timeout_s: int = 30,
     return_representation: bool = False,
 ) -> dict | None:
-    if requests is None:
-        raise RuntimeError(
-            "Missing dependency: requests. Install requirements.txt (or pip install requests) before using --commit."
-        )
-    endpoint = supabase_url.rstrip("/") + "/rest/v1/unterkuenfte"
-    headers = {
-        "apikey": service_role_key,
-        "authorization": f"Bearer {service_role_key}",
-        "content-type": "application/json",
-        "prefer": "return=representation" if return_representation else "return=minimal",
-    }
-    res = requests.post(endpoint, headers=headers, json=row, timeout=timeout_s)
-    if res.status_code >= 400:
-        raise RuntimeError(f"Insert failed ({res.status_code}): {res.text}")
-    if return_representation:
-        try:
-            data = res.json()
-            return data[0] if isinstance(data, list) and data else (data if isinstance(data, dict) else None)
-        except Exception:
-            return None
-    return None
+    client = get_client(supabase_url, service_role_key)
+    data = client.insert("unterkuenfte", row, returning=return_representation, timeout_s=timeout_s)
+    return data[0] if data else None
 
 
 def _build_insert_row(
@@ -315,10 +305,12 @@ def main() -> None:
         default=True,
         help="Skip records when Photon returns no coordinates",
     )
+    add_resilience_arguments(parser)
     parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
     args = parser.parse_args()
 
     logging.basicConfig(level=getattr(logging, args.log_level), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    configure_from_args(args)
 
     # Load scripts/.env (user convention in this repo). In some environments this
     # file may be unavailable; treat it as optional.
@@ -362,7 +354,16 @@ def main() -> None:
 
         lat = lng = None
         if not args.no_geocode and adresse:
-            coords = geocode_photon(q=adresse)
+            try:
+                coords = geocode_photon(q=adresse)
+            except CircuitOpenError as ex:
+                failed += len(entries) - idx + 1
+                logger.error("Stopping: %s", ex)
+                break
+            except Exception as ex:
+                failed += 1
+                logger.error("Photon failed: %s", ex)
+                continue
             if coords is None:
                 msg = "Photon: no coordinates"
                 if args.skip_ungeocodable:
@@ -0,0 +1,195 @@
+"""
+`scrape_kaeltehilfe_capacity --daemon`: poll the listings on an adaptive interval.
+
+Cycles are `sync_categories` calls (`scripts.kaeltehilfe_sync`) sharing one `_SyncResources`;
+the interval shrinks after changes and during the shelters' intake hours and grows while nothing
+changes (`next_poll_interval`).
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import re
+import signal
+import threading
+import time as time_mod
+from datetime import datetime
+from typing import Any
+
+try:
+    from scripts.kaeltehilfe_schedule import BERLIN_TZ, OpeningHoursSchedule
+    from scripts.kaeltehilfe_sync import _SyncResources, sync_categories, write_run_report
+    from scripts.run_metrics import reset_metrics
+except ModuleNotFoundError:  # pragma: no cover
+    import sys
+    from pathlib import Path
+
+    repo_root = Path(__file__).resolve().parents[1]
+    if str(repo_root) not in sys.path:
+        sys.path.insert(0, str(repo_root))
+    from scripts.kaeltehilfe_schedule import BERLIN_TZ, OpeningHoursSchedule
+    from scripts.kaeltehilfe_sync import _SyncResources, sync_categories, write_run_report
+    from scripts.run_metrics import reset_metrics
+
+logger = logging.getLogger("kaeltehilfe_daemon")
+
+# Evening intake of the night shelters (doors open ~18-20 h, last admission ~22-24 h).
+DEFAULT_INTAKE_HOURS = "17-24"
+# Interval growth per cycle without changes.
+POLL_BACKOFF_FACTOR = 1.5
+
+
+def parse_hour_range(text: str) -> tuple[int, int]:
+    """
+    "17-24" -> (17, 24). END may be smaller than START for ranges past midnight ("22-2").
+    """
+    m = re.fullmatch(r"\s*(\d{1,2})\s*-\s*(\d{1,2})\s*", text or "")
+    if not m:
+        raise ValueError(f"Invalid hour range {text!r} (expected START-END, e.g. 17-24)")
+    start, end = int(m.group(1)), int(m.group(2))
+    if not (0 <= start <= 23 and 0 <= end <= 24) or start == end % 24:
+        raise ValueError(f"Invalid hour range {text!r}")
+    return start, end
+
+
+def _in_hours(hour: int, hours: tuple[int, int]) -> bool:
+    start, end = hours
+    if start < end:
+        return start <= hour < end
+    return hour >= start or hour < end
+
+
+def _seconds_until_hour(now: datetime, hour: int) -> float:
+    target = now.replace(hour=hour % 24, minute=0, second=0, microsecond=0)
+    delta = (target - now).total_seconds()
+    return delta if delta > 0 else delta + 86400
+
+
+def next_poll_interval(
+    prev_s: float,
+    *,
+    changed: bool,
+    failed: bool,
+    now: datetime,
+    min_s: float,
+    max_s: float,
+    intake_hours: tuple[int, int],
+    intake_max_s: float,
+    until_intake_s: float | None = None,
+) -> float:
+    """
+    Seconds until the next daemon cycle.
+
+    - a cycle that changed statuses resets the interval to `min_s`
+    - stable cycles grow it by `POLL_BACKOFF_FACTOR`, up to `intake_max_s` during the
+      intake hours and `max_s` otherwise (a long sleep is cut short when intake starts)
+    - failed cycles back off exponentially up to `max_s`
+    - `until_intake_s` (from `OpeningHoursSchedule`) replaces the fixed `intake_hours`
+    """
+    if failed:
+        return min(max_s, max(min_s, prev_s * 2))
+    if changed:
+        return min_s
+    if until_intake_s is not None:
+        in_intake = until_intake_s <= 0
+    else:
+        in_intake = _in_hours(now.hour, intake_hours)
+        until_intake_s = _seconds_until_hour(now, intake_hours[0])
+    ceiling = min(max_s, intake_max_s) if in_intake else max_s
+    interval = min(ceiling, max(min_s, prev_s * POLL_BACKOFF_FACTOR))
+    if not in_intake:
+        interval = min(interval, max(min_s, until_intake_s))
+    return interval
+
+
+def _berlin_now() -> datetime:
+    return datetime.now(BERLIN_TZ) if BERLIN_TZ is not None else datetime.now().astimezone()
+
+
+def run_daemon(args: argparse.Namespace, url: str, key: str, categories: dict[str, int]) -> None:
+    """
+    Poll until SIGTERM/SIGINT (or `--max-cycles`), keeping one `_SyncResources` in memory.
+
+    A cycle is a normal `sync_categories` call; with the in-memory caches an unchanged
+    listing costs one conditional GET per page and one small update that moves the previous
+    `scrape_runs` row's `finished_at` (which keeps the map's "checked at" fresh). Changed rows are diffed against the rows as last written,
+    so only real changes reach the DB. DB rows are re-read every `--refresh-rows-min`
+    (edits made outside the scraper) and after a failed cycle.
+
+    With --schedule, cycles between full scans (`--full-scan-min`) only refresh shelters in
+    their intake window, and the intake hours come from the shelters' opening hours.
+    """
+    stop = threading.Event()
+
+    def _on_signal(signum: int, _frame: Any) -> None:
+        logger.info("Received signal %s; stopping after the current cycle", signum)
+        stop.set()
+
+    signal.signal(signal.SIGTERM, _on_signal)
+    signal.signal(signal.SIGINT, _on_signal)
+
+    res = _SyncResources(args, url, key, list(categories))
+    cycle_args = argparse.Namespace(**vars(args))
+    interval = float(args.min_interval_s)
+    details_at: float | None = None
+    full_scan_at: float | None = None
+    cycle = 0
+    try:
+        while not stop.is_set():
+            cycle += 1
+            reset_metrics()
+            if time_mod.monotonic() - res.rows_loaded_at > args.refresh_rows_min * 60:
+                res.refresh_rows()
+            cycle_args.details = bool(args.details) and (
+                details_at is None or time_mod.monotonic() - details_at >= args.details_interval_min * 60
+            )
+
+            t0 = time_mod.monotonic()
+            scheduled = bool(args.schedule) and (
+                full_scan_at is not None and t0 - full_scan_at < args.full_scan_min * 60
+            )
+            failed = False
+            changed = 0
+            until_intake_s: float | None = None
+            try:
+                results = sync_categories(cycle_args, url, key, categories, resources=res, scheduled=scheduled)
+                changed = sum(s["updated"] + s["failed"] for s in results.values())
+                failed = any(s["failed"] for s in results.values())
+                if cycle_args.details:
+                    details_at = t0
+                if not all(s.get("scheduled") for s in results.values()):
+                    full_scan_at = t0
+                if args.schedule:
+                    schedule = OpeningHoursSchedule(res.rows.all_rows(), lead_min=args.schedule_lead_min)
+                    until_intake_s = schedule.seconds_until_next_active(_berlin_now())
+            except Exception as ex:
+                logger.exception("Cycle %s failed: %s", cycle, ex)
+                failed = True
+                res.refresh_rows()
+
+            interval = next_poll_interval(
+                interval,
+                changed=changed > 0,
+                failed=failed,
+                now=_berlin_now(),
+                min_s=args.min_interval_s,
+                max_s=args.max_interval_s,
+                intake_hours=args.intake_hours,
+                intake_max_s=args.intake_max_interval_s,
+                until_intake_s=until_intake_s,
+            )
+            logger.info(
+                "Cycle %s done in %.1fs: changed=%s failed=%s; next poll in %.0fs",
+                cycle,
+                time_mod.monotonic() - t0,
+                changed,
+                failed,
+                interval,
+            )
+            write_run_report(cycle_args, cycle=cycle, scheduled=scheduled, next_poll_s=round(interval, 1))
+            if args.max_cycles and cycle >= args.max_cycles:
+                break
+            stop.wait(interval)
+    finally:
+        res.close()
@@ -0,0 +1,256 @@
+"""
+Supabase reads and writes of the Kaeltehilfe capacity scraper.
+
+- `unterkuenfte` rows of one or several typs, with the scraper-owned columns
+  (`CAPACITY_STATE_COLUMNS`) read back so unchanged rows can be skipped.
+- Bulk updates through the RPCs `apply_kaeltehilfe_capacity` / `apply_kaeltehilfe_details`
+  (per-row PATCH fallback while the migration is missing).
+- `scrape_runs` rows (run freshness for the map, view `scrape_source_freshness`).
+
+Requires:
+  - requests (pip install -r requirements.txt)
+  - NEXT_PUBLIC_SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY (from scripts/.env or exported)
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Sequence
+
+try:
+    from scripts.env import load_dotenv
+    from scripts.kaeltehilfe_parse import ScrapedOffer
+    from scripts.run_metrics import metrics
+    from scripts.supabase_rest import SupabaseRestError, get_client
+except ModuleNotFoundError:  # pragma: no cover
+    import sys
+    from pathlib import Path
+
+    repo_root = Path(__file__).resolve().parents[1]
+    if str(repo_root) not in sys.path:
+        sys.path.insert(0, str(repo_root))
+    from scripts.env import load_dotenv
+    from scripts.kaeltehilfe_parse import ScrapedOffer
+    from scripts.run_metrics import metrics
+    from scripts.supabase_rest import SupabaseRestError, get_client
+
+logger = logging.getLogger("kaeltehilfe_db")
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def get_supabase_config() -> tuple[str, str]:
+    try:
+        load_dotenv()
+    except FileNotFoundError:  # pragma: no cover
+        pass
+    except PermissionError:  # pragma: no cover
+        pass
+
+    url = os.getenv("NEXT_PUBLIC_SUPABASE_URL") or ""
+    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or ""
+    if not url or not key:
+        raise RuntimeError("Missing NEXT_PUBLIC_SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY")
+    return url, key
+
+
+# Columns the scraper owns; also read back so unchanged rows can be skipped.
+CAPACITY_STATE_COLUMNS: tuple[str, ...] = (
+    "kaeltehilfe_capacity_status",
+    "kaeltehilfe_capacity_status_men",
+    "kaeltehilfe_capacity_status_women",
+    "kaeltehilfe_capacity_status_diverse",
+    "kaeltehilfe_capacity_url",
+)
+
+
+def fetch_db_unterkuenfte(url: str, key: str, *, typ: str = "notuebernachtung") -> list[dict[str, Any]]:
+    params: dict[str, str] = {
+        "select": ",".join(("id", "name", "typ", *CAPACITY_STATE_COLUMNS)),
+        "order": "name.asc",
+        "limit": "10000",
+    }
+    if typ:
+        params["typ"] = f"eq.{typ}"
+
+    return get_client(url, key).select("unterkuenfte", params)
+
+
+DETAILS_COLUMN = "kaeltehilfe_details"
+# Read for `--schedule` (`scripts.kaeltehilfe_schedule`).
+SCHEDULE_COLUMNS: tuple[str, ...] = ("oeffnung_von", "oeffnung_bis", "letzter_einlass", "general_opening_hours")
+
+
+def fetch_db_unterkuenfte_by_typ(
+    url: str,
+    key: str,
+    typs: Sequence[str],
+    *,
+    extra_columns: Sequence[str] = (),
+) -> dict[str, list[dict[str, Any]]]:
+    """
+    One request for several categories; rows grouped by typ (each group ordered by name).
+    """
+    params: dict[str, str] = {
+        "select": ",".join(("id", "name", "typ", *CAPACITY_STATE_COLUMNS, *extra_columns)),
+        "typ": f"in.({','.join(typs)})",
+        "order": "name.asc",
+        "limit": "10000",
+    }
+    out: dict[str, list[dict[str, Any]]] = {t: [] for t in typs}
+    with metrics().phase("db_read"):
+        rows = get_client(url, key).select("unterkuenfte", params)
+    for r in rows:
+        out.setdefault(str(r.get("typ") or ""), []).append(r)
+    return out
+
+
+def patch_unterkunft(url: str, key: str, unterkunft_id: str, payload: dict[str, Any]) -> None:
+    get_client(url, key).update("unterkuenfte", {"id": f"eq.{unterkunft_id}"}, payload)
+
+
+def capacity_payload(offer: ScrapedOffer) -> dict[str, Any]:
+    return {
+        "kaeltehilfe_capacity_status": offer.status_all,
+        "kaeltehilfe_capacity_status_men": offer.status_men,
+        "kaeltehilfe_capacity_status_women": offer.status_women,
+        "kaeltehilfe_capacity_status_diverse": offer.status_diverse,
+        "kaeltehilfe_capacity_url": offer.url,
+    }
+
+
+def capacity_changed(row: dict[str, Any], payload: dict[str, Any]) -> bool:
+    """
+    True if any scraper-owned column differs between the DB row and the new payload.
+    """
+    return any(row.get(col) != payload.get(col) for col in CAPACITY_STATE_COLUMNS)
+
+
+SCRAPE_RUNS_TABLE = "scrape_runs"
+
+
+def scrape_source(typ: str, *, scheduled: bool = False) -> str:
+    """
+    `scrape_runs.source` for a DB typ. Scheduled cycles (only the shelters in their intake
+    window) get their own source, so the latest `kaeltehilfe:<typ>` run is always a full scan.
+    """
+    return f"kaeltehilfe:{typ}:scheduled" if scheduled else f"kaeltehilfe:{typ}"
+
+
+def record_scrape_run(
+    url: str,
+    key: str,
+    *,
+    source: str,
+    status: str,
+    started_at: str,
+    extend: int | None = None,
+    **fields: Any,
+) -> int | None:
+    """
+    Write one finished `scrape_runs` row (written at the end, so no row is left `running` by a
+    process that died). Returns its id, or None if the table is not available (run freshness is
+    best-effort and must not block capacity updates).
+
+    With `extend` (id of the previous run of `source`, which changed nothing either), that row's
+    `finished_at` and counters move forward instead: an idle daemon costs one small update per
+    cycle, not a new row.
+    """
+    payload: dict[str, Any] = {"status": status, "finished_at": _now_iso(), **fields}
+    client = get_client(url, key)
+    try:
+        if extend is not None:
+            client.update(SCRAPE_RUNS_TABLE, {"id": f"eq.{extend}"}, payload)
+            return extend
+        rows = client.insert(SCRAPE_RUNS_TABLE, {"source": source, "started_at": started_at, **payload}, returning=True)
+    except SupabaseRestError as ex:
+        logger.warning("Could not record scrape run (%s): %s", source, ex)
+        return None
+    run_id = rows[0].get("id") if rows else None
+    return int(run_id) if run_id is not None else None
+
+
+def last_full_run_at(url: str, key: str, *, source: str) -> datetime | None:
+    """
+    Finish time of the latest succeeded/partial run of `source`, or None (none yet, table missing).
+    """
+    params = {
+        "select": "finished_at",
+        "source": f"eq.{source}",
+        "status": "in.(succeeded,partial)",
+        "order": "finished_at.desc",
+        "limit": "1",
+    }
+    try:
+        rows = get_client(url, key).select(SCRAPE_RUNS_TABLE, params)
+    except SupabaseRestError as ex:
+        logger.warning("Could not read the last full run (%s): %s", source, ex)
+        return None
+    finished_at = rows[0].get("finished_at") if rows else None
+    if not finished_at:
+        return None
+    try:
+        return datetime.fromisoformat(str(finished_at).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+APPLY_CAPACITY_RPC = "apply_kaeltehilfe_capacity"
+APPLY_DETAILS_RPC = "apply_kaeltehilfe_details"
+
+
+def apply_capacity_updates(
+    url: str,
+    key: str,
+    updates: list[dict[str, Any]],
+    *,
+    batch_size: int = 200,
+    rpc: str = APPLY_CAPACITY_RPC,
+) -> dict[str, str]:
+    """
+    Apply many capacity payloads (each with an "id" key) via the bulk RPC
+    `public.apply_kaeltehilfe_capacity` (one request per `batch_size` rows).
+    `rpc=APPLY_DETAILS_RPC` applies `kaeltehilfe_details` documents the same way.
+
+    Returns `{unterkunft_id: error}` for rows that failed; an empty dict means all succeeded.
+    Falls back to per-row PATCH if the RPC is not deployed yet.
+    """
+    client = get_client(url, key)
+    failures: dict[str, str] = {}
+    step = max(1, int(batch_size))
+
+    for i in range(0, len(updates), step):
+        batch = updates[i : i + step]
+        try:
+            result = client.rpc(rpc, {"updates": batch})
+        except SupabaseRestError as ex:
+            if ex.status_code != 404:
+                # Whole batch failed (e.g. auth/timeout); attribute the error to every row.
+                for u in batch:
+                    failures[str(u.get("id"))] = str(ex)
+                continue
+            logger.warning("RPC %s not found (migration not applied?); falling back to per-row PATCH", rpc)
+            for u in updates[i:]:
+                uid = str(u.get("id"))
+                try:
+                    patch_unterkunft(url, key, uid, {k: v for k, v in u.items() if k != "id"})
+                except Exception as row_ex:
+                    failures[uid] = str(row_ex)
+            break
+
+        reported: set[str] = set()
+        for r in result if isinstance(result, list) else []:
+            uid = str(r.get("unterkunft_id"))
+            reported.add(uid)
+            if not r.get("ok"):
+                failures[uid] = str(r.get("error") or "unknown error")
+        for u in batch:
+            uid = str(u.get("id"))
+            if uid not in reported and uid not in failures:
+                failures[uid] = "missing from RPC result"
+
+    return failures
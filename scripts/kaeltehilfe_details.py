@@ -0,0 +1,314 @@
+"""
+Fetch and parse Kaeltehilfe offer detail pages (`/kaeltehilfe-angebot/<slug>`).
+
+Why:
+- Listing cards only carry the traffic-light images; the detail page of an offer (the URL we
+  store in `kaeltehilfe_capacity_url`) also lists opening hours, address, phone, number of
+  places, Träger, audience and features.
+- Hundreds of pages must fit into the job's time budget without hammering the site:
+  pages are fetched concurrently, but every request start takes a token from a shared
+  `TokenBucket` (steady rate + small burst), and requests are conditional (`HttpCache`),
+  so unchanged pages cost a 304 and no parsing.
+
+Parsed fields (stored as-is in `unterkuenfte.kaeltehilfe_details`, never in curated columns):
+  traeger, opening_hours, address, phone, email, website, places_text, places,
+  audience[], features[], services[], status_all/men/women/diverse
+
+The parser keys off the site's icon file names (`alarm-outline` = hours, `location-outline`
+= address, `call-outline` = phone, `icon_custom_location_gender_*` = audience, ...), i.e. the
+same markup the listing cards use. Unknown blocks are ignored. Saved pages and their reviewed
+fields (`scripts/html/detail/`) are checked with `python -m scripts.benchmarks.parse_details`.
+
+Until at least one real offer page is saved there and parses to its reviewed fields
+(`fixture_problems()`), the scraper refuses `--details --commit`: the parser was only checked
+against a listing card, and its output goes to production.
+
+Requires:
+  - requests, beautifulsoup4 (lxml tree builder used if installed)
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+import threading
+import time as time_mod
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Iterable
+
+try:
+    from bs4 import BeautifulSoup  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover
+    BeautifulSoup = None  # type: ignore
+
+try:
+    import requests
+except ModuleNotFoundError:  # pragma: no cover
+    requests = None  # type: ignore
+
+try:
+    from scripts.http_cache import HttpCache
+    from scripts.http_resilience import send
+    from scripts.kaeltehilfe_parse import _parse_status_from_alt, default_parser_backend
+    from scripts.run_metrics import metrics
+except ModuleNotFoundError:  # pragma: no cover
+    import sys
+
+    repo_root = Path(__file__).resolve().parents[1]
+    if str(repo_root) not in sys.path:
+        sys.path.insert(0, str(repo_root))
+    from scripts.http_cache import HttpCache
+    from scripts.http_resilience import send
+    from scripts.kaeltehilfe_parse import _parse_status_from_alt, default_parser_backend
+    from scripts.run_metrics import metrics
+
+logger = logging.getLogger("kaeltehilfe_details")
+
+DEFAULT_RATE_PER_S = 4.0
+DEFAULT_BURST = 4
+DEFAULT_CONCURRENCY = 4
+# Bump when `parse_detail_page` changes; cached pages are then fetched and parsed again.
+PARSER_VERSION = 1
+# Saved pages + `expected.json` ({page path relative to this directory: reviewed fields}).
+FIXTURES_DIR = Path(__file__).resolve().parent / "html" / "detail"
+FIXTURES_EXPECTED = FIXTURES_DIR / "expected.json"
+
+# Same lxml detection as the listing parser; BeautifulSoup falls back to the stdlib tree builder.
+_BS4_FEATURES = "lxml" if default_parser_backend() == "lxml" else "html.parser"
+
+# Icon file name fragment -> scalar field.
+_ICON_FIELDS: tuple[tuple[str, str], ...] = (
+    ("alarm-outline", "opening_hours"),
+    ("location-outline", "address"),
+    ("call-outline", "phone"),
+    ("mail-outline", "email"),
+    ("globe-outline", "website"),
+)
+# Icon file name prefix -> list field.
+_ICON_LISTS: tuple[tuple[str, str], ...] = (
+    ("icon_custom_location_gender_", "audience"),
+    ("icon_custom_location_special_", "features"),
+    ("icon_custom_location_type_", "services"),
+)
+_PLACES_RE = re.compile(r"(\d+)\s+(?:Schlaf)?Pl[äa]tze", re.IGNORECASE)
+_WS_RE = re.compile(r"\s+")
+
+
+def _clean(text: str) -> str:
+    return _WS_RE.sub(" ", text or "").strip()
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket: `acquire()` blocks until a token is available.
+
+    Tokens refill continuously at `rate_per_s` up to `burst`; i.e. long-run request rate is
+    capped at `rate_per_s` while short bursts of up to `burst` requests start immediately.
+    """
+
+    def __init__(self, *, rate_per_s: float, burst: int = 1) -> None:
+        if rate_per_s <= 0:
+            raise ValueError("rate_per_s must be > 0")
+        self.rate_per_s = float(rate_per_s)
+        self.capacity = float(max(1, burst))
+        self._tokens = self.capacity
+        self._last = time_mod.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time_mod.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate_per_s)
+                self._last = now
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return
+                wait_s = (1.0 - self._tokens) / self.rate_per_s
+            time_mod.sleep(wait_s)
+
+
+def parse_detail_page(html: str) -> dict[str, Any]:
+    """
+    Extract the structured fields of one offer page; keys without data are omitted.
+    """
+    if BeautifulSoup is None:
+        raise RuntimeError("Missing dependency: beautifulsoup4. Install requirements.txt (pip install -r requirements.txt).")
+
+    soup = BeautifulSoup(html or "", _BS4_FEATURES)
+    out: dict[str, Any] = {}
+    lists: dict[str, list[str]] = {}
+
+    meta = soup.select_one(".el-meta")
+    if meta is not None:
+        text = _clean(meta.get_text(" ", strip=True))
+        if text.lower().startswith("träger:"):
+            text = text.split(":", 1)[1].strip()
+        if text:
+            out["traeger"] = text
+
+    for block in soup.select("div.fs-grid-text"):
+        # Traffic lights (same alt texts as on the listing cards).
+        for img in block.find_all("img", alt=True):
+            status = _parse_status_from_alt(img.get("alt"))
+            if status is None:
+                continue
+            alt_l = str(img.get("alt")).lower()
+            if "männer" in alt_l or "maenner" in alt_l:
+                out["status_men"] = status
+            elif "frauen" in alt_l:
+                out["status_women"] = status
+            elif "divers" in alt_l:
+                out["status_diverse"] = status
+            else:
+                out["status_all"] = status
+
+        icons = [str(img.get("src") or "") for img in block.find_all("img") if not img.get("alt")]
+        if block.find("div", class_="fs-grid-text") is not None:
+            # Nested text block; handled on its own.
+            continue
+
+        # List-type blocks can hold several icon+label pairs (e.g. services).
+        labelled = block.select("span.card-filters-filter") or ([block] if icons else [])
+        handled = False
+        for part in labelled:
+            img = part.find("img")
+            src = str(img.get("src") or "") if img is not None else ""
+            for prefix, field in _ICON_LISTS:
+                if prefix in src:
+                    label = _clean(part.get_text(" ", strip=True))
+                    if label and label not in lists.setdefault(field, []):
+                        lists[field].append(label)
+                    handled = True
+                    break
+        if handled:
+            continue
+
+        src = icons[0] if icons else ""
+        text = _clean(block.get_text(" ", strip=True))
+        for fragment, field in _ICON_FIELDS:
+            if fragment in src:
+                if field == "phone":
+                    tel = block.select_one('a[href^="tel:"]')
+                    text = _clean(tel.get_text(" ", strip=True)) if tel is not None else text
+                elif field == "email":
+                    mail = block.select_one('a[href^="mailto:"]')
+                    text = str(mail.get("href"))[len("mailto:") :].strip() if mail is not None else text
+                elif field == "website":
+                    link = block.select_one("a[href]")
+                    text = str(link.get("href")).strip() if link is not None else text
+                if text and field not in out:
+                    out[field] = text
+                break
+        else:
+            m = _PLACES_RE.search(text)
+            if m and "places_text" not in out:
+                out["places_text"] = text
+                out["places"] = int(m.group(1))
+
+    for field, values in lists.items():
+        if values:
+            out[field] = values
+    return out
+
+
+def load_fixture_expectations() -> dict[str, dict[str, Any]]:
+    if not FIXTURES_EXPECTED.exists():
+        return {}
+    return json.loads(FIXTURES_EXPECTED.read_text(encoding="utf-8"))
+
+
+def diff_fields(got: dict[str, Any], want: dict[str, Any]) -> list[str]:
+    """
+    Missing, extra and different fields of one parse, as readable lines.
+    """
+    out: list[str] = []
+    for field in sorted(set(got) | set(want)):
+        if field not in got:
+            out.append(f"missing {field}: {want[field]!r}")
+        elif field not in want:
+            out.append(f"extra {field}: {got[field]!r}")
+        elif got[field] != want[field]:
+            out.append(f"{field}: got {got[field]!r}, want {want[field]!r}")
+    return out
+
+
+def fixture_problems() -> list[str]:
+    """
+    Why the parser is not yet verified against real offer pages; empty if it is.
+    Needs at least one saved offer page (not `../` listing cards) and every fixture parsing to its fields.
+    """
+    expected = load_fixture_expectations()
+    problems: list[str] = []
+    if not any(not name.startswith("../") for name in expected):
+        problems.append(f"no saved offer page in {FIXTURES_DIR} (python -m scripts.benchmarks.parse_details --save <offer URL>)")
+    for name, want in sorted(expected.items()):
+        page = FIXTURES_DIR / name
+        if not page.exists():
+            problems.append(f"{name}: missing")
+            continue
+        diff = diff_fields(parse_detail_page(page.read_text(encoding="utf-8")), want)
+        if diff:
+            problems.append(f"{name}: {'; '.join(diff)}")
+    return problems
+
+
+def fetch_details(
+    urls: Iterable[str],
+    *,
+    http_cache: HttpCache | None,
+    bucket: TokenBucket,
+    headers: dict[str, str] | None = None,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    session: "requests.Session | None" = None,
+    timeout_s: int = 30,
+) -> tuple[dict[str, dict[str, Any]], dict[str, str]]:
+    """
+    Fetch + parse detail pages concurrently. Returns ({url: details}, {url: error}).
+    """
+    if requests is None:
+        raise RuntimeError("Missing dependency: requests. Install requirements.txt (pip install -r requirements.txt).")
+
+    unique = list(dict.fromkeys(u for u in urls if u))
+
+    def _one(url: str) -> dict[str, Any]:
+        with metrics().page(url, kind="detail"):
+            with metrics().phase("details_rate_wait"):
+                bucket.acquire()
+            if http_cache is not None:
+                return http_cache.get(
+                    url,
+                    key=url,
+                    headers=headers,
+                    parse=parse_detail_page,
+                    parse_version=PARSER_VERSION,
+                    timeout_s=timeout_s,
+                    session=session,
+                )
+            resp = send("GET", url, session=session, headers=headers, timeout=timeout_s)
+            resp.raise_for_status()
+            with metrics().phase("parse"):
+                return parse_detail_page(resp.text)
+
+    details: dict[str, dict[str, Any]] = {}
+    errors: dict[str, str] = {}
+    t0 = time_mod.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="kaeltehilfe-detail") as pool:
+        futures = {url: pool.submit(_one, url) for url in unique}
+        for url, fut in futures.items():
+            try:
+                details[url] = fut.result()
+            except Exception as ex:
+                errors[url] = str(ex)
+                logger.warning("Detail page failed: %s (%s)", url, ex)
+    logger.info(
+        "Fetched %s detail pages in %.1fs (%s failed, rate=%.1f/s burst=%s)",
+        len(unique),
+        time_mod.monotonic() - t0,
+        len(errors),
+        bucket.rate_per_s,
+        int(bucket.capacity),
+    )
+    return details, errors
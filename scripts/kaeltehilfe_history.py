@@ -0,0 +1,402 @@
+"""
+Append-only local history of Kaeltehilfe traffic-light observations, with rollups for fast queries.
+
+Why:
+- `unterkuenfte.kaeltehilfe_capacity_status*` is overwritten on every run, so fill-up times
+  (when does a shelter turn red, how full are shelters at 22:00 on Fridays) are lost.
+- The scraper appends every run's per-offer statuses here (`--history`); queries answer from
+  precomputed rollups instead of scanning raw runs.
+
+Layout (`scripts/kaeltehilfe_history/` by default, not committed):
+  offers.json          append-only dictionary: offer index -> {"url", "name"}
+  YYYY-MM-DD.khist     one file per Berlin day; one columnar block appended per run:
+                         b"KHB1" | uint32 header length | JSON header {"ts", "n", "source", "full_scan"}
+                         | offer uint32[n] | all uint8[n] | men uint8[n] | women uint8[n] | diverse uint8[n]
+  rollups.npz          derived, rebuilt from the day files when missing or behind:
+                         slots      int32[4 fields, 7 weekdays, 96 quarter hours, 4 codes]
+                                    (full scans only; see below)
+                         tl_offer / tl_ts / tl_codes   status transitions per offer (timeline)
+
+Statuses are dictionary-encoded as uint8 (`STATUS_CODES`): 0 = unknown, 1 = none, 2 = little, 3 = plenty.
+
+Scheduled runs (`full_scan: false`: only the shelters in their intake window, polled more often)
+are kept as raw rows and feed the timeline, but not the share rollups (`slots`): counting them would
+weight those shelters by how often they were polled.
+
+Usage:
+  python -m scripts.kaeltehilfe_history timeline https://kaeltehilfe-berlin.de/kaeltehilfe-angebot/<slug>
+  python -m scripts.kaeltehilfe_history share --at 22:00 --status none
+  python -m scripts.kaeltehilfe_history rebuild
+
+Requires:
+  - numpy (pip install -r requirements.txt)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import struct
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable
+
+try:
+    import numpy as np
+except ModuleNotFoundError:  # pragma: no cover
+    np = None  # type: ignore
+
+try:
+    from scripts.kaeltehilfe_parse import ScrapedOffer
+    from scripts.kaeltehilfe_schedule import BERLIN_TZ, SLOT_MINUTES
+except ModuleNotFoundError:  # pragma: no cover
+    import sys
+
+    repo_root = Path(__file__).resolve().parents[1]
+    if str(repo_root) not in sys.path:
+        sys.path.insert(0, str(repo_root))
+    from scripts.kaeltehilfe_parse import ScrapedOffer
+    from scripts.kaeltehilfe_schedule import BERLIN_TZ, SLOT_MINUTES
+
+logger = logging.getLogger("kaeltehilfe_history")
+
+HISTORY_DIR = Path(__file__).resolve().parent / "kaeltehilfe_history"
+
+STATUS_CODES: dict[str | None, int] = {None: 0, "none": 1, "little": 2, "plenty": 3}
+STATUS_NAMES: tuple[str | None, ...] = (None, "none", "little", "plenty")
+FIELDS: tuple[str, ...] = ("status_all", "status_men", "status_women", "status_diverse")
+WEEKDAYS: tuple[str, ...] = ("Mo", "Di", "Mi", "Do", "Fr", "Sa", "So")
+DAY_SLOTS = 24 * 60 // SLOT_MINUTES
+
+_MAGIC = b"KHB1"
+_HEADER_LEN = struct.Struct("<I")
+_NO_STATE = 255  # last-known code before an offer's first observation
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("Missing dependency: numpy. Install requirements.txt (pip install -r requirements.txt).")
+
+
+def _local(ts: float) -> datetime:
+    dt = datetime.fromtimestamp(ts, timezone.utc)
+    return dt.astimezone(BERLIN_TZ) if BERLIN_TZ is not None else dt.astimezone()
+
+
+def _iter_blocks(path: Path, offset: int = 0) -> Iterable[tuple[int, dict[str, Any], "np.ndarray", "np.ndarray"]]:
+    """
+    Yields (end offset, header, offer indices, codes[n, 4]) per complete block after `offset`.
+    A torn last block (crash while appending) is ignored.
+    """
+    data = path.read_bytes()
+    pos = offset
+    while pos + len(_MAGIC) + _HEADER_LEN.size <= len(data):
+        if data[pos : pos + len(_MAGIC)] != _MAGIC:
+            logger.warning("Corrupt history block in %s at byte %s; ignoring the rest", path, pos)
+            return
+        (hlen,) = _HEADER_LEN.unpack_from(data, pos + len(_MAGIC))
+        hstart = pos + len(_MAGIC) + _HEADER_LEN.size
+        if hstart + hlen > len(data):
+            return
+        header = json.loads(data[hstart : hstart + hlen].decode("utf-8"))
+        n = int(header["n"])
+        cstart = hstart + hlen
+        end = cstart + 4 * n + len(FIELDS) * n
+        if end > len(data):
+            return
+        offers = np.frombuffer(data, dtype="<u4", count=n, offset=cstart)
+        codes = np.frombuffer(data, dtype=np.uint8, count=len(FIELDS) * n, offset=cstart + 4 * n)
+        yield end, header, offers, codes.reshape(len(FIELDS), n).T
+        pos = end
+
+
+class HistoryStore:
+    """
+    Thread-safe (one lock); several category syncs of a run append to the same store.
+    """
+
+    def __init__(self, path: str | Path = HISTORY_DIR) -> None:
+        _require_numpy()
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.urls: list[str] = []
+        self.names: list[str] = []
+        self._index: dict[str, int] = {}
+        # rollups
+        self.slots = np.zeros((len(FIELDS), 7, DAY_SLOTS, len(STATUS_NAMES)), dtype=np.int64)
+        self._tl_offer: list[int] = []
+        self._tl_ts: list[float] = []
+        self._tl_codes: list[tuple[int, ...]] = []
+        self._last = np.full((0, len(FIELDS)), _NO_STATE, dtype=np.uint8)
+        self._applied: dict[str, int] = {}  # day file -> bytes covered by the rollups
+        self._dirty = False
+        self._load()
+
+    # --- persistence ----------------------------------------------------------------------
+
+    def _load(self) -> None:
+        offers_path = self.path / "offers.json"
+        if offers_path.exists():
+            raw = json.loads(offers_path.read_text(encoding="utf-8"))
+            for o in raw.get("offers") or []:
+                self._add_offer(str(o.get("url") or ""), str(o.get("name") or ""))
+        self._last = np.full((len(self.urls), len(FIELDS)), _NO_STATE, dtype=np.uint8)
+
+        rollups_path = self.path / "rollups.npz"
+        if rollups_path.exists():
+            try:
+                with np.load(rollups_path) as z:
+                    self.slots = z["slots"].astype(np.int64)
+                    self._tl_offer = z["tl_offer"].tolist()
+                    self._tl_ts = z["tl_ts"].tolist()
+                    self._tl_codes = [tuple(c) for c in z["tl_codes"].tolist()]
+                    last = z["last"]
+                    self._last[: len(last)] = last[: len(self._last)]
+                    self._applied = json.loads(str(z["applied"]))
+            except Exception as ex:  # pragma: no cover
+                logger.warning("Failed to read %s (%s); rebuilding rollups", rollups_path, ex)
+                self._reset_rollups()
+        self._catch_up()
+
+    def _reset_rollups(self) -> None:
+        self.slots = np.zeros((len(FIELDS), 7, DAY_SLOTS, len(STATUS_NAMES)), dtype=np.int64)
+        self._tl_offer, self._tl_ts, self._tl_codes = [], [], []
+        self._last = np.full((len(self.urls), len(FIELDS)), _NO_STATE, dtype=np.uint8)
+        self._applied = {}
+
+    def _catch_up(self) -> None:
+        """
+        Apply day-file blocks the rollups do not cover yet (first use, lost rollups, crash).
+        """
+        if not self.path.exists():
+            return
+        behind = False
+        for day_path in sorted(self.path.glob("*.khist")):
+            offset = self._applied.get(day_path.name, 0)
+            if day_path.stat().st_size <= offset:
+                continue
+            behind = True
+            for end, header, offers, codes in _iter_blocks(day_path, offset):
+                self._roll(float(header["ts"]), offers, codes, full_scan=bool(header.get("full_scan", True)))
+                self._applied[day_path.name] = end
+        if behind:
+            self._save_rollups()
+
+    def _save_rollups(self) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp = self.path / "rollups.tmp.npz"
+        np.savez(
+            tmp,
+            slots=self.slots.astype(np.int32),
+            tl_offer=np.asarray(self._tl_offer, dtype=np.uint32),
+            tl_ts=np.asarray(self._tl_ts, dtype=np.float64),
+            tl_codes=np.asarray(self._tl_codes, dtype=np.uint8).reshape(-1, len(FIELDS)),
+            last=self._last,
+            applied=np.asarray(json.dumps(self._applied)),
+        )
+        tmp.replace(self.path / "rollups.npz")
+
+    def _save_offers(self) -> None:
+        self.path.mkdir(parents=True, exist_ok=True)
+        payload = {"offers": [{"url": u, "name": n} for u, n in zip(self.urls, self.names, strict=True)]}
+        tmp = self.path / "offers.json.tmp"
+        tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=1), encoding="utf-8")
+        tmp.replace(self.path / "offers.json")
+
+    def _add_offer(self, url: str, name: str) -> int:
+        key = url.strip().lower() or f"name:{name.strip().lower()}"
+        idx = self._index.get(key)
+        if idx is None:
+            idx = len(self.urls)
+            self._index[key] = idx
+            self.urls.append(url)
+            self.names.append(name)
+        return idx
+
+    # --- writes ---------------------------------------------------------------------------
+
+    def append_run(
+        self,
+        offers: Iterable[ScrapedOffer],
+        *,
+        ts: float | None = None,
+        source: str = "",
+        full_scan: bool = True,
+    ) -> int:
+        """
+        Append one run's observations (one block in today's day file) and update the in-memory
+        rollups (persisted by `save()`; a missed save is caught up from the day files on load).
+        `full_scan=False` (a subset of the offers) skips the share rollups.
+        Returns the number of observations written.
+        """
+        ts = float(ts if ts is not None else datetime.now(timezone.utc).timestamp())
+        with self._lock:
+            known = len(self.urls)
+            idx: list[int] = []
+            rows: list[tuple[int, ...]] = []
+            seen: set[int] = set()
+            for o in offers:
+                i = self._add_offer(o.url or "", o.name)
+                if i in seen:
+                    continue
+                seen.add(i)
+                idx.append(i)
+                rows.append(tuple(STATUS_CODES.get(getattr(o, f), 0) for f in FIELDS))
+            if not idx:
+                return 0
+            if len(self.urls) > known:
+                # Dictionary first: a block never references an unknown offer index.
+                self._save_offers()
+                grown = np.full((len(self.urls), len(FIELDS)), _NO_STATE, dtype=np.uint8)
+                grown[: len(self._last)] = self._last
+                self._last = grown
+
+            offer_arr = np.asarray(idx, dtype="<u4")
+            codes = np.asarray(rows, dtype=np.uint8)
+            header = json.dumps({"ts": ts, "n": len(idx), "source": source, "full_scan": full_scan}).encode("utf-8")
+            day_path = self.path / f"{_local(ts).date().isoformat()}.khist"
+            self.path.mkdir(parents=True, exist_ok=True)
+            with day_path.open("ab") as f:
+                f.write(_MAGIC + _HEADER_LEN.pack(len(header)) + header)
+                f.write(offer_arr.tobytes())
+                f.write(np.ascontiguousarray(codes.T).tobytes())
+                end = f.tell()
+
+            self._roll(ts, offer_arr, codes, full_scan=full_scan)
+            self._applied[day_path.name] = end
+            self._dirty = True
+            return len(idx)
+
+    def save(self) -> None:
+        with self._lock:
+            if self._dirty:
+                self._save_rollups()
+                self._dirty = False
+
+    def _roll(self, ts: float, offers: "np.ndarray", codes: "np.ndarray", *, full_scan: bool) -> None:
+        if full_scan:
+            local = _local(ts)
+            slot = (local.hour * 60 + local.minute) // SLOT_MINUTES
+            wd = local.weekday()
+            for f in range(len(FIELDS)):
+                self.slots[f, wd, slot] += np.bincount(codes[:, f], minlength=len(STATUS_NAMES))[: len(STATUS_NAMES)]
+
+        if len(self._last) < len(self.urls):
+            grown = np.full((len(self.urls), len(FIELDS)), _NO_STATE, dtype=np.uint8)
+            grown[: len(self._last)] = self._last
+            self._last = grown
+        offers = offers.astype(np.int64)
+        changed = np.any(self._last[offers] != codes, axis=1)
+        for i in np.flatnonzero(changed):
+            self._tl_offer.append(int(offers[i]))
+            self._tl_ts.append(ts)
+            self._tl_codes.append(tuple(int(c) for c in codes[i]))
+        self._last[offers] = codes
+
+    def rebuild(self) -> None:
+        """
+        Recompute all rollups from the day files.
+        """
+        with self._lock:
+            self._reset_rollups()
+            self._catch_up()
+            self._save_rollups()
+
+    # --- queries --------------------------------------------------------------------------
+
+    def offer_index(self, offer: str) -> int | None:
+        """
+        Offer by URL, else by exact (case-insensitive) name.
+        """
+        key = offer.strip().lower()
+        idx = self._index.get(key)
+        if idx is not None:
+            return idx
+        for i, name in enumerate(self.names):
+            if name.strip().lower() == key:
+                return i
+        return None
+
+    def timeline(self, offer: str, *, since: datetime | None = None) -> list[dict[str, Any]]:
+        """
+        Status changes of one offer (first observation included), oldest first.
+        """
+        idx = self.offer_index(offer)
+        if idx is None:
+            return []
+        with self._lock:
+            tl_offer = np.asarray(self._tl_offer, dtype=np.int64)
+            tl_ts = np.asarray(self._tl_ts, dtype=np.float64)
+            tl_codes = np.asarray(self._tl_codes, dtype=np.uint8).reshape(-1, len(FIELDS))
+        mask = tl_offer == idx
+        if since is not None:
+            mask &= tl_ts >= since.timestamp()
+        out: list[dict[str, Any]] = []
+        for ts, codes in zip(tl_ts[mask], tl_codes[mask], strict=True):
+            entry: dict[str, Any] = {"at": _local(float(ts)).isoformat()}
+            entry.update({f: STATUS_NAMES[int(c)] for f, c in zip(FIELDS, codes, strict=True)})
+            out.append(entry)
+        return out
+
+    def status_share_by_weekday(
+        self,
+        *,
+        at: str = "22:00",
+        status: str = "none",
+        field: str = "status_all",
+    ) -> dict[str, float | None]:
+        """
+        Share of observations with `status` in the quarter hour `at` (Berlin time), per weekday,
+        over full scans only. Offers without a status for `field` are not counted; None = no observations.
+        """
+        hh, mm = (int(x) for x in at.split(":", 1))
+        slot = (hh * 60 + mm) // SLOT_MINUTES
+        counts = self.slots[FIELDS.index(field), :, slot, 1:]  # known statuses only
+        total = counts.sum(axis=1)
+        hits = counts[:, STATUS_CODES[status] - 1]
+        return {WEEKDAYS[d]: (float(hits[d] / total[d]) if total[d] else None) for d in range(7)}
+
+    def read_day(self, day: str) -> dict[str, "np.ndarray"]:
+        """
+        Raw columns of one day file (`ts`, `offer`, one code column per field); for ad-hoc analysis.
+        """
+        path = self.path / f"{day}.khist"
+        cols: dict[str, list[Any]] = {"ts": [], "offer": [], **{f: [] for f in FIELDS}}
+        if path.exists():
+            for _end, header, offers, codes in _iter_blocks(path):
+                cols["ts"].append(np.full(len(offers), float(header["ts"])))
+                cols["offer"].append(offers)
+                for j, f in enumerate(FIELDS):
+                    cols[f].append(codes[:, j])
+        return {k: (np.concatenate(v) if v else np.zeros(0)) for k, v in cols.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default=str(HISTORY_DIR))
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_tl = sub.add_parser("timeline", help="Status changes of one offer (URL or exact name)")
+    p_tl.add_argument("offer")
+    p_share = sub.add_parser("share", help="Share of offers with a status at a time of day, per weekday")
+    p_share.add_argument("--at", default="22:00")
+    p_share.add_argument("--status", default="none", choices=["none", "little", "plenty"])
+    p_share.add_argument("--field", default="status_all", choices=list(FIELDS))
+    sub.add_parser("rebuild", help="Recompute rollups from the day files")
+    args = parser.parse_args()
+
+    store = HistoryStore(args.path)
+    if args.cmd == "timeline":
+        print(json.dumps(store.timeline(args.offer), ensure_ascii=False, indent=2))
+    elif args.cmd == "share":
+        for day, share in store.status_share_by_weekday(at=args.at, status=args.status, field=args.field).items():
+            print(f"{day}  {'-' if share is None else f'{100 * share:5.1f}%'}")
+    elif args.cmd == "rebuild":
+        store.rebuild()
+        days = len(list(Path(args.path).glob("*.khist")))
+        print(f"Rebuilt rollups for {len(store.urls)} offers from {days} day files")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,516 @@
+"""
+Fetch Kaeltehilfe listing pages (`/angebote/filter/<id>?start=N`) and paginate through them.
+
+- Category mapping: DB `unterkuenfte.typ` -> listing filter id (`KAELTEHILFE_CATEGORY_FILTERS`,
+  `scripts/kaeltehilfe_categories.json`, `--category typ=<id>`).
+- Pages are fetched sequentially or concurrently (`iter_offer_pages`), politely (`_HostThrottle`:
+  in-flight limit + minimum gap per host) and, with an `HttpCache`, conditionally; stop detection
+  and dedupe (`_PaginationState`) see the pages in offset order either way.
+- Card parsing itself is `scripts.kaeltehilfe_parse`.
+
+Requires:
+  - requests, lxml or beautifulsoup4 (pip install -r requirements.txt)
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import re
+import threading
+import time as time_mod
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Iterator, Sequence
+
+try:
+    import requests
+except ModuleNotFoundError:  # pragma: no cover
+    requests = None  # type: ignore
+
+try:
+    from scripts.http_cache import HttpCache
+    from scripts.http_resilience import send
+    from scripts.kaeltehilfe_match import _normalize_name
+    from scripts.kaeltehilfe_parse import KAEHLTEHILFE_BASE, ScrapedOffer, parse_listing
+    from scripts.run_metrics import metrics
+except ModuleNotFoundError:  # pragma: no cover
+    import sys
+
+    repo_root = Path(__file__).resolve().parents[1]
+    if str(repo_root) not in sys.path:
+        sys.path.insert(0, str(repo_root))
+    from scripts.http_cache import HttpCache
+    from scripts.http_resilience import send
+    from scripts.kaeltehilfe_match import _normalize_name
+    from scripts.kaeltehilfe_parse import KAEHLTEHILFE_BASE, ScrapedOffer, parse_listing
+    from scripts.run_metrics import metrics
+
+logger = logging.getLogger("kaeltehilfe_listing")
+
+NOTUEBERNACHTUNG_LIST_URL = f"{KAEHLTEHILFE_BASE}/angebote/filter/1"
+
+# DB `unterkunft_typ` -> Kaeltehilfe listing filter id (`/angebote/filter/<id>`).
+# Only verified ids belong here; add others via `scripts/kaeltehilfe_categories.json`
+# or `--category typ=<id>` once checked against the site.
+KAELTEHILFE_CATEGORY_FILTERS: dict[str, int] = {
+    "notuebernachtung": 1,
+}
+
+
+CATEGORIES_PATH = Path(__file__).resolve().parent / "kaeltehilfe_categories.json"
+
+
+def category_list_url(filter_id: int) -> str:
+    if filter_id == KAELTEHILFE_CATEGORY_FILTERS["notuebernachtung"]:
+        return NOTUEBERNACHTUNG_LIST_URL
+    return f"{KAEHLTEHILFE_BASE}/angebote/filter/{filter_id}"
+
+
+def load_category_filters(extra: Sequence[str] = ()) -> dict[str, int]:
+    """
+    DB typ -> Kaeltehilfe filter id: built-in mapping, then `scripts/kaeltehilfe_categories.json`,
+    then `typ=<id>` strings (from `--category`).
+
+    File format:
+      { "by_typ": { "nachtcafe": <filter id> } }
+    """
+    out = dict(KAELTEHILFE_CATEGORY_FILTERS)
+    if CATEGORIES_PATH.exists():
+        try:
+            raw = json.loads(CATEGORIES_PATH.read_text(encoding="utf-8"))
+        except Exception as ex:  # pragma: no cover
+            logger.warning("Failed to parse categories JSON (%s): %s", CATEGORIES_PATH, ex)
+            raw = {}
+        by_typ = raw.get("by_typ") if isinstance(raw, dict) else None
+        if isinstance(by_typ, dict):
+            for typ, fid in by_typ.items():
+                try:
+                    out[str(typ).strip()] = int(fid)
+                except (TypeError, ValueError):
+                    logger.warning("Ignoring category %r: filter id %r is not an integer", typ, fid)
+    for item in extra:
+        typ, sep, fid = str(item).partition("=")
+        if not sep or not typ.strip() or not fid.strip().isdigit():
+            raise ValueError(f"Invalid --category {item!r} (expected typ=<filter id>)")
+        out[typ.strip()] = int(fid)
+    return out
+
+
+def resolve_categories(typs: Sequence[str], extra: Sequence[str] | None = None) -> dict[str, int]:
+    """
+    Filter ids for the requested DB typs; `all` selects every mapped category.
+    """
+    mapping = load_category_filters(extra or ())
+    wanted: list[str] = []
+    for t in typs:
+        for part in str(t).split(","):
+            part = part.strip()
+            if part == "all":
+                wanted.extend(mapping)
+            elif part:
+                wanted.append(part)
+    unknown = [t for t in wanted if t not in mapping]
+    if unknown:
+        raise ValueError(
+            f"No Kaeltehilfe filter id for typ(s) {', '.join(unknown)}; "
+            f"map them in {CATEGORIES_PATH.name} or with --category typ=<id>"
+        )
+    return {t: mapping[t] for t in dict.fromkeys(wanted)}
+
+
+def _scrape_page(html: str, *, backend: str | None = None) -> list[ScrapedOffer]:
+    """
+    Parse one listing page (see `scripts.kaeltehilfe_parse` for the parser backends).
+    """
+    return parse_listing(html, backend=backend)
+
+
+_HTTP_HEADERS = {
+    "user-agent": "warmebetten.berlin (kaeltehilfe capacity scraper; daily run or polling every 2-30 min, conditional requests)",
+    "accept-language": "de",
+    "accept": "text/html,application/xhtml+xml",
+}
+
+
+def _http_get(
+    url: str,
+    *,
+    params: dict[str, str] | None = None,
+    timeout_s: int = 30,
+    session: "requests.Session | None" = None,
+) -> str:
+    if requests is None:
+        raise RuntimeError("Missing dependency: requests. Install requirements.txt (pip install -r requirements.txt).")
+
+    logger.debug("HTTP GET %s params=%s timeout_s=%s", url, params, timeout_s)
+    resp = send("GET", url, session=session, params=params, headers=_HTTP_HEADERS, timeout=timeout_s)
+    resp.raise_for_status()
+    return resp.text
+
+
+class _HostThrottle:
+    """
+    Per-host politeness limit for concurrent fetches.
+
+    - at most `max_in_flight` requests to the same host at a time
+    - at least `min_interval_s` between two request starts to the same host
+    """
+
+    def __init__(self, *, max_in_flight: int, min_interval_s: float) -> None:
+        self._sem = threading.BoundedSemaphore(max(1, int(max_in_flight)))
+        self._lock = threading.Lock()
+        self._min_interval_s = max(0.0, float(min_interval_s))
+        self._next_start = 0.0
+
+    def __enter__(self) -> "_HostThrottle":
+        self._sem.acquire()
+        with self._lock:
+            now = time_mod.monotonic()
+            wait_s = self._next_start - now
+            self._next_start = max(now, self._next_start) + self._min_interval_s
+        if wait_s > 0:
+            time_mod.sleep(wait_s)
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._sem.release()
+
+
+def _page_keys(page_offers: list[ScrapedOffer]) -> list[str]:
+    keys: list[str] = []
+    for o in page_offers:
+        # Prefer stable url; fall back to normalized name.
+        key = (o.url or "").strip().lower()
+        if not key:
+            key = _normalize_name(o.name)
+        keys.append(key)
+    return keys
+
+
+class _PaginationState:
+    """
+    Order-dependent pagination bookkeeping shared by the sequential and concurrent fetch modes.
+
+    Pages must be fed in increasing `start` order; `accept()` returns the page's new unique
+    offers, or None once pagination should stop (empty page, page repeats the previous one,
+    or no new unique offers).
+    """
+
+    def __init__(self) -> None:
+        self._seen_offer_keys: set[str] = set()
+        self._prev_page_signature: tuple[str, ...] | None = None
+
+    def accept(self, start: int, page_offers: list[ScrapedOffer]) -> list[ScrapedOffer] | None:
+        if not page_offers:
+            logger.info("Pagination finished at start=%s (no more cards).", start)
+            return None
+
+        if start == 0:
+            logger.info("First page parsed: %s offers", len(page_offers))
+        else:
+            logger.debug("Page parsed (start=%s): %s offers", start, len(page_offers))
+
+        # Detect pagination "clamping" / repeats: sometimes start>last_page repeats the last page.
+        # We stop if the whole page is identical to the previous page OR if it contains no new offers.
+        page_keys = _page_keys(page_offers)
+        page_signature = tuple(page_keys)
+
+        if self._prev_page_signature is not None and page_signature == self._prev_page_signature:
+            logger.info("Pagination stopped at start=%s (page repeats previous page).", start)
+            return None
+
+        new_offers: list[ScrapedOffer] = []
+        for o, key in zip(page_offers, page_keys, strict=False):
+            if not key:
+                # Extremely defensive: if we can't key it, still keep it.
+                new_offers.append(o)
+                continue
+            if key in self._seen_offer_keys:
+                continue
+            self._seen_offer_keys.add(key)
+            new_offers.append(o)
+
+        if not new_offers:
+            logger.info("Pagination stopped at start=%s (no new unique offers; likely clamped to last page).", start)
+            return None
+
+        self._prev_page_signature = page_signature
+        return new_offers
+
+
+_START_PARAM_RE = re.compile(r"[?&](?:amp;)?start=(\d+)")
+
+
+def _discover_last_start(html: str) -> int | None:
+    """
+    Best-effort: find the highest `start=` offset linked from a listing page (pagination links).
+    Returns None if the page has no pagination links.
+    """
+    starts = [int(m) for m in _START_PARAM_RE.findall(html or "")]
+    return max(starts) if starts else None
+
+
+# Bump when `_parse_listing_page` (or the card parsers) change; cached pages are then parsed again.
+LISTING_PARSER_VERSION = 1
+
+
+def _parse_listing_page(html: str, *, parser_backend: str | None = None) -> dict[str, Any]:
+    """
+    JSON-serializable parse result of one listing page (also what the HTTP cache stores).
+    """
+    return {
+        "offers": [asdict(o) for o in _scrape_page(html, backend=parser_backend)],
+        "last_start": _discover_last_start(html),
+    }
+
+
+def _listing_session(pool_maxsize: int) -> "requests.Session":
+    """
+    Keep-alive session shared by all listing fetches of a run (all categories, all workers).
+    """
+    if requests is None:
+        raise RuntimeError("Missing dependency: requests. Install requirements.txt (pip install -r requirements.txt).")
+    from requests.adapters import HTTPAdapter
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_maxsize))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def _fetch_listing_page(
+    start: int,
+    *,
+    list_url: str | None = None,
+    throttle: _HostThrottle | None = None,
+    http_cache: HttpCache | None = None,
+    parser_backend: str | None = None,
+    session: "requests.Session | None" = None,
+) -> tuple[int | None, list[ScrapedOffer]]:
+    """
+    Fetch + parse one listing page. Returns (last linked start offset, offers).
+
+    With `http_cache` the request is conditional and parsing is skipped for 304 / unchanged bodies.
+    """
+    url = list_url or NOTUEBERNACHTUNG_LIST_URL
+    params = {"start": str(start)}
+
+    def _fetch() -> dict[str, Any]:
+        if http_cache is None:
+            html = _http_get(url, params=params, session=session)
+            with metrics().phase("parse"):
+                return _parse_listing_page(html, parser_backend=parser_backend)
+        return http_cache.get(
+            url,
+            key=f"{url}?start={start}",
+            params=params,
+            headers=_HTTP_HEADERS,
+            parse=lambda html: _parse_listing_page(html, parser_backend=parser_backend),
+            parse_version=LISTING_PARSER_VERSION,
+            session=session,
+        )
+
+    # Per page: wall time (incl. throttle wait), HTTP time, bytes, status, parse time.
+    with metrics().page(f"{url}?start={start}", kind="listing") as page, metrics().phase("listing_page"):
+        if throttle is None:
+            parsed = _fetch()
+        else:
+            with throttle:
+                parsed = _fetch()
+        page["offers"] = len(parsed.get("offers") or [])
+    return parsed.get("last_start"), [ScrapedOffer(**o) for o in parsed.get("offers") or []]
+
+
+def scrape_all_offers(
+    *,
+    sleep_ms: int = 200,
+    page_size: int = 10,
+    max_pages: int = 200,
+    concurrency: int = 1,
+    per_host_limit: int = 2,
+    http_cache: HttpCache | None = None,
+    parser_backend: str | None = None,
+    list_url: str | None = None,
+) -> list[ScrapedOffer]:
+    """
+    All unique offers of a listing (default: Notübernachtung; see `iter_offer_pages`).
+    """
+    offers: list[ScrapedOffer] = []
+    for _start, page_offers in iter_offer_pages(
+        sleep_ms=sleep_ms,
+        page_size=page_size,
+        max_pages=max_pages,
+        concurrency=concurrency,
+        per_host_limit=per_host_limit,
+        http_cache=http_cache,
+        parser_backend=parser_backend,
+        list_url=list_url,
+    ):
+        offers.extend(page_offers)
+    return offers
+
+
+def iter_offer_pages(
+    *,
+    sleep_ms: int = 200,
+    page_size: int = 10,
+    max_pages: int = 200,
+    concurrency: int = 1,
+    per_host_limit: int = 2,
+    http_cache: HttpCache | None = None,
+    parser_backend: str | None = None,
+    list_url: str | None = None,
+    throttle: _HostThrottle | None = None,
+    session: "requests.Session | None" = None,
+) -> Iterator[tuple[int, list[ScrapedOffer]]]:
+    """
+    Paginate through a listing (default: Notübernachtung) by increasing `start` and yield
+    `(start, new unique offers of that page)` as soon as each page is parsed.
+
+    Kaeltehilfe uses `start` as an offset (start=0,10,20,30,...) so we advance
+    by a fixed page_size (default 10) and stop when a page returns no cards.
+
+    With `concurrency > 1` the remaining pages are fetched in parallel (see
+    `_iter_offer_pages_concurrent`); results are still consumed strictly in offset
+    order, so stop detection and dedupe behave exactly like the sequential mode.
+
+    With `http_cache` every page is fetched with a conditional GET (see `scripts.http_cache`).
+    A `throttle` / `session` passed in is shared with other listings scraped at the same time.
+    """
+    if concurrency > 1:
+        yield from _iter_offer_pages_concurrent(
+            sleep_ms=sleep_ms,
+            page_size=page_size,
+            max_pages=max_pages,
+            concurrency=concurrency,
+            per_host_limit=per_host_limit,
+            http_cache=http_cache,
+            parser_backend=parser_backend,
+            list_url=list_url,
+            throttle=throttle,
+            session=session,
+        )
+        return
+
+    state = _PaginationState()
+    start = 0
+
+    for _page in range(max_pages):
+        if start == 0:
+            logger.info("Fetching first page (start=%s)...", start)
+        else:
+            logger.debug("Fetching page (start=%s)...", start)
+        _last_start, page_offers = _fetch_listing_page(
+            start,
+            list_url=list_url,
+            throttle=throttle,
+            http_cache=http_cache,
+            parser_backend=parser_backend,
+            session=session,
+        )
+        new_offers = state.accept(start, page_offers)
+        if new_offers is None:
+            break
+        yield start, new_offers
+
+        start += max(1, int(page_size))
+
+        time_mod.sleep(max(0, sleep_ms) / 1000.0)
+
+
+def _iter_offer_pages_concurrent(
+    *,
+    sleep_ms: int,
+    page_size: int,
+    max_pages: int,
+    concurrency: int,
+    per_host_limit: int,
+    http_cache: HttpCache | None = None,
+    parser_backend: str | None = None,
+    list_url: str | None = None,
+    throttle: _HostThrottle | None = None,
+    session: "requests.Session | None" = None,
+) -> Iterator[tuple[int, list[ScrapedOffer]]]:
+    """
+    Concurrent variant of `iter_offer_pages`.
+
+    - The first page is fetched alone; if it links to later pages we know the last offset
+      and schedule everything up to it (+1 probe page to confirm the end).
+    - Without (or past) a known last offset we probe ahead speculatively, keeping at most
+      `concurrency` pages in flight.
+    - `sleep_ms` becomes the minimum gap between request starts to the host, and
+      `per_host_limit` caps in-flight requests to it.
+    - Closing the generator early cancels the pages that have not started yet.
+    """
+    step = max(1, int(page_size))
+    workers = max(1, int(concurrency))
+    if throttle is None:
+        throttle = _HostThrottle(max_in_flight=min(workers, max(1, per_host_limit)), min_interval_s=max(0, sleep_ms) / 1000.0)
+    state = _PaginationState()
+
+    if max_pages <= 0:
+        return
+
+    logger.info("Fetching first page (start=%s)...", 0)
+    last_start, first_offers = _fetch_listing_page(
+        0,
+        list_url=list_url,
+        throttle=throttle,
+        http_cache=http_cache,
+        parser_backend=parser_backend,
+        session=session,
+    )
+    new_offers = state.accept(0, first_offers)
+    if new_offers is None:
+        return
+    yield 0, new_offers
+
+    if last_start is not None:
+        logger.info("Pagination links point to last start=%s; fetching with concurrency=%s", last_start, workers)
+    else:
+        logger.info("No pagination links found; probing ahead with concurrency=%s", workers)
+
+    max_start = (max_pages - 1) * step
+    next_start = step
+    pending: deque[tuple[int, Future[tuple[int | None, list[ScrapedOffer]]]]] = deque()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kaeltehilfe-page") as pool:
+        try:
+            while True:
+                # Known range: schedule up to last_start + one confirming probe. Beyond that
+                # (or without pagination links) keep a speculative window of `workers` pages.
+                while next_start <= max_start and (
+                    next_start <= last_start + step if last_start is not None else len(pending) < workers
+                ):
+                    logger.debug("Scheduling page (start=%s)...", next_start)
+                    fut = pool.submit(
+                        _fetch_listing_page,
+                        next_start,
+                        list_url=list_url,
+                        throttle=throttle,
+                        http_cache=http_cache,
+                        parser_backend=parser_backend,
+                        session=session,
+                    )
+                    pending.append((next_start, fut))
+                    next_start += step
+
+                if not pending:
+                    break
+
+                start, fut = pending.popleft()
+                _last_start, page_offers = fut.result()
+                new_offers = state.accept(start, page_offers)
+                if new_offers is None:
+                    break
+                yield start, new_offers
+                if last_start is not None and start > last_start:
+                    # Pagination links were incomplete; keep going speculatively.
+                    last_start = None
+        finally:
+            for _start, fut in pending:
+                fut.cancel()
@@ -0,0 +1,531 @@
+"""
+Name matching between our DB `unterkuenfte` and Kaeltehilfe listing offers.
+
+`OfferMatcher` is built once per run (per offer list) and precomputes everything that
+does not depend on the DB name:
+- normalized names and significant-token sets per offer
+- an inverted index token -> offer positions (token containment stage)
+- one `difflib.SequenceMatcher` per offer with the offer name as `b` (fuzzy stages)
+
+Match kinds are the same as the original per-row matcher:
+  direct | tokens | tokens_ambiguous | fuzzy:<score> | none | empty
+
+Fuzzy (last-resort) backends:
+- "tfidf"   (default if numpy is installed): character-trigram TF-IDF cosine similarity.
+            `prepare(db_names)` scores every DB name against every offer in one matrix product.
+- "difflib" SequenceMatcher ratio (original behavior; pure Python).
+Scores are not comparable between backends, so each has its own default threshold.
+Benchmark: `python -m scripts.benchmarks.fuzzy_match`.
+
+NOTE: OfferMatcher caches SequenceMatcher state and is not thread-safe.
+"""
+
+from __future__ import annotations
+
+import difflib
+import hashlib
+import json
+import logging
+import math
+import re
+import unicodedata
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Generic, Iterable, Protocol, Sequence, TypeVar
+
+try:
+    import numpy as np
+except ModuleNotFoundError:  # pragma: no cover
+    np = None  # type: ignore
+
+logger = logging.getLogger("kaeltehilfe_match")
+
+# Words that are very common in offer names and don't help matching.
+_MATCH_STOPWORDS: set[str] = {
+    "notuebernachtung",
+    "notubernaechtiung",
+    "notubernachtung",
+    "nachtcafe",
+    "tagesangebote",
+    "beratung",
+    "hygiene",
+    "medizinische",
+    "hilfen",
+    "essen",
+    "verpflegung",
+    "kleiderkammer",
+    "suchtangebote",
+    "fuer",
+    "fur",
+    "in",
+    "am",
+    "an",
+    "im",
+    "bei",
+    "auf",
+    "der",
+    "die",
+    "das",
+    "und",
+    "oder",
+    "vom",
+    "von",
+    "zum",
+    "zur",
+    "des",
+    "den",
+    "mit",
+    "ohne",
+    "nur",
+    "alle",
+    "frauen",
+    "maenner",
+    "manner",
+    "divers",
+    "geschlechter",
+    "familien",
+    "wohnungslose",
+    "wohnungslosem",
+    "obdachlose",
+    "obdachlosen",
+}
+
+FUZZY_THRESHOLD = 0.78  # difflib ratio
+TFIDF_FUZZY_THRESHOLD = 0.65  # trigram TF-IDF cosine (calibrated via scripts.benchmarks.fuzzy_match)
+
+FUZZY_BACKENDS = ("tfidf", "difflib")
+
+
+def default_fuzzy_backend() -> str:
+    return "tfidf" if np is not None else "difflib"
+
+
+def default_fuzzy_threshold(backend: str) -> float:
+    return TFIDF_FUZZY_THRESHOLD if backend == "tfidf" else FUZZY_THRESHOLD
+
+
+def _normalize_name(name: str) -> str:
+    """
+    Normalize names for stable matching between our DB and Kaeltehilfe listing.
+    """
+    s = (name or "").strip().lower()
+    if not s:
+        return ""
+
+    # German-specific replacements before stripping diacritics.
+    s = (
+        s.replace("ä", "ae")
+        .replace("ö", "oe")
+        .replace("ü", "ue")
+        .replace("ß", "ss")
+    )
+
+    # Remove remaining diacritics.
+    s = unicodedata.normalize("NFKD", s)
+    s = "".join(ch for ch in s if not unicodedata.combining(ch))
+
+    # Normalize punctuation/whitespace.
+    s = re.sub(r"[^a-z0-9]+", " ", s)
+    s = re.sub(r"\s+", " ", s).strip()
+    return s
+
+
+def _tokens_from_norm(norm: str) -> set[str]:
+    if not norm:
+        return set()
+    toks = {t for t in norm.split(" ") if t}
+    # Remove very common boilerplate words.
+    return {t for t in toks if t not in _MATCH_STOPWORDS}
+
+
+def _match_tokens(name: str) -> set[str]:
+    return _tokens_from_norm(_normalize_name(name))
+
+
+def _trigrams(norm: str) -> list[str]:
+    if not norm:
+        return []
+    padded = f" {norm} "
+    return [padded[i : i + 3] for i in range(len(padded) - 2)]
+
+
+class TrigramTfidf:
+    """
+    Character-trigram TF-IDF over a fixed list of (normalized) offer names.
+
+    IDF is fitted on the offers (the searched documents). Query trigrams that never
+    occur in an offer cannot match anything, but still count towards the query norm,
+    so they lower the cosine similarity as they should.
+    """
+
+    def __init__(self, offer_norms: Sequence[str]) -> None:
+        if np is None:
+            raise RuntimeError("Missing dependency: numpy. Install requirements.txt (pip install -r requirements.txt).")
+
+        n_docs = len(offer_norms)
+        self.vocab: dict[str, int] = {}
+        doc_grams: list[dict[int, int]] = []
+        for norm in offer_norms:
+            counts: dict[int, int] = {}
+            for g in _trigrams(norm):
+                col = self.vocab.setdefault(g, len(self.vocab))
+                counts[col] = counts.get(col, 0) + 1
+            doc_grams.append(counts)
+
+        df = np.zeros(len(self.vocab), dtype=np.float32)
+        for counts in doc_grams:
+            df[list(counts)] += 1.0
+        # Smoothed idf (as in scikit-learn): unseen terms get the highest weight.
+        self.idf = (np.log((1.0 + n_docs) / (1.0 + df)) + 1.0).astype(np.float32)
+        self.oov_idf = float(math.log(1.0 + n_docs) + 1.0)
+
+        self.offer_matrix = self._rows(doc_grams)
+
+    def _rows(self, grams: list[dict[int, int]], oov_sq: list[float] | None = None) -> Any:
+        m = np.zeros((len(grams), len(self.vocab)), dtype=np.float32)
+        for i, counts in enumerate(grams):
+            if counts:
+                cols = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+                m[i, cols] = np.fromiter(counts.values(), dtype=np.float32, count=len(counts))
+        m *= self.idf
+        sq = np.einsum("ij,ij->i", m, m)
+        if oov_sq is not None:
+            sq = sq + np.asarray(oov_sq, dtype=np.float32)
+        norms = np.sqrt(sq)
+        norms[norms == 0] = 1.0
+        return m / norms[:, None]
+
+    def query_matrix(self, norms: Sequence[str]) -> Any:
+        grams: list[dict[int, int]] = []
+        oov_sq: list[float] = []
+        for norm in norms:
+            counts: dict[int, int] = {}
+            oov: dict[str, int] = {}
+            for g in _trigrams(norm):
+                col = self.vocab.get(g)
+                if col is None:
+                    oov[g] = oov.get(g, 0) + 1
+                else:
+                    counts[col] = counts.get(col, 0) + 1
+            grams.append(counts)
+            oov_sq.append(sum((c * self.oov_idf) ** 2 for c in oov.values()))
+        return self._rows(grams, oov_sq)
+
+    def similarity(self, norms: Sequence[str]) -> Any:
+        """
+        Cosine similarity matrix of shape (len(norms), n_offers).
+        """
+        return self.query_matrix(norms) @ self.offer_matrix.T
+
+
+class NamedOffer(Protocol):
+    name: str
+    url: str | None
+
+
+O = TypeVar("O", bound=NamedOffer)
+
+
+class OfferMatcher(Generic[O]):
+    """
+    Match DB names against a fixed list of offers.
+
+    Strategy (first hit wins):
+    1) exact match on normalized full name (first offer with that name)
+    2) token containment on "significant" tokens (stopwords removed);
+       several candidates -> closest by SequenceMatcher ratio ("tokens_ambiguous")
+    3) fuzzy match (SequenceMatcher ratio >= fuzzy_threshold) as a last resort
+    """
+
+    def __init__(
+        self,
+        offers: Sequence[O],
+        *,
+        fuzzy_backend: str = "difflib",
+        fuzzy_threshold: float | None = None,
+    ) -> None:
+        if fuzzy_backend not in FUZZY_BACKENDS:
+            raise ValueError(f"Unknown fuzzy backend {fuzzy_backend!r} (expected one of {FUZZY_BACKENDS})")
+        self.offers: list[O] = list(offers)
+        self.fuzzy_backend = fuzzy_backend
+        self.fuzzy_threshold = default_fuzzy_threshold(fuzzy_backend) if fuzzy_threshold is None else fuzzy_threshold
+        self._norms: list[str] = [_normalize_name(o.name) for o in self.offers]
+        self._tokens: list[set[str]] = [_tokens_from_norm(n) for n in self._norms]
+
+        self.offers_by_norm: dict[str, O] = {}
+        self.offers_by_url: dict[str, O] = {}
+        self.duplicate_names = 0
+        self._postings: dict[str, list[int]] = {}
+
+        for idx, (o, norm, toks) in enumerate(zip(self.offers, self._norms, self._tokens, strict=True)):
+            if o.url:
+                u = o.url.strip().lower()
+                if u and u not in self.offers_by_url:
+                    self.offers_by_url[u] = o
+            if norm:
+                if norm in self.offers_by_norm:
+                    self.duplicate_names += 1
+                else:
+                    self.offers_by_norm[norm] = o
+            for t in toks:
+                self._postings.setdefault(t, []).append(idx)
+
+        # SequenceMatcher caches its analysis of `b`; keep one per offer (built lazily).
+        self._seq: list[difflib.SequenceMatcher | None] = [None] * len(self.offers)
+
+        self._tfidf: TrigramTfidf | None = None
+        self._tfidf_rows: dict[str, Any] = {}
+        if fuzzy_backend == "tfidf" and self.offers:
+            self._tfidf = TrigramTfidf(self._norms)
+
+    def prepare(self, db_names: Iterable[str]) -> None:
+        """
+        Precompute fuzzy scores for many DB names at once (one matrix product for the
+        tfidf backend). Optional: `match()` scores unprepared names on demand.
+        """
+        if self._tfidf is None:
+            return
+        norms = sorted({n for n in (_normalize_name(x) for x in db_names) if n and n not in self._tfidf_rows})
+        if not norms:
+            return
+        sims = self._tfidf.similarity(norms)
+        for norm, row in zip(norms, sims, strict=True):
+            self._tfidf_rows[norm] = row
+
+    @property
+    def signature(self) -> str:
+        """
+        Identifies the matching config (for caches of match results).
+        """
+        return f"{self.fuzzy_backend}:{self.fuzzy_threshold:g}"
+
+    def offer_for_url(self, url: str | None) -> O | None:
+        if not url:
+            return None
+        return self.offers_by_url.get(url.strip().lower())
+
+    def _seq_for(self, idx: int, db_norm: str) -> difflib.SequenceMatcher:
+        sm = self._seq[idx]
+        if sm is None:
+            sm = difflib.SequenceMatcher(None, "", self._norms[idx])
+            self._seq[idx] = sm
+        sm.set_seq1(db_norm)
+        return sm
+
+    def _token_candidates(self, db_tokens: set[str]) -> list[int]:
+        postings = []
+        for t in db_tokens:
+            p = self._postings.get(t)
+            if not p:
+                return []
+            postings.append(p)
+        postings.sort(key=len)
+        hits = set(postings[0])
+        for p in postings[1:]:
+            hits.intersection_update(p)
+            if not hits:
+                return []
+        return sorted(hits)
+
+    def match(self, db_name: str) -> tuple[O | None, str]:
+        db_norm = _normalize_name(db_name)
+        if not db_norm:
+            return None, "empty"
+
+        direct = self.offers_by_norm.get(db_norm)
+        if direct is not None:
+            return direct, "direct"
+
+        db_tokens = _tokens_from_norm(db_norm)
+        if db_tokens:
+            candidates = self._token_candidates(db_tokens)
+            if len(candidates) == 1:
+                return self.offers[candidates[0]], "tokens"
+            if len(candidates) > 1:
+                # Pick the closest by fuzzy ratio on the normalized full string (first wins on ties).
+                best_idx = max(candidates, key=lambda idx: self._seq_for(idx, db_norm).ratio())
+                return self.offers[best_idx], "tokens_ambiguous"
+
+        # Last resort fuzzy match on full normalized name.
+        best_idx, score = self._best_fuzzy(db_norm, self.fuzzy_threshold)
+        if best_idx is not None and score >= self.fuzzy_threshold:
+            return self.offers[best_idx], f"fuzzy:{score:.2f}"
+
+        return None, "none"
+
+    def best_fuzzy(self, db_name: str, *, min_score: float = 0.0) -> tuple[O | None, float]:
+        """
+        Fuzzy stage alone: best offer and its score (no direct/token stages).
+        Offers scoring below `min_score` may be skipped (returns (None, 0.0) if none reach it).
+        """
+        idx, score = self._best_fuzzy(_normalize_name(db_name), min_score)
+        return (self.offers[idx] if idx is not None else None), score
+
+    def _best_fuzzy(self, db_norm: str, min_score: float) -> tuple[int | None, float]:
+        if not db_norm or not self.offers:
+            return None, 0.0
+        if self.fuzzy_backend == "tfidf":
+            return self._best_fuzzy_tfidf(db_norm)
+        return self._best_fuzzy_difflib(db_norm, min_score)
+
+    def _best_fuzzy_difflib(self, db_norm: str, min_score: float) -> tuple[int | None, float]:
+        # quick bounds (>= ratio) let us skip offers that cannot win or reach min_score.
+        best_idx: int | None = None
+        best_ratio = 0.0
+        for idx in range(len(self.offers)):
+            sm = self._seq_for(idx, db_norm)
+            bound = sm.real_quick_ratio()
+            if bound < min_score or bound <= best_ratio:
+                continue
+            bound = sm.quick_ratio()
+            if bound < min_score or bound <= best_ratio:
+                continue
+            r = sm.ratio()
+            if r > best_ratio:
+                best_ratio = r
+                best_idx = idx
+        return best_idx, best_ratio
+
+    def _best_fuzzy_tfidf(self, db_norm: str) -> tuple[int | None, float]:
+        assert self._tfidf is not None
+        row = self._tfidf_rows.get(db_norm)
+        if row is None:
+            row = self._tfidf.similarity([db_norm])[0]
+            self._tfidf_rows[db_norm] = row
+        best_idx = int(np.argmax(row))  # first index on ties, like the difflib loop
+        score = float(row[best_idx])
+        if score <= 0.0:
+            return None, 0.0
+        return best_idx, score
+
+
+def _best_offer_match(*, db_name: str, offers: Sequence[O], offers_by_norm: dict[str, O] | None = None) -> tuple[O | None, str]:
+    """
+    One-off match of a single DB name (builds a throwaway OfferMatcher).
+    Kept for callers/benchmarks of the old per-row API; use OfferMatcher for many rows.
+    `offers_by_norm` is accepted for compatibility; the matcher derives the same index from `offers`.
+    """
+    return OfferMatcher(offers).match(db_name)
+
+
+def name_fingerprint(name: str) -> str:
+    """
+    Stable short fingerprint of a name as the matcher sees it (normalized).
+    """
+    return hashlib.sha1(_normalize_name(name).encode("utf-8")).hexdigest()[:16]
+
+
+def _score_from_kind(kind: str) -> float | None:
+    if ":" not in kind:
+        return None
+    try:
+        return float(kind.split(":", 1)[1])
+    except ValueError:
+        return None
+
+
+class MatchCache:
+    """
+    Persisted `unterkunft_id -> offer URL` matches so unchanged rows skip the matcher.
+
+    Format (JSON):
+      {
+        "version": 1,
+        "matcher": "tfidf:0.65",
+        "by_unterkunft_id": {
+          "<uuid>": {
+            "url": "https://kaeltehilfe-berlin.de/kaeltehilfe-angebot/<slug>",
+            "match_kind": "tokens",
+            "score": null,
+            "db_name_fp": "<fingerprint>",
+            "offer_name_fp": "<fingerprint>",
+            "matched_at": "<iso timestamp>"
+          }
+        }
+      }
+
+    An entry is reused only if the DB name and the offer name (looked up by URL in the
+    current listing) both still have the cached fingerprints. The whole cache is dropped
+    when the matcher config (backend/threshold) changes.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: Path, *, matcher_signature: str) -> None:
+        self.path = path
+        self.matcher_signature = matcher_signature
+        self.entries: dict[str, dict[str, Any]] = {}
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path: str | Path, *, matcher_signature: str) -> "MatchCache":
+        cache = cls(Path(path), matcher_signature=matcher_signature)
+        if not cache.path.exists():
+            return cache
+        try:
+            raw = json.loads(cache.path.read_text(encoding="utf-8"))
+        except Exception as ex:  # pragma: no cover
+            logger.warning("Failed to parse match cache (%s): %s", cache.path, ex)
+            return cache
+        if not isinstance(raw, dict) or raw.get("version") != cls.VERSION:
+            return cache
+        if raw.get("matcher") != matcher_signature:
+            logger.info("Match cache was built with %s (now %s); ignoring it", raw.get("matcher"), matcher_signature)
+            cache._dirty = True
+            return cache
+        by_id = raw.get("by_unterkunft_id")
+        if isinstance(by_id, dict):
+            cache.entries = {str(k): v for k, v in by_id.items() if isinstance(v, dict)}
+        return cache
+
+    def lookup(self, unterkunft_id: str, db_name: str, matcher: OfferMatcher[O]) -> tuple[O | None, str]:
+        """
+        Returns (offer, "cached:<original match kind>") or (None, "none").
+        """
+        e = self.entries.get(unterkunft_id)
+        if e is None or e.get("db_name_fp") != name_fingerprint(db_name):
+            return None, "none"
+        offer = matcher.offer_for_url(e.get("url"))
+        if offer is None or e.get("offer_name_fp") != name_fingerprint(offer.name):
+            return None, "none"
+        return offer, f"cached:{e.get('match_kind') or 'unknown'}"
+
+    def store(self, unterkunft_id: str, db_name: str, offer: NamedOffer, match_kind: str) -> None:
+        if not offer.url:
+            return
+        entry: dict[str, Any] = {
+            "url": offer.url,
+            "match_kind": match_kind,
+            "score": _score_from_kind(match_kind),
+            "db_name_fp": name_fingerprint(db_name),
+            "offer_name_fp": name_fingerprint(offer.name),
+        }
+        prev = self.entries.get(unterkunft_id)
+        if prev is not None and all(prev.get(k) == v for k, v in entry.items()):
+            return
+        entry["matched_at"] = datetime.now(timezone.utc).isoformat()
+        self.entries[unterkunft_id] = entry
+        self._dirty = True
+
+    def forget(self, unterkunft_id: str) -> None:
+        if self.entries.pop(unterkunft_id, None) is not None:
+            self._dirty = True
+
+    def prune(self, keep_ids: Iterable[str]) -> None:
+        keep = set(keep_ids)
+        for uid in [k for k in self.entries if k not in keep]:
+            self.forget(uid)
+
+    def save(self) -> None:
+        if not self._dirty:
+            return
+        payload = {
+            "version": self.VERSION,
+            "matcher": self.matcher_signature,
+            "by_unterkunft_id": dict(sorted(self.entries.items())),
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(self.path)
+        self._dirty = False
@@ -0,0 +1,314 @@
+"""
+Parse Kaeltehilfe listing pages (offer cards + traffic-light images) into `ScrapedOffer`s.
+
+Parser backends (identical output, checked on `scripts/html/*.html`):
+- "lxml"   (default if lxml is installed): libxml2 HTML parser + XPath over the card subtrees.
+- "stream" stdlib `html.parser` tokenizer; keeps no tree, only state for the currently
+           open `el-item uk-card` cards (no extra dependency).
+- "bs4"    BeautifulSoup + html.parser (original implementation; slowest).
+Benchmark: `python -m scripts.benchmarks.parse_listing`.
+
+A card is a `div` whose class list contains both "el-item" and "uk-card":
+- name/url: first `a` inside an `h3.el-title` of the card
+- statuses: `img[alt]` inside `div.fs-grid-nested-2` ("Viele/Wenige/Keine Plätze [für Männer|Frauen|Divers]")
+"""
+
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from typing import Any, Callable
+from urllib.parse import urljoin
+
+try:
+    from bs4 import BeautifulSoup  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover
+    BeautifulSoup = None  # type: ignore
+
+try:
+    import lxml.html as lxml_html  # type: ignore
+except ModuleNotFoundError:  # pragma: no cover
+    lxml_html = None  # type: ignore
+
+# KAELTEHILFE_BASE_URL points the scripts at a stand-in site (see scripts/fake_upstreams.py).
+KAEHLTEHILFE_BASE = os.getenv("KAELTEHILFE_BASE_URL", "").rstrip("/") or "https://kaeltehilfe-berlin.de"
+
+CapacityStatus = str  # "none" | "little" | "plenty"
+
+PARSER_BACKENDS = ("lxml", "stream", "bs4")
+
+
+@dataclass(frozen=True)
+class ScrapedOffer:
+    name: str
+    url: str | None
+    status_all: CapacityStatus | None
+    status_men: CapacityStatus | None
+    status_women: CapacityStatus | None
+    status_diverse: CapacityStatus | None
+
+
+def default_parser_backend() -> str:
+    return "lxml" if lxml_html is not None else "stream"
+
+
+def _parse_status_from_alt(alt: str | None) -> CapacityStatus | None:
+    if not alt:
+        return None
+    a = alt.strip().lower()
+    if not a:
+        return None
+    if "keine plätze" in a:
+        return "none"
+    if "wenige plätze" in a:
+        return "little"
+    if "viele plätze" in a:
+        return "plenty"
+    return None
+
+
+def _offer_from_parts(name: str, href: Any, alts: list[Any]) -> ScrapedOffer:
+    url = urljoin(KAEHLTEHILFE_BASE, str(href)) if href else None
+
+    status_all: CapacityStatus | None = None
+    status_men: CapacityStatus | None = None
+    status_women: CapacityStatus | None = None
+    status_diverse: CapacityStatus | None = None
+
+    for alt in alts:
+        status = _parse_status_from_alt(alt)
+        if status is None:
+            continue
+
+        alt_l = str(alt).lower() if alt is not None else ""
+        if "männer" in alt_l or "maenner" in alt_l:
+            status_men = status
+        elif "frauen" in alt_l:
+            status_women = status
+        elif "divers" in alt_l:
+            status_diverse = status
+        else:
+            status_all = status
+
+    return ScrapedOffer(
+        name=name,
+        url=url,
+        status_all=status_all,
+        status_men=status_men,
+        status_women=status_women,
+        status_diverse=status_diverse,
+    )
+
+
+def _join_text(parts: list[str]) -> str:
+    # Same as bs4 `get_text(" ", strip=True)`.
+    return " ".join(s for s in (p.strip() for p in parts) if s)
+
+
+# --- bs4 ---------------------------------------------------------------------------------
+
+
+def parse_listing_bs4(html: str) -> list[ScrapedOffer]:
+    if BeautifulSoup is None:
+        raise RuntimeError("Missing dependency: beautifulsoup4. Install requirements.txt (pip install -r requirements.txt).")
+
+    soup = BeautifulSoup(html, "html.parser")
+
+    # Cards have class "el-item ... uk-card ..."
+    def _is_card_class(c: Any) -> bool:
+        if not c:
+            return False
+        if isinstance(c, str):
+            parts = c.split()
+        elif isinstance(c, list):
+            parts = [str(x) for x in c]
+        else:
+            return False
+        return ("el-item" in parts) and ("uk-card" in parts)
+
+    out: list[ScrapedOffer] = []
+    for card in soup.find_all("div", class_=_is_card_class):
+        a = card.select_one("h3.el-title a")
+        if not a:
+            continue
+        alts = [img.get("alt") for img in card.select("div.fs-grid-nested-2 img")]
+        out.append(_offer_from_parts(a.get_text(" ", strip=True), a.get("href"), alts))
+    return out
+
+
+# --- lxml --------------------------------------------------------------------------------
+
+
+def _has_class_xpath(cls: str) -> str:
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {cls} ')"
+
+
+_XP_CARDS = f"//div[{_has_class_xpath('el-item')} and {_has_class_xpath('uk-card')}]"
+_XP_TITLE_LINK = f".//h3[{_has_class_xpath('el-title')}]//a"
+_XP_STATUS_IMGS = f".//div[{_has_class_xpath('fs-grid-nested-2')}]//img"
+
+
+def parse_listing_lxml(html: str) -> list[ScrapedOffer]:
+    if lxml_html is None:
+        raise RuntimeError("Missing dependency: lxml. Install requirements.txt (pip install -r requirements.txt).")
+    if not html or not html.strip():
+        return []
+
+    root = lxml_html.fromstring(html)
+    out: list[ScrapedOffer] = []
+    for card in root.xpath(_XP_CARDS):
+        links = card.xpath(_XP_TITLE_LINK)
+        if not links:
+            continue
+        a = links[0]
+        name = _join_text([t for t in a.xpath(".//text()")])
+        alts = [img.get("alt") for img in card.xpath(_XP_STATUS_IMGS)]
+        out.append(_offer_from_parts(name, a.get("href"), alts))
+    return out
+
+
+# --- stream ------------------------------------------------------------------------------
+
+# Elements html.parser never closes (BeautifulSoup treats them as empty, too).
+_VOID_ELEMENTS = frozenset(
+    {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr"}
+)
+
+
+class _CardState:
+    __slots__ = ("depth", "in_title", "link_depth", "done_link", "name_parts", "href", "nested2_depth", "alts", "has_link")
+
+    def __init__(self, depth: int) -> None:
+        self.depth = depth  # stack depth of the card's own div
+        self.in_title = 0  # open h3.el-title count inside the card
+        self.link_depth: int | None = None  # stack depth of the first title link while it is open
+        self.done_link = False
+        self.has_link = False
+        self.name_parts: list[str] = []
+        self.href: str | None = None
+        self.nested2_depth = 0  # open div.fs-grid-nested-2 count inside the card
+        self.alts: list[str | None] = []
+
+
+class _ListingTokenizer(HTMLParser):
+    """
+    Single pass over the token stream; only cards (and their title/status markers) keep state.
+
+    The open-element stack mirrors BeautifulSoup's html.parser tree builder: void elements are
+    never pushed and an end tag closes up to the nearest open element with the same name.
+    """
+
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        # (tag, marker) per open element; marker is "card" | "title" | "nested2" | "link" | ""
+        self._stack: list[tuple[str, str]] = []
+        self._cards: list[_CardState] = []  # currently open cards (outer -> inner)
+        self._slots: list[_CardState] = []  # every card in document (start tag) order
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        classes: list[str] = []
+        if tag in ("div", "h3"):
+            for k, v in attrs:
+                if k == "class" and v:
+                    classes = v.split()
+                    break
+
+        if tag == "img":
+            alt = None
+            has_alt = False
+            for k, v in attrs:
+                if k == "alt":
+                    alt, has_alt = v, True
+                    break
+            for card in self._cards:
+                if card.nested2_depth:
+                    card.alts.append(alt if has_alt else None)
+
+        if tag in _VOID_ELEMENTS:
+            return
+
+        marker = ""
+        if tag == "div" and "el-item" in classes and "uk-card" in classes:
+            marker = "card"
+        elif tag == "div" and "fs-grid-nested-2" in classes:
+            marker = "nested2"
+            for card in self._cards:
+                card.nested2_depth += 1
+        elif tag == "h3" and "el-title" in classes:
+            marker = "title"
+            for card in self._cards:
+                card.in_title += 1
+        elif tag == "a":
+            for card in self._cards:
+                if card.in_title and not card.done_link and card.link_depth is None:
+                    card.link_depth = len(self._stack)
+                    card.has_link = True
+                    card.href = dict(attrs).get("href")
+
+        self._stack.append((tag, marker))
+        if marker == "card":
+            card = _CardState(len(self._stack) - 1)
+            self._cards.append(card)
+            self._slots.append(card)
+
+    def handle_startendtag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        # `<div/>` etc.: BeautifulSoup opens and immediately closes the element.
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag: str) -> None:
+        for i in range(len(self._stack) - 1, -1, -1):
+            if self._stack[i][0] == tag:
+                break
+        else:
+            return
+        while len(self._stack) > i:
+            self._pop()
+
+    def _pop(self) -> None:
+        depth = len(self._stack) - 1
+        _tag, marker = self._stack.pop()
+        for card in self._cards:
+            if card.link_depth == depth:
+                card.link_depth = None
+                card.done_link = True
+        if marker == "nested2":
+            for card in self._cards:
+                card.nested2_depth = max(0, card.nested2_depth - 1)
+        elif marker == "title":
+            for card in self._cards:
+                card.in_title = max(0, card.in_title - 1)
+        elif marker == "card":
+            self._cards = [c for c in self._cards if c.depth != depth]
+
+    def handle_data(self, data: str) -> None:
+        for card in self._cards:
+            if card.link_depth is not None:
+                card.name_parts.append(data)
+
+    def offers(self) -> list[ScrapedOffer]:
+        return [_offer_from_parts(_join_text(c.name_parts), c.href, c.alts) for c in self._slots if c.has_link]
+
+
+def parse_listing_stream(html: str) -> list[ScrapedOffer]:
+    tok = _ListingTokenizer()
+    tok.feed(html or "")
+    tok.close()
+    return tok.offers()
+
+
+_PARSERS: dict[str, Callable[[str], list[ScrapedOffer]]] = {
+    "lxml": parse_listing_lxml,
+    "stream": parse_listing_stream,
+    "bs4": parse_listing_bs4,
+}
+
+
+def parse_listing(html: str, *, backend: str | None = None) -> list[ScrapedOffer]:
+    name = backend or default_parser_backend()
+    fn = _PARSERS.get(name)
+    if fn is None:
+        raise ValueError(f"Unknown parser backend: {name!r} (expected one of {', '.join(PARSER_BACKENDS)})")
+    return fn(html)
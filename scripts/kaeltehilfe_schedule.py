@@ -0,0 +1,252 @@
+"""
+Weekly intake schedule per shelter, built from the opening-hours columns of `unterkuenfte`.
+
+Why:
+- Traffic lights only move while a shelter admits people (opening until last admission,
+  mostly in the evening). Polling every shelter at every hour wastes requests and writes
+  during the day and is still not fresh enough in the evening.
+- `OpeningHoursSchedule.active_ids(now)` returns the shelters whose intake window is open or
+  opens within `lead_min`; the capacity sync then only refreshes those (see
+  `scripts.scrape_kaeltehilfe_capacity --schedule`).
+
+Model:
+- A week is split into `SLOT_MINUTES` slots (Monday 00:00 Berlin time = slot 0); a shelter's
+  schedule is an int bitmask over those slots.
+- Daily intake window: `oeffnung_von` -> `letzter_einlass` (else `oeffnung_bis`), at most
+  `MAX_INTAKE_MINUTES` long; windows past midnight continue into the next day.
+- Days and, if the time columns are empty, times are taken from `general_opening_hours`
+  ("Mo-Fr", "Sa/So", "täglich", "18-08 Uhr", "letzter Einlass: 22 Uhr", ...).
+- Shelters without any usable time get no schedule (`None`) and are always treated as active:
+  an unparseable row must never drop out of the sync.
+
+Known strings and their parse are checked by `python -m scripts.benchmarks.parse_schedule`.
+"""
+
+from __future__ import annotations
+
+import re
+from datetime import datetime, time, timedelta
+from typing import Any, Iterable
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+try:
+    BERLIN_TZ: Any = ZoneInfo("Europe/Berlin")
+except ZoneInfoNotFoundError:  # pragma: no cover
+    # No tz database (e.g. minimal containers): fall back to the host's local time.
+    BERLIN_TZ = None
+
+SLOT_MINUTES = 15
+DAY_MINUTES = 24 * 60
+WEEK_SLOTS = 7 * DAY_MINUTES // SLOT_MINUTES
+# Capacity settles a few hours after opening; cap windows of shelters without `letzter_einlass`.
+MAX_INTAKE_MINUTES = 6 * 60
+DEFAULT_LEAD_MINUTES = 30
+
+_DAY_NAMES: dict[str, int] = {
+    "mo": 0,
+    "di": 1,
+    "mi": 2,
+    "do": 3,
+    "fr": 4,
+    "sa": 5,
+    "so": 6,
+}
+_DAY = r"(mo|di|mi|do|fr|sa|so)(?:ntag|enstag|ttwoch|nnerstag|eitag|mstag|nntag|nnabend)?\b\.?"
+_DAY_RANGE_RE = re.compile(rf"\b{_DAY}\s*(?:-|–|bis)\s*{_DAY}", re.IGNORECASE)
+_DAY_SINGLE_RE = re.compile(rf"\b{_DAY}", re.IGNORECASE)
+_EVERY_DAY_RE = re.compile(r"\b(täglich|taeglich|ganzjährig|jeden tag)\b", re.IGNORECASE)
+_WEEKEND_RE = re.compile(r"\bwochenende\b", re.IGNORECASE)
+# Text up to the next ",", ";", "." or " I " column separator (a capital I only: the pattern is
+# case-insensitive, and a plain [^I] would also stop at every "i" of "Mittwoch").
+_CLAUSE = r"(?:(?!\s(?-i:I)(?:\s|$))[^,;.])*"
+# "Sa/So geschlossen", "außer Mo": days named there are not opening days.
+_CLOSED_RE = re.compile(rf"{_CLAUSE}\bgeschlossen\b|\b(?:außer|ausser)\b{_CLAUSE}", re.IGNORECASE)
+# "18-08 Uhr", "20–8 Uhr", "18:00-08:00" (a bare "25 - 30" from a date range does not match)
+_TIME_RANGE_RE = re.compile(
+    r"(?<![\d.])(\d{1,2})(?::(\d{2}))?\s*(?:uhr)?\s*(?:-|–|bis)\s*(\d{1,2})(?::(\d{2}))?\s*uhr"
+    r"|(?<![\d.])(\d{1,2}):(\d{2})\s*(?:-|–|bis)\s*(\d{1,2}):(\d{2})",
+    re.IGNORECASE,
+)
+_LAST_ENTRY_RE = re.compile(r"letzte[rn]?\s+einlass\W*(?:um|bis|ab)?\s*(\d{1,2})(?::(\d{2}))?", re.IGNORECASE)
+
+
+def _minutes(value: Any) -> int | None:
+    """
+    Postgres `time` ("HH:MM:SS"), `datetime.time` or None -> minutes after midnight.
+    """
+    if value is None:
+        return None
+    if isinstance(value, time):
+        return value.hour * 60 + value.minute
+    m = re.match(r"^\s*(\d{1,2}):(\d{2})", str(value))
+    if not m:
+        return None
+    hh, mm = int(m.group(1)), int(m.group(2))
+    if hh > 24 or mm > 59:
+        return None
+    return (hh * 60 + mm) % DAY_MINUTES
+
+
+def _hm(hh: str | None, mm: str | None) -> int | None:
+    if hh is None:
+        return None
+    h, m = int(hh), int(mm or 0)
+    if h > 24 or m > 59:
+        return None
+    return (h * 60 + m) % DAY_MINUTES
+
+
+def _named_days(text: str) -> set[int]:
+    days: set[int] = set()
+    for m in _DAY_RANGE_RE.finditer(text):
+        a, b = _DAY_NAMES[m.group(1).lower()], _DAY_NAMES[m.group(2).lower()]
+        d = a
+        while True:
+            days.add(d)
+            if d == b:
+                break
+            d = (d + 1) % 7
+    for m in _DAY_SINGLE_RE.finditer(text):
+        days.add(_DAY_NAMES[m.group(1).lower()])
+    if _WEEKEND_RE.search(text):
+        days.update((5, 6))
+    return days
+
+
+def parse_days(text: str | None) -> set[int]:
+    """
+    Weekdays (0 = Monday) named in a free-text opening-hours string; all days if none are named.
+    """
+    t = text or ""
+    closed: set[int] = set()
+    for m in _CLOSED_RE.finditer(t):
+        closed |= _named_days(m.group(0))
+    open_text = _CLOSED_RE.sub(" ", t)
+    days = _named_days(open_text)
+    if not days or _EVERY_DAY_RE.search(open_text):
+        days = set(range(7))
+    return (days - closed) or set(range(7))
+
+
+def parse_times(text: str | None) -> tuple[int | None, int | None, int | None]:
+    """
+    (opening, closing, last entry) in minutes after midnight from free text; missing -> None.
+    """
+    t = text or ""
+    von = bis = last = None
+    m = _TIME_RANGE_RE.search(t)
+    if m:
+        if m.group(1) is not None:
+            von, bis = _hm(m.group(1), m.group(2)), _hm(m.group(3), m.group(4))
+        else:
+            von, bis = _hm(m.group(5), m.group(6)), _hm(m.group(7), m.group(8))
+    m = _LAST_ENTRY_RE.search(t)
+    if m:
+        last = _hm(m.group(1), m.group(2))
+    return von, bis, last
+
+
+def intake_window(row: dict[str, Any]) -> tuple[int, int] | None:
+    """
+    Daily (start minute, length in minutes) of a shelter's intake, or None if unknown.
+    """
+    text = row.get("general_opening_hours")
+    t_von, t_bis, t_last = parse_times(text)
+    von = _minutes(row.get("oeffnung_von"))
+    bis = _minutes(row.get("oeffnung_bis"))
+    last = _minutes(row.get("letzter_einlass"))
+    if von is None:
+        von, bis = t_von, (bis if bis is not None else t_bis)
+    if last is None:
+        last = t_last
+    if von is None:
+        return None
+
+    end = last if last is not None else bis
+    if end is None:
+        length = MAX_INTAKE_MINUTES
+    else:
+        length = (end - von) % DAY_MINUTES or DAY_MINUTES
+        if last is None:
+            length = min(length, MAX_INTAKE_MINUTES)
+    return von, length
+
+
+def weekly_mask(row: dict[str, Any]) -> int | None:
+    """
+    Bitmask of weekly slots in which the shelter's intake is open (None = no usable schedule).
+    """
+    window = intake_window(row)
+    if window is None:
+        return None
+    start, length = window
+    mask = 0
+    n_slots = max(1, -(-length // SLOT_MINUTES))
+    for day in parse_days(row.get("general_opening_hours")):
+        first = (day * DAY_MINUTES + start) // SLOT_MINUTES
+        for i in range(n_slots):
+            mask |= 1 << ((first + i) % WEEK_SLOTS)
+    return mask
+
+
+def slot_of(now: datetime) -> int:
+    local = now.astimezone(BERLIN_TZ) if BERLIN_TZ is not None else now.astimezone()
+    return (local.weekday() * DAY_MINUTES + local.hour * 60 + local.minute) // SLOT_MINUTES
+
+
+def _window_mask(first: int, count: int) -> int:
+    mask = 0
+    for i in range(max(1, count)):
+        mask |= 1 << ((first + i) % WEEK_SLOTS)
+    return mask
+
+
+class OpeningHoursSchedule:
+    """
+    Per-shelter weekly intake masks; rebuilt whenever the DB rows are (re)loaded.
+    """
+
+    def __init__(self, rows: Iterable[dict[str, Any]], *, lead_min: int = DEFAULT_LEAD_MINUTES) -> None:
+        self.lead_min = max(0, int(lead_min))
+        self.masks: dict[str, int | None] = {}
+        for r in rows:
+            uid = str(r.get("id") or "")
+            if uid:
+                self.masks[uid] = weekly_mask(r)
+
+    @property
+    def unscheduled(self) -> int:
+        return sum(1 for m in self.masks.values() if m is None)
+
+    def _horizon(self, now: datetime) -> int:
+        return _window_mask(slot_of(now), 1 + self.lead_min // SLOT_MINUTES)
+
+    def is_active(self, unterkunft_id: str, now: datetime) -> bool:
+        mask = self.masks.get(unterkunft_id)
+        return mask is None or bool(mask & self._horizon(now))
+
+    def active_ids(self, now: datetime) -> set[str]:
+        horizon = self._horizon(now)
+        return {uid for uid, mask in self.masks.items() if mask is None or mask & horizon}
+
+    def seconds_until_next_active(self, now: datetime) -> float | None:
+        """
+        Seconds until some scheduled shelter enters its lead window (0 if one is active now;
+        None if no shelter has a schedule).
+        """
+        combined = 0
+        for mask in self.masks.values():
+            if mask is not None:
+                combined |= mask
+        if not combined:
+            return None
+        if combined & self._horizon(now):
+            return 0.0
+        lead_slots = self.lead_min // SLOT_MINUTES
+        current = slot_of(now)
+        for ahead in range(1, WEEK_SLOTS):
+            if combined >> ((current + ahead + lead_slots) % WEEK_SLOTS) & 1:
+                local = now.astimezone(BERLIN_TZ) if BERLIN_TZ is not None else now.astimezone()
+                slot_start = local.replace(second=0, microsecond=0) - timedelta(minutes=local.minute % SLOT_MINUTES)
+                return max(0.0, (slot_start + timedelta(minutes=ahead * SLOT_MINUTES) - local).total_seconds())
+        return None  # pragma: no cover
@@ -0,0 +1,1106 @@
+"""
+Sync Kaeltehilfe listings into `unterkuenfte`: one pipeline per category (`_CapacitySync`),
+several categories concurrently with shared resources (`sync_categories`, `_SyncResources`).
+
+Used by `scripts.scrape_kaeltehilfe_capacity` (one-shot runs) and `scripts.kaeltehilfe_daemon`
+(one `_SyncResources` kept across cycles).
+
+Requires:
+  - requests, lxml or beautifulsoup4 (pip install -r requirements.txt)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import queue
+import threading
+import time as time_mod
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterable, Sequence
+
+try:
+    import requests
+except ModuleNotFoundError:  # pragma: no cover
+    requests = None  # type: ignore
+
+try:
+    from scripts.http_cache import HttpCache, json_digest
+    from scripts.kaeltehilfe_db import (
+        APPLY_DETAILS_RPC,
+        DETAILS_COLUMN,
+        SCHEDULE_COLUMNS,
+        _now_iso,
+        apply_capacity_updates,
+        capacity_changed,
+        capacity_payload,
+        fetch_db_unterkuenfte_by_typ,
+        last_full_run_at,
+        record_scrape_run,
+        scrape_source,
+    )
+    from scripts.kaeltehilfe_details import TokenBucket, fetch_details
+    from scripts.kaeltehilfe_history import HistoryStore
+    from scripts.kaeltehilfe_listing import (
+        _HTTP_HEADERS,
+        _HostThrottle,
+        _fetch_listing_page,
+        _listing_session,
+        category_list_url,
+        iter_offer_pages,
+    )
+    from scripts.kaeltehilfe_match import MatchCache, OfferMatcher, _normalize_name
+    from scripts.kaeltehilfe_parse import ScrapedOffer
+    from scripts.kaeltehilfe_schedule import OpeningHoursSchedule
+    from scripts.run_metrics import metrics
+except ModuleNotFoundError:  # pragma: no cover
+    import sys
+
+    repo_root = Path(__file__).resolve().parents[1]
+    if str(repo_root) not in sys.path:
+        sys.path.insert(0, str(repo_root))
+    from scripts.http_cache import HttpCache, json_digest
+    from scripts.kaeltehilfe_db import (
+        APPLY_DETAILS_RPC,
+        DETAILS_COLUMN,
+        SCHEDULE_COLUMNS,
+        _now_iso,
+        apply_capacity_updates,
+        capacity_changed,
+        capacity_payload,
+        fetch_db_unterkuenfte_by_typ,
+        last_full_run_at,
+        record_scrape_run,
+        scrape_source,
+    )
+    from scripts.kaeltehilfe_details import TokenBucket, fetch_details
+    from scripts.kaeltehilfe_history import HistoryStore
+    from scripts.kaeltehilfe_listing import (
+        _HTTP_HEADERS,
+        _HostThrottle,
+        _fetch_listing_page,
+        _listing_session,
+        category_list_url,
+        iter_offer_pages,
+    )
+    from scripts.kaeltehilfe_match import MatchCache, OfferMatcher, _normalize_name
+    from scripts.kaeltehilfe_parse import ScrapedOffer
+    from scripts.kaeltehilfe_schedule import OpeningHoursSchedule
+    from scripts.run_metrics import metrics
+
+logger = logging.getLogger("kaeltehilfe_sync")
+
+
+def _repo_root() -> Path:
+    return Path(__file__).resolve().parents[1]
+
+
+def _load_overrides() -> dict[str, str]:
+    """
+    Load manual overrides from `scripts/kaeltehilfe_overrides.json`.
+
+    Format:
+      {
+        "by_unterkunft_id": {
+          "<uuid>": "https://kaeltehilfe-berlin.de/kaeltehilfe-angebot/<slug>"
+        }
+      }
+    """
+    path = _repo_root() / "scripts" / "kaeltehilfe_overrides.json"
+    if not path.exists():
+        return {}
+    try:
+        raw = json.loads(path.read_text(encoding="utf-8"))
+    except Exception as ex:  # pragma: no cover
+        logger.warning("Failed to parse overrides JSON (%s): %s", path, ex)
+        return {}
+
+    if not isinstance(raw, dict):
+        return {}
+    by_id = raw.get("by_unterkunft_id")
+    if not isinstance(by_id, dict):
+        return {}
+    out: dict[str, str] = {}
+    for k, v in by_id.items():
+        kid = str(k).strip()
+        url = str(v).strip() if v is not None else ""
+        if kid and url:
+            out[kid] = url
+    return out
+
+
+# Phases in the order they appear in the timing log line (others follow alphabetically).
+_REPORT_PHASES = ("listing_page", "parse", "db_read", "match", "write", "details_fetch", "details_write", "history", "scrape_runs")
+
+
+def write_run_report(args: argparse.Namespace, **extra: Any) -> None:
+    """
+    Log a one-line timing summary and write the run report (--metrics-json / --metrics-prom).
+    A report that cannot be written only logs a warning.
+    """
+    m = metrics()
+    rep = m.report()
+    phases = rep["phases"]
+    names = [p for p in _REPORT_PHASES if p in phases] + sorted(p for p in phases if p not in _REPORT_PHASES)
+    listing = [p for p in rep["pages"] if p.get("kind") == "listing"]
+    parts = [f"{name} {phases[name]['seconds']:.2f}s/{phases[name]['count']}" for name in names]
+    logger.info(
+        "Timing: %.1fs total | %s | %s listing pages, %.0f KiB",
+        rep["duration_s"],
+        " ".join(parts) or "-",
+        len(listing),
+        sum(p.get("bytes", 0) for p in listing) / 1024,
+    )
+    try:
+        if getattr(args, "metrics_json", None):
+            m.write_json(args.metrics_json, commit=bool(args.commit), **extra)
+        if getattr(args, "metrics_prom", None):
+            m.write_prometheus(args.metrics_prom)
+    except OSError as ex:
+        logger.warning("Could not write run report: %s", ex)
+
+
+# Parsed pages buffered between the fetch and match stages (backpressure on pagination).
+PIPELINE_PAGE_QUEUE_SIZE = 4
+
+_END = object()
+
+
+class _StageFailed:
+    def __init__(self, ex: BaseException) -> None:
+        self.ex = ex
+
+
+def _put(q: "queue.Queue[Any]", item: Any, stop: threading.Event) -> bool:
+    """
+    Blocking put that gives up once the pipeline is stopped (so a stage never hangs on a dead consumer).
+    """
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+class _CategoryLog(logging.LoggerAdapter):
+    """
+    Prefixes messages with the category when several categories are scraped in one run.
+    """
+
+    def process(self, msg: Any, kwargs: Any) -> tuple[Any, Any]:
+        prefix = (self.extra or {}).get("prefix") or ""
+        return (f"{prefix}{msg}" if prefix else msg), kwargs
+
+
+class _SharedRows:
+    """
+    One DB read for all categories of a run (`typ=in.(...)`), started on first demand
+    (a category whose listing is unchanged never triggers it).
+    """
+
+    def __init__(self, url: str, key: str, typs: Sequence[str], *, extra_columns: Sequence[str] = ()) -> None:
+        self.url = url
+        self.key = key
+        self.typs = list(typs)
+        self.extra_columns = tuple(extra_columns)
+        self._lock = threading.Lock()
+        self._pool: ThreadPoolExecutor | None = None
+        self._future: Future[dict[str, list[dict[str, Any]]]] | None = None
+
+    def start(self) -> None:
+        with self._lock:
+            if self._future is None:
+                self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="kaeltehilfe-db")
+                self._future = self._pool.submit(
+                    fetch_db_unterkuenfte_by_typ, self.url, self.key, self.typs, extra_columns=self.extra_columns
+                )
+
+    def rows_for(self, typ: str) -> list[dict[str, Any]]:
+        self.start()
+        assert self._future is not None
+        return list(self._future.result().get(typ, []))
+
+    def all_rows(self) -> list[dict[str, Any]]:
+        self.start()
+        assert self._future is not None
+        return [r for rows in self._future.result().values() for r in rows]
+
+    def all_ids(self) -> list[str] | None:
+        """
+        Ids of every row read (None if the DB was never read or the read failed).
+        """
+        if self._future is None or not self._future.done() or self._future.exception() is not None:
+            return None
+        return [str(r.get("id") or "") for rows in self._future.result().values() for r in rows]
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class _OfferIndex:
+    """
+    Offers of every category listing scraped in this run, by URL.
+
+    Lets an override point to an offer that is listed under another category. Lookups wait
+    until every listing is complete, so the result does not depend on thread timing.
+    """
+
+    def __init__(self, typs: Iterable[str]) -> None:
+        self._by_url: dict[str, ScrapedOffer] = {}
+        self._pending = set(typs)
+        self._cond = threading.Condition()
+
+    def add(self, offers: Iterable[ScrapedOffer]) -> None:
+        with self._cond:
+            for o in offers:
+                u = (o.url or "").strip().lower()
+                if u and u not in self._by_url:
+                    self._by_url[u] = o
+
+    def listing_done(self, typ: str) -> None:
+        with self._cond:
+            self._pending.discard(typ)
+            self._cond.notify_all()
+
+    def offer_for_url(self, url: str | None) -> ScrapedOffer | None:
+        if not url:
+            return None
+        with self._cond:
+            self._cond.wait_for(lambda: not self._pending)
+            return self._by_url.get(url.strip().lower())
+
+
+class _SyncResources:
+    """
+    What `sync_categories` shares between categories. A single run builds and closes its own;
+    the daemon keeps one alive across cycles (keep-alive session, caches, and the DB rows,
+    which the syncs update in place after successful writes).
+    """
+
+    def __init__(self, args: argparse.Namespace, url: str, key: str, typs: Sequence[str]) -> None:
+        self.url = url
+        self.key = key
+        self.typs = list(typs)
+        self.http_cache = None if args.no_http_cache else HttpCache.load(args.http_cache)
+        self.match_cache: MatchCache | None = None
+        if not args.no_match_cache:
+            signature = OfferMatcher([], fuzzy_backend=args.fuzzy_backend, fuzzy_threshold=args.fuzzy_threshold).signature
+            self.match_cache = MatchCache.load(args.match_cache, matcher_signature=signature)
+            logger.info("Loaded %s cached matches from %s", len(self.match_cache.entries), args.match_cache)
+
+        self.throttle = _HostThrottle(max_in_flight=max(1, args.per_host_limit), min_interval_s=max(0, args.sleep_ms) / 1000.0)
+        self.session = _listing_session(max(args.per_host_limit, args.concurrency))
+        details = bool(getattr(args, "details", False))
+        self.details_bucket = TokenBucket(rate_per_s=args.details_rate, burst=args.details_burst) if details else None
+        self._extra_columns = ((DETAILS_COLUMN,) if details else ()) + (
+            SCHEDULE_COLUMNS if getattr(args, "schedule", False) else ()
+        )
+        self.rows = _SharedRows(url, key, self.typs, extra_columns=self._extra_columns)
+        self.rows_loaded_at = time_mod.monotonic()
+        # source -> id of its last `scrape_runs` row if that run changed nothing; the next idle
+        # cycle (daemon) extends that row instead of adding one.
+        self.idle_runs: dict[str, int] = {}
+        self.history: HistoryStore | None = None
+        if not getattr(args, "no_history", True):
+            try:
+                self.history = HistoryStore(args.history)
+            except RuntimeError as ex:
+                logger.warning("Status history disabled: %s", ex)
+
+    def refresh_rows(self) -> None:
+        """
+        Drop the in-memory DB rows; the next sync that needs them reads them again.
+        """
+        self.rows.close()
+        self.rows = _SharedRows(self.url, self.key, self.typs, extra_columns=self._extra_columns)
+        self.rows_loaded_at = time_mod.monotonic()
+
+    def save_caches(self, *, prune: bool) -> None:
+        if self.match_cache is not None:
+            all_ids = self.rows.all_ids()
+            if all_ids is not None and prune:
+                self.match_cache.prune(all_ids)
+            self.match_cache.save()
+        if self.http_cache is not None:
+            self.http_cache.save()
+        if self.history is not None:
+            self.history.save()
+
+    def close(self) -> None:
+        self.rows.close()
+        self.session.close()
+
+
+def sync_categories(
+    args: argparse.Namespace,
+    url: str,
+    key: str,
+    categories: dict[str, int],
+    *,
+    record_runs: bool = True,
+    resources: _SyncResources | None = None,
+    scheduled: bool = False,
+    full_scan_min: float | None = None,
+) -> dict[str, dict[str, int]]:
+    """
+    Sync several categories concurrently in one process. Returns run counters per typ.
+
+    Shared by all categories (`_SyncResources`): one DB read, one keep-alive session and
+    per-host throttle for kaeltehilfe-berlin.de, the HTTP cache, the match cache and (with
+    --details) the detail page token bucket; plus an offer index per call.
+    Each category is matched only against its own DB subset (`unterkuenfte.typ`).
+    With `record_runs` (and --commit) every category gets its own `scrape_runs` row
+    (failed if the category raised, partial if some updates failed; scheduled cycles under
+    `kaeltehilfe:<typ>:scheduled`); consecutive runs that change nothing share one row.
+    `scheduled` limits each category to the shelters in their intake window where possible
+    (see `_CapacitySync._run_scheduled`). With `full_scan_min`, a category whose last full run
+    (`scrape_runs`) is older than that, or unknown, scans the whole listing instead, so offers
+    that were never matched (no URL yet) or moved are picked up.
+    """
+    typs = list(categories)
+    owned = resources is None
+    res = resources if resources is not None else _SyncResources(args, url, key, typs)
+    offer_index = _OfferIndex(typs)
+    # The cache lives across daemon cycles; report this call's outcomes only.
+    outcomes_before = dict(res.http_cache.outcomes) if res.http_cache is not None else {}
+
+    def _run_one(typ: str) -> dict[str, int]:
+        try:
+            return _sync_one(typ)
+        finally:
+            # However the category ended (scheduled refresh, error before or during the scan),
+            # its listing won't grow any more; override lookups of the others must not wait on it.
+            offer_index.listing_done(typ)
+
+    def _full_scan_due(typ: str) -> bool:
+        last = last_full_run_at(url, key, source=scrape_source(typ))
+        due = last is None or (datetime.now(timezone.utc) - last).total_seconds() >= (full_scan_min or 0) * 60
+        if due:
+            logger.info("[%s] Last full scan: %s; running a full scan", typ, last.isoformat() if last else "none")
+        return due
+
+    def _sync_one(typ: str) -> dict[str, int]:
+        sync = _CapacitySync(
+            args,
+            url,
+            key,
+            typ=typ,
+            list_url=category_list_url(categories[typ]),
+            http_cache=res.http_cache,
+            rows=res.rows,
+            offer_index=offer_index,
+            match_cache=res.match_cache,
+            throttle=res.throttle,
+            session=res.session,
+            history=res.history,
+            details_bucket=res.details_bucket if getattr(args, "details", False) else None,
+            scheduled=scheduled and not (full_scan_min is not None and _full_scan_due(typ)),
+            log_prefix=f"[{typ}] " if len(typs) > 1 else "",
+        )
+        record = record_runs and args.commit
+        started_at = _now_iso()
+        try:
+            stats = sync.run()
+        except Exception as ex:
+            if record:
+                for scheduled_source in (False, True):
+                    res.idle_runs.pop(scrape_source(typ, scheduled=scheduled_source), None)
+                with metrics().phase("scrape_runs"):
+                    record_scrape_run(url, key, source=scrape_source(typ), status="failed", started_at=started_at, error=str(ex))
+            raise
+        for name, n in stats.items():
+            metrics().incr(f"{typ}_{name}", n)
+        if record:
+            # A scheduled cycle polled only some shelters; it must not pass for a full scan.
+            source = scrape_source(typ, scheduled=bool(stats.get("scheduled")))
+            # Failed rows keep their old state; the rest of the run is as fresh as a clean one.
+            status = "succeeded" if stats["failed"] == 0 else "partial"
+            idle = status == "succeeded" and not stats["updated"] and not stats.get("details_updated")
+            with metrics().phase("scrape_runs"):
+                run_id = record_scrape_run(
+                    url,
+                    key,
+                    source=source,
+                    status=status,
+                    started_at=started_at,
+                    extend=res.idle_runs.get(source) if idle else None,
+                    offers_count=stats["offers"],
+                    matched_count=stats["matched"],
+                    changed_count=stats["updated"],
+                    failed_count=stats["failed"],
+                )
+            if idle and run_id is not None:
+                res.idle_runs[source] = run_id
+            else:
+                res.idle_runs.pop(source, None)
+        return stats
+
+    results: dict[str, dict[str, int]] = {}
+    errors: dict[str, BaseException] = {}
+    try:
+        with ThreadPoolExecutor(max_workers=len(typs), thread_name_prefix="kaeltehilfe-category") as pool:
+            futures = {typ: pool.submit(_run_one, typ) for typ in typs}
+            for typ, fut in futures.items():
+                try:
+                    results[typ] = fut.result()
+                except Exception as ex:
+                    logger.error("Category %s failed: %s", typ, ex)
+                    errors[typ] = ex
+    finally:
+        if owned:
+            res.close()
+        if res.http_cache is not None:
+            for outcome, n in res.http_cache.outcomes.items():
+                if n - outcomes_before.get(outcome, 0):
+                    metrics().incr(f"http_cache_{outcome}", n - outcomes_before.get(outcome, 0))
+
+    res.save_caches(prune=args.limit is None and not errors)
+
+    if errors:
+        raise next(iter(errors.values()))
+    return results
+
+
+class _CapacitySync:
+    """
+    One category sync as a pipeline of three stages connected by bounded queues:
+
+      fetch/parse (producer thread) -> match (caller thread) -> write (writer thread)
+
+    - Pages are matched as they arrive. Rows with an override URL or an exact-name match are
+      final as soon as their offer shows up (first occurrence wins, like `OfferMatcher`).
+    - Rows that need the whole listing (a cached match could still lose to a later exact
+      match; token/fuzzy matching ranks all offers) are resolved when pagination ends, with
+      the same priority order: override > direct > cache > matcher.
+    - Changed rows stream to the writer, which sends a bulk batch when it is full or when
+      its queue runs dry, so writes overlap with fetching and matching.
+    - Full queues block the previous stage (backpressure); raw HTML is never kept.
+    - If the listing (and overrides) are identical to the last committed run, the DB is not
+      read or written: pages are held back until one differs from the committed snapshot.
+      With --details this shortcut is off (detail pages can change behind an unchanged card).
+    - --details runs after matching: offer pages of all matched rows are fetched concurrently
+      under `details_bucket`, and changed documents are bulk-written.
+    """
+
+    def __init__(
+        self,
+        args: argparse.Namespace,
+        url: str,
+        key: str,
+        *,
+        typ: str,
+        list_url: str,
+        http_cache: HttpCache | None,
+        rows: _SharedRows,
+        offer_index: _OfferIndex,
+        match_cache: MatchCache | None,
+        throttle: _HostThrottle,
+        session: "requests.Session",
+        history: HistoryStore | None = None,
+        details_bucket: TokenBucket | None = None,
+        scheduled: bool = False,
+        log_prefix: str = "",
+    ) -> None:
+        self.args = args
+        self.url = url
+        self.key = key
+        self.typ = typ
+        self.list_url = list_url
+        self.http_cache = http_cache
+        self.shared_rows = rows
+        self.offer_index = offer_index
+        self.match_cache = match_cache
+        self.throttle = throttle
+        self.session = session
+        self.history = history
+        self.details_bucket = details_bucket
+        self.scheduled = scheduled
+        self.log = _CategoryLog(logger, {"prefix": log_prefix})
+        self.overrides_by_id: dict[str, str] = {}
+
+        self._stop = threading.Event()
+        self._page_q: queue.Queue[Any] = queue.Queue(maxsize=PIPELINE_PAGE_QUEUE_SIZE)
+        self._write_q: queue.Queue[Any] = queue.Queue(maxsize=2 * max(1, args.batch_size))
+        self._writer: threading.Thread | None = None
+
+        self.offers: list[ScrapedOffer] = []
+        self.page_digests: list[str] = []
+        self.rows: list[dict[str, Any]] | None = None
+        # uid -> (position, row) for rows not resolved yet
+        self._unresolved: dict[str, tuple[int, dict[str, Any]]] = {}
+        self._rows_by_override_url: dict[str, list[tuple[int, dict[str, Any]]]] = {}
+        self._rows_by_norm: dict[str, list[tuple[int, dict[str, Any]]]] = {}
+        self._seen_urls: set[str] = set()
+        self._seen_norms: set[str] = set()
+
+        self.changed = 0
+        self.unchanged = 0
+        self.unmatched = 0
+        self.names_by_id: dict[str, str] = {}
+        self.failures: dict[str, str] = {}
+        # uid -> (row, offer url) of every matched row (detail stage input)
+        self.matched: dict[str, tuple[dict[str, Any], str]] = {}
+        # uid -> (row, payload) queued for writing; applied to the row once written
+        self._queued: dict[str, tuple[dict[str, Any], dict[str, Any]]] = {}
+        self.details_updated = 0
+        self.details_failures: dict[str, str] = {}
+
+    # --- stage 1: fetch + parse ---------------------------------------------------------
+
+    def _produce(self) -> None:
+        args = self.args
+        pages = iter_offer_pages(
+            sleep_ms=args.sleep_ms,
+            page_size=args.page_size,
+            max_pages=args.max_pages,
+            concurrency=args.concurrency,
+            per_host_limit=args.per_host_limit,
+            http_cache=self.http_cache,
+            parser_backend=args.parser,
+            list_url=self.list_url,
+            throttle=self.throttle,
+            session=self.session,
+        )
+        try:
+            for start, page_offers in pages:
+                self.offer_index.add(page_offers)
+                if not _put(self._page_q, (start, page_offers), self._stop):
+                    return
+        except BaseException as ex:
+            _put(self._page_q, _StageFailed(ex), self._stop)
+            return
+        finally:
+            pages.close()
+            self.offer_index.listing_done(self.typ)
+        _put(self._page_q, _END, self._stop)
+
+    # --- stage 3: bulk writes -----------------------------------------------------------
+
+    def _write_loop(self) -> None:
+        batch: list[dict[str, Any]] = []
+        while True:
+            try:
+                item = self._write_q.get_nowait()
+            except queue.Empty:
+                # Nothing else ready: send what we have instead of waiting for a full batch.
+                if batch:
+                    self._flush(batch)
+                    batch = []
+                item = self._write_q.get()
+            if item is _END:
+                break
+            batch.append(item)
+            if len(batch) >= max(1, self.args.batch_size):
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+
+    def _flush(self, batch: list[dict[str, Any]]) -> None:
+        self.log.info("Applying %s capacity updates in bulk...", len(batch))
+        try:
+            with metrics().phase("write"):
+                failures = apply_capacity_updates(self.url, self.key, batch, batch_size=self.args.batch_size)
+        except Exception as ex:
+            failures = {str(u.get("id")): str(ex) for u in batch}
+        for uid, err in failures.items():
+            self.log.error("Update failed for %s (%s): %s", self.names_by_id.get(uid, "?"), uid, err)
+        self.failures.update(failures)
+
+    # --- stage 2: matching --------------------------------------------------------------
+
+    def _start_db_read(self) -> None:
+        self.shared_rows.start()
+
+    def _ensure_rows(self) -> list[dict[str, Any]]:
+        if self.rows is not None:
+            return self.rows
+        rows = self.shared_rows.rows_for(self.typ)
+        if self.args.limit is not None:
+            rows = rows[: max(0, self.args.limit)]
+        self.log.info("DB targets: %s rows (typ=%s)", len(rows), self.typ)
+
+        for i, r in enumerate(rows, start=1):
+            uid = str(r.get("id") or "")
+            name = str(r.get("name") or "").strip()
+            if not uid or not name:
+                continue
+            self._unresolved[uid] = (i, r)
+            override_url = self.overrides_by_id.get(uid)
+            if override_url:
+                self._rows_by_override_url.setdefault(override_url.strip().lower(), []).append((i, r))
+            else:
+                norm = _normalize_name(name)
+                if norm:
+                    self._rows_by_norm.setdefault(norm, []).append((i, r))
+        self.rows = rows
+        return rows
+
+    def _match_page(self, start: int, page_offers: list[ScrapedOffer]) -> None:
+        self._ensure_rows()
+        with metrics().phase("match"):
+            resolved = self._match_page_offers(page_offers)
+        self.log.debug("Page start=%s: %s offers, %s rows resolved", start, len(page_offers), resolved)
+
+    def _match_page_offers(self, page_offers: list[ScrapedOffer]) -> int:
+        resolved = 0
+        for o in page_offers:
+            u = (o.url or "").strip().lower()
+            if u and u not in self._seen_urls:
+                self._seen_urls.add(u)
+                for i, r in self._rows_by_override_url.pop(u, []):
+                    self._resolved(i, r, o, "override")
+                    resolved += 1
+            norm = _normalize_name(o.name)
+            if norm and norm not in self._seen_norms:
+                self._seen_norms.add(norm)
+                for i, r in self._rows_by_norm.pop(norm, []):
+                    self._resolved(i, r, o, "direct")
+                    resolved += 1
+        return resolved
+
+    def _resolved(self, i: int, r: dict[str, Any], offer: ScrapedOffer, match_kind: str) -> None:
+        uid = str(r.get("id") or "")
+        name = str(r.get("name") or "").strip()
+        self._unresolved.pop(uid, None)
+        total = len(self.rows or ())
+
+        if match_kind not in ("direct", "known_url"):
+            self.log.info("(%s/%s) Matched via %s: %r -> %r", i, total, match_kind, name, offer.name)
+        if offer.url:
+            self.matched[uid] = (r, offer.url)
+
+        payload = capacity_payload(offer)
+        if not capacity_changed(r, payload):
+            self.unchanged += 1
+            self.log.debug("(%s/%s) %s unchanged", i, total, name)
+            return
+
+        self.log.info(
+            "(%s/%s) %s -> all=%s men=%s women=%s diverse=%s",
+            i,
+            total,
+            name,
+            offer.status_all,
+            offer.status_men,
+            offer.status_women,
+            offer.status_diverse,
+        )
+        self.changed += 1
+        self.names_by_id[uid] = name
+        if self._writer is not None:
+            self._queued[uid] = (r, payload)
+            if not _put(self._write_q, {"id": uid, **payload}, self._stop):
+                raise RuntimeError("Capacity writer stopped")
+
+    def _finish_matching(self) -> None:
+        """
+        Resolve the rows that were not final during pagination (needs the complete listing).
+        """
+        rows = self._ensure_rows()
+        with metrics().phase("match"):
+            self._match_remaining(rows)
+
+    def _match_remaining(self, rows: list[dict[str, Any]]) -> None:
+        args = self.args
+
+        # Built once per run: normalized names, token index and per-offer fuzzy state.
+        matcher = OfferMatcher(self.offers, fuzzy_backend=args.fuzzy_backend, fuzzy_threshold=args.fuzzy_threshold)
+        if matcher.duplicate_names:
+            self.log.warning(
+                "Kaeltehilfe listing contained %s duplicate normalized names; keeping first occurrence",
+                matcher.duplicate_names,
+            )
+
+        match_cache = self.match_cache
+
+        remaining = sorted(self._unresolved.values(), key=lambda t: t[0])
+
+        # Rows that will go through the matcher (no override, no direct hit, no valid cache entry).
+        to_match: list[str] = []
+        for _i, r in remaining:
+            uid = str(r.get("id") or "")
+            name = str(r.get("name") or "").strip()
+            if uid in self.overrides_by_id or _normalize_name(name) in matcher.offers_by_norm:
+                continue
+            if match_cache is not None and match_cache.lookup(uid, name, matcher)[0] is not None:
+                continue
+            to_match.append(name)
+        matcher.prepare(to_match)
+
+        cache_hits = 0
+        for i, r in remaining:
+            uid = str(r.get("id") or "")
+            name = str(r.get("name") or "").strip()
+
+            # 1) Manual override by unterkunft_id -> Kaeltehilfe URL
+            override_url = self.overrides_by_id.get(uid)
+            offer: ScrapedOffer | None = None
+            match_kind = "none"
+            if override_url:
+                # Own listing first, then offers listed under the other categories of this run.
+                offer = matcher.offer_for_url(override_url) or self.offer_index.offer_for_url(override_url)
+                if offer is None:
+                    self.log.warning(
+                        "(%s/%s) Override URL not found in scraped offers: id=%s name=%r url=%r",
+                        i,
+                        len(rows),
+                        uid,
+                        name,
+                        override_url,
+                    )
+                else:
+                    match_kind = "override"
+
+            # 2) Exact name match (cheap, and wins over a cached fuzzy match if the listing changed)
+            if offer is None:
+                direct = matcher.offers_by_norm.get(_normalize_name(name))
+                if direct is not None:
+                    offer, match_kind = direct, "direct"
+
+            # 3) Cached match from a previous run (both names unchanged)
+            if offer is None and match_cache is not None:
+                offer, match_kind = match_cache.lookup(uid, name, matcher)
+                if offer is not None:
+                    cache_hits += 1
+
+            # 4) Automatic match (name-based)
+            if offer is None:
+                offer, match_kind = matcher.match(name)
+                if match_cache is not None:
+                    if offer is not None and match_kind != "direct":
+                        match_cache.store(uid, name, offer, match_kind)
+                    else:
+                        match_cache.forget(uid)
+
+            if offer is None:
+                self._unresolved.pop(uid, None)
+                self.unmatched += 1
+                self.log.warning("(%s/%s) No Kaeltehilfe match for: %r (norm=%r)", i, len(rows), name, _normalize_name(name))
+                continue
+
+            self._resolved(i, r, offer, match_kind)
+
+        if match_cache is not None:
+            # Pruned and saved once per process (shared by all categories).
+            self.log.info("Match cache: hits=%s matched fresh=%s", cache_hits, len(to_match))
+
+    # --- optional: detail pages -----------------------------------------------------------
+
+    def _sync_details(self) -> None:
+        """
+        Fetch the offer pages of all matched rows and bulk-write the documents that changed.
+        Fetch errors only skip the affected rows (the capacity update already happened).
+        """
+        assert self.details_bucket is not None
+        urls = sorted({u for _r, u in self.matched.values()})
+        self.log.info("Fetching %s detail pages for %s matched rows...", len(urls), len(self.matched))
+        with metrics().phase("details_fetch"):
+            details_by_url, fetch_errors = fetch_details(
+                urls,
+                http_cache=self.http_cache,
+                bucket=self.details_bucket,
+                headers=_HTTP_HEADERS,
+                concurrency=self.args.details_concurrency,
+                session=self.session,
+            )
+
+        updates: list[dict[str, Any]] = []
+        for uid, (r, offer_url) in self.matched.items():
+            doc = details_by_url.get(offer_url)
+            if doc is None or r.get(DETAILS_COLUMN) == doc:
+                continue
+            self.names_by_id.setdefault(uid, str(r.get("name") or "").strip())
+            updates.append({"id": uid, DETAILS_COLUMN: doc})
+        self.log.info(
+            "Details: changed=%s unchanged=%s fetch_failed=%s",
+            len(updates),
+            len(self.matched) - len(updates),
+            len(fetch_errors),
+        )
+        if not updates or not self.args.commit:
+            return
+
+        try:
+            with metrics().phase("details_write"):
+                failures = apply_capacity_updates(
+                    self.url, self.key, updates, batch_size=self.args.batch_size, rpc=APPLY_DETAILS_RPC
+                )
+        except Exception as ex:
+            failures = {str(u["id"]): str(ex) for u in updates}
+        for uid, err in failures.items():
+            self.log.error("Details update failed for %s (%s): %s", self.names_by_id.get(uid, "?"), uid, err)
+        self.details_failures = failures
+        self.details_updated = len(updates) - len(failures)
+        for u in updates:
+            uid = str(u["id"])
+            if uid not in failures:
+                self.matched[uid][0][DETAILS_COLUMN] = u[DETAILS_COLUMN]
+
+    # --- optional: only shelters in their intake window -----------------------------------
+
+    def _listing_page_index(self) -> dict[str, int]:
+        """
+        Offer URL -> listing `start` it was on when last fetched (from the HTTP cache entries).
+        """
+        assert self.http_cache is not None
+        prefix = f"{self.list_url}?start="
+        pages = sorted(
+            self.http_cache.entries_with_prefix(prefix).items(),
+            key=lambda kv: str(kv[1].get("validated_at") or ""),
+        )
+        out: dict[str, int] = {}
+        for k, entry in pages:  # most recently validated page wins
+            try:
+                start = int(k[len(prefix) :])
+            except ValueError:
+                continue
+            for o in (entry.get("parsed") or {}).get("offers") or []:
+                u = str(o.get("url") or "").strip().lower()
+                if u:
+                    out[u] = start
+        return out
+
+    def _run_scheduled(self) -> dict[str, int] | None:
+        """
+        Refresh only the rows whose intake window is open or opens within --schedule-lead-min,
+        by re-fetching just the listing pages their offers were on (row URL or override).
+        Rows without an offer URL (never matched) wait for the next full scan.
+
+        Returns None if that is not possible (no HTTP cache, an offer page not in the cache,
+        an offer that moved); the caller then runs the full scan. Nothing is written before
+        every target is found, so a fallback never double-applies.
+        """
+        if self.http_cache is None:
+            return None
+        rows = self._ensure_rows()
+        schedule = OpeningHoursSchedule(rows, lead_min=self.args.schedule_lead_min)
+        now = datetime.now(timezone.utc)
+        page_of = self._listing_page_index()
+
+        by_start: dict[int, list[tuple[int, dict[str, Any], str]]] = {}
+        active = 0
+        for i, r in enumerate(rows, start=1):
+            uid = str(r.get("id") or "")
+            if not uid or not schedule.is_active(uid, now):
+                continue
+            target = (self.overrides_by_id.get(uid) or r.get("kaeltehilfe_capacity_url") or "").strip().lower()
+            if not target:
+                continue
+            active += 1
+            start = page_of.get(target)
+            if start is None:
+                self.log.info("Schedule: no known listing page for %r; running a full scan", r.get("name"))
+                return None
+            by_start.setdefault(start, []).append((i, r, target))
+        self.log.info(
+            "Schedule: refreshing %s of %s rows (intake window open or near; %s without usable hours) on %s listing pages",
+            active,
+            len(rows),
+            schedule.unscheduled,
+            len(by_start),
+        )
+
+        offers_by_url: dict[str, ScrapedOffer] = {}
+        if by_start:
+            args = self.args
+
+            def _fetch(start: int) -> list[ScrapedOffer]:
+                return _fetch_listing_page(
+                    start,
+                    list_url=self.list_url,
+                    throttle=self.throttle,
+                    http_cache=self.http_cache,
+                    parser_backend=args.parser,
+                    session=self.session,
+                )[1]
+
+            with ThreadPoolExecutor(max_workers=max(1, min(args.concurrency, len(by_start)))) as pool:
+                for page_offers in pool.map(_fetch, sorted(by_start)):
+                    self.offers.extend(page_offers)
+                    for o in page_offers:
+                        offers_by_url.setdefault((o.url or "").strip().lower(), o)
+
+        resolved: list[tuple[int, dict[str, Any], ScrapedOffer]] = []
+        for start, targets in sorted(by_start.items()):
+            for i, r, target in targets:
+                offer = offers_by_url.get(target)
+                if offer is None:
+                    self.log.info("Schedule: %r is no longer on page start=%s; running a full scan", r.get("name"), start)
+                    self.offers = []
+                    return None
+                resolved.append((i, r, offer))
+
+        if self.history is not None:
+            with metrics().phase("history"):
+                self.history.append_run(self.offers, source=scrape_source(self.typ, scheduled=True), full_scan=False)
+        self._start_writer()
+        try:
+            for i, r, offer in sorted(resolved, key=lambda t: t[0]):
+                self._resolved(i, r, offer, "known_url")
+        finally:
+            self._stop_writer()
+        if self.changed and self.args.commit:
+            # The DB now differs from the last full run: its snapshot must not skip the next one.
+            self.http_cache.forget_committed(scrape_source(self.typ))
+        stats = self._finish_stats()
+        stats["scheduled"] = 1
+        return stats
+
+    # --- orchestration ------------------------------------------------------------------
+
+    def _start_writer(self) -> None:
+        if self.args.commit:
+            self._writer = threading.Thread(target=self._write_loop, name=f"kaeltehilfe-write-{self.typ}", daemon=True)
+            self._writer.start()
+
+    def _stop_writer(self) -> None:
+        """
+        Let the writer drain what was already matched, then keep the (shared) rows equal to
+        what the DB now holds for later daemon cycles.
+        """
+        if self._writer is not None:
+            self._write_q.put(_END)
+            self._writer.join()
+        for uid, (r, payload) in self._queued.items():
+            if uid not in self.failures:
+                r.update(payload)
+        self._queued = {}
+
+    def _finish_stats(self) -> dict[str, int]:
+        self.log.info("Changed: %s rows | unchanged: %s rows", self.changed, self.unchanged)
+        updated = self.changed - len(self.failures)
+        failed = len(self.failures) + len(self.details_failures)
+        self.log.info(
+            "Done. updated=%s unchanged=%s unmatched=%s failed=%s commit=%s",
+            updated,
+            self.unchanged,
+            self.unmatched,
+            failed,
+            self.args.commit,
+        )
+        stats = {
+            "offers": len(self.offers),
+            "matched": self.changed + self.unchanged,
+            "updated": updated,
+            "unchanged": self.unchanged,
+            "unmatched": self.unmatched,
+            "failed": failed,
+        }
+        if self.details_bucket is not None:
+            stats["details_updated"] = self.details_updated
+        return stats
+
+    def run(self) -> dict[str, int]:
+        args = self.args
+        self.overrides_by_id = _load_overrides()
+        if self.overrides_by_id:
+            self.log.info("Loaded %s manual overrides from scripts/kaeltehilfe_overrides.json", len(self.overrides_by_id))
+        overrides_digest = json_digest(self.overrides_by_id)
+
+        scope = scrape_source(self.typ)
+        # Pages of the last committed run; while the listing matches them, DB work is held back.
+        gate: list[str] | None = None
+        if self.scheduled:
+            stats = self._run_scheduled()
+            if stats is not None:
+                return stats
+
+        if self.http_cache is not None and args.limit is None and not args.force and self.details_bucket is None:
+            snapshot = self.http_cache.committed_snapshot(scope)
+            if snapshot is not None and snapshot.get("overrides") == overrides_digest and isinstance(snapshot.get("pages"), list):
+                gate = [str(p) for p in snapshot["pages"]]
+
+        self.log.info("Scraping Kaeltehilfe list: %s", self.list_url)
+        producer = threading.Thread(target=self._produce, name=f"kaeltehilfe-fetch-{self.typ}", daemon=True)
+        self._start_writer()
+        producer.start()
+
+        try:
+            held: list[tuple[int, list[ScrapedOffer]]] = []
+            if gate is None:
+                self._start_db_read()
+            while True:
+                item = self._page_q.get()
+                if item is _END:
+                    break
+                if isinstance(item, _StageFailed):
+                    raise item.ex
+                start, page_offers = item
+                self.offers.extend(page_offers)
+                self.page_digests.append(json_digest([asdict(o) for o in page_offers]))
+                if gate is not None:
+                    idx = len(self.page_digests) - 1
+                    if idx < len(gate) and gate[idx] == self.page_digests[idx]:
+                        held.append((start, page_offers))
+                        continue
+                    self.log.info("Page start=%s differs from the last committed run; starting DB work", start)
+                    gate = None
+                    self._start_db_read()
+                for held_start, held_offers in held:
+                    self._match_page(held_start, held_offers)
+                held = []
+                self._match_page(start, page_offers)
+
+            self.log.info("Scraped %s offers from Kaeltehilfe", len(self.offers))
+            if self.history is not None:
+                with metrics().phase("history"):
+                    self.history.append_run(self.offers, source=scope)
+            if self.http_cache is not None:
+                self.log.info(
+                    "HTTP cache: not_modified=%s same_body=%s fetched=%s",
+                    self.http_cache.outcomes["not_modified"],
+                    self.http_cache.outcomes["same_body"],
+                    self.http_cache.outcomes["fetched"],
+                )
+                self.http_cache.save()
+
+            if gate is not None and len(gate) == len(self.page_digests):
+                assert self.http_cache is not None
+                snapshot = self.http_cache.committed_snapshot(scope) or {}
+                stats = dict(snapshot.get("stats") or {})
+                self.log.info(
+                    "Listing unchanged since the last committed run (%s); skipping DB read/match/write (use --force to override)",
+                    snapshot.get("committed_at"),
+                )
+                matched = int(stats.get("matched") or 0)
+                return {
+                    "offers": len(self.offers),
+                    "matched": matched,
+                    "updated": 0,
+                    "unchanged": matched,
+                    "unmatched": int(stats.get("unmatched") or 0),
+                    "failed": 0,
+                }
+
+            for held_start, held_offers in held:
+                self._match_page(held_start, held_offers)
+            self._finish_matching()
+        finally:
+            # Stop fetching; let the writer drain what was already matched.
+            self._stop.set()
+            self._stop_writer()
+            producer.join(timeout=5)
+
+        if self.details_bucket is not None:
+            self._sync_details()
+
+        stats = self._finish_stats()
+        # Only a complete, fully written run may short-circuit the next one.
+        if self.http_cache is not None and args.commit and stats["failed"] == 0 and args.limit is None:
+            self.http_cache.mark_committed(
+                scope,
+                digest=json_digest({"pages": self.page_digests, "overrides": overrides_digest}),
+                stats=stats,
+                pages=self.page_digests,
+                overrides=overrides_digest,
+            )
+            self.http_cache.save()
+        return stats
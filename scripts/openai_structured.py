@@ -1,15 +1,148 @@
+"""
+OpenAI Structured Outputs calls (validated Pydantic objects), single or many in parallel.
+
+Why:
+- `call_openai_structured` built a new `OpenAI` client (and connection pool) per call and the PDF
+  extraction called it page by page, so a run cost one full LLM latency per page in series.
+- One client per (API key, base URL) is now reused. `map_openai_structured` runs the calls on a
+  bounded thread pool and yields the results in input order, so merged output stays
+  deterministic whatever order the answers arrive in.
+
+Retries (our own; the SDK's are switched off so they don't stack):
+- 429, 5xx, connection errors and timeouts, with full-jitter exponential backoff; `Retry-After`
+  (seconds or HTTP date) is the minimum wait.
+- A 429 pauses all workers of the process until the wait is over (one rate limit per key), so
+  the pool doesn't keep hammering the API. `insufficient_quota` 429s are not retried.
+- Every attempt is recorded in the run metrics (`scripts.run_metrics`), with the counters
+  `llm_retries`, `llm_retry_wait_ms`, `llm_rate_limited`, `llm_input_tokens`, `llm_output_tokens`.
+
+`OPENAI_BASE_URL` points the client elsewhere (e.g. the fake in `scripts.fake_upstreams`).
+
+Usage:
+  parsed = call_openai_structured(schema=Model, user_text=text, system_prompt=prompt)
+  for parsed in map_openai_structured(texts, schema=Model, system_prompt=prompt, concurrency=4):
+      ...
+
+Requires:
+  - openai, pydantic (pip install -r requirements.txt)
+"""
+
 from __future__ import annotations
 
+import logging
 import os
-from typing import Any, Optional, Type, TypeVar
+import random
+import threading
+import time as time_mod
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Iterable, Iterator, Optional, Type, TypeVar
 
+import openai
 from openai import OpenAI
 from pydantic import BaseModel
 
 from scripts.env import load_dotenv
+from scripts.http_resilience import parse_retry_after
+from scripts.run_metrics import metrics
 
 T = TypeVar("T", bound=BaseModel)
 
+logger = logging.getLogger("openai_structured")
+
+DEFAULT_RETRIES = 3
+BACKOFF_BASE_S = 1.0
+BACKOFF_CAP_S = 60.0
+_RETRY_ERRORS = (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError)
+
+_clients: dict[tuple[str, str | None], OpenAI] = {}
+_clients_lock = threading.Lock()
+
+
+class _RateLimitGate:
+    """
+    Shared pause after a 429: requests of every thread wait until `not_before`.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._not_before = 0.0
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self._not_before = max(self._not_before, time_mod.monotonic() + seconds)
+
+    def wait(self) -> None:
+        while True:
+            with self._lock:
+                delay = self._not_before - time_mod.monotonic()
+            if delay <= 0:
+                return
+            time_mod.sleep(delay)
+
+
+_gate = _RateLimitGate()
+
+
+def get_client(api_key: Optional[str] = None, *, base_url: Optional[str] = None) -> OpenAI:
+    """
+    The process-wide client for this key and base URL (default: `OPENAI_BASE_URL` or the API).
+    """
+    # Prefer explicit api_key; otherwise allow scripts/.env to supply OPENAI_API_KEY
+    if api_key is None and os.getenv("OPENAI_API_KEY") is None:
+        load_dotenv()
+
+    key = api_key or os.getenv("OPENAI_API_KEY")
+    if not key:
+        raise RuntimeError("Missing OpenAI API key. Set OPENAI_API_KEY or pass api_key=...")
+    base_url = base_url or os.getenv("OPENAI_BASE_URL") or None
+
+    with _clients_lock:
+        client = _clients.get((key, base_url))
+        if client is None:
+            client = _clients[(key, base_url)] = OpenAI(api_key=key, base_url=base_url, max_retries=0)
+        return client
+
+
+def _retry_delay(ex: openai.OpenAIError, attempt: int) -> float:
+    delay = random.uniform(0.0, min(BACKOFF_CAP_S, BACKOFF_BASE_S * (2**attempt)))
+    if isinstance(ex, openai.APIStatusError):
+        retry_after = parse_retry_after(ex.response.headers.get("retry-after"))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+    return delay
+
+
+def _parse_with_retries(client: OpenAI, parse_kwargs: dict[str, Any], *, retries: int) -> Any:
+    url = f"{str(client.base_url).rstrip('/')}/responses"
+    for attempt in range(1 + max(0, retries)):
+        _gate.wait()
+        t0 = time_mod.perf_counter()
+        try:
+            response = client.responses.parse(**parse_kwargs)
+        except _RETRY_ERRORS as ex:
+            status = ex.status_code if isinstance(ex, openai.APIStatusError) else None
+            metrics().observe_http(url, time_mod.perf_counter() - t0, status=status)
+            if attempt >= retries or getattr(ex, "code", None) == "insufficient_quota":
+                raise
+            delay = _retry_delay(ex, attempt)
+            logger.info("OpenAI %s; retrying in %.2fs (attempt %s)", status or type(ex).__name__, delay, attempt + 2)
+            metrics().incr("llm_retries")
+            metrics().incr("llm_retry_wait_ms", int(delay * 1000))
+            if isinstance(ex, openai.RateLimitError):
+                metrics().incr("llm_rate_limited")
+                _gate.pause(delay)
+            else:
+                time_mod.sleep(delay)
+            continue
+
+        metrics().observe_http(url, time_mod.perf_counter() - t0, status=200)
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            metrics().incr("llm_input_tokens", int(getattr(usage, "input_tokens", 0) or 0))
+            metrics().incr("llm_output_tokens", int(getattr(usage, "output_tokens", 0) or 0))
+        return response
+    raise AssertionError("unreachable")  # pragma: no cover
+
 
 def call_openai_structured(
     *,
@@ -20,22 +153,17 @@ def call_openai_structured(
     api_key: Optional[str] = None,
     temperature: float = 0.0,
     max_output_tokens: Optional[int] = None,
+    retries: int = DEFAULT_RETRIES,
+    client: Optional[OpenAI] = None,
 ) -> T:
     """
     Call OpenAI with Structured Outputs and return a validated Pydantic object.
 
     Uses `client.responses.parse(...)` with `text_format=<PydanticModel>`.
     The SDK handles JSON schema generation and parsing automatically.
+    Thread-safe; the client is shared (see `get_client`).
     """
-    # Prefer explicit api_key; otherwise allow scripts/.env to supply OPENAI_API_KEY
-    if api_key is None and os.getenv("OPENAI_API_KEY") is None:
-        load_dotenv()
-
-    key = api_key or os.getenv("OPENAI_API_KEY")
-    if not key:
-        raise RuntimeError("Missing OpenAI API key. Set OPENAI_API_KEY or pass api_key=...")
-
-    client = OpenAI(api_key=key)
+    client = client or get_client(api_key)
 
     parse_kwargs: dict[str, Any] = {
         "model": model,
@@ -49,10 +177,50 @@ def call_openai_structured(
     if max_output_tokens is not None:
         parse_kwargs["max_output_tokens"] = max_output_tokens
 
-    response = client.responses.parse(**parse_kwargs)
+    response = _parse_with_retries(client, parse_kwargs, retries=retries)
 
     parsed = response.output_parsed
     if parsed is None:
         raise RuntimeError("OpenAI response did not return a parsed object.")
 
     return parsed  # type: ignore[return-value]
+
+
+def map_openai_structured(
+    user_texts: Iterable[str],
+    *,
+    schema: Type[T],
+    system_prompt: str,
+    concurrency: int = 4,
+    model: str = "gpt-4o-2024-08-06",
+    api_key: Optional[str] = None,
+    temperature: float = 0.0,
+    max_output_tokens: Optional[int] = None,
+    retries: int = DEFAULT_RETRIES,
+) -> Iterator[T]:
+    """
+    `call_openai_structured` for each text, at most `concurrency` in flight; yields the parsed
+    objects in input order. The first failed call raises (calls not yet started are cancelled).
+    """
+    texts = list(user_texts)
+    client = get_client(api_key)
+
+    def call(text: str) -> T:
+        return call_openai_structured(
+            schema=schema,
+            user_text=text,
+            system_prompt=system_prompt,
+            model=model,
+            temperature=temperature,
+            max_output_tokens=max_output_tokens,
+            retries=retries,
+            client=client,
+        )
+
+    n_workers = max(1, min(concurrency, len(texts)))
+    if n_workers == 1:
+        for text in texts:
+            yield call(text)
+        return
+    with ThreadPoolExecutor(max_workers=n_workers, thread_name_prefix="openai") as pool:
+        yield from pool.map(call, texts)
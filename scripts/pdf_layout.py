@@ -0,0 +1,315 @@
+"""
+Single-pass page layout for `scripts.pdf_text`: words and reading-order text from `page.chars`.
+
+Why:
+- `_extract_page_text` asked pdfplumber for `extract_text(layout=True)` and then for
+  `extract_words()`: two clusterings of the same characters, the first result usually thrown
+  away, and the rendering grouped lines in Python dicts of lists.
+- Here the characters are read once into coordinate arrays; words (same rules and output as
+  pdfplumber's `WordExtractor` defaults), line grouping and the fallback text all come from
+  those arrays with NumPy sorts/reductions.
+- Columns: the page is cut recursively at empty vertical gutters / horizontal gaps (XY-cut)
+  found by gap analysis over word intervals, so spreads, 3-column pages, off-center gutters
+  and full-width headers above columns all come out in reading order. With the page width,
+  the centre fold of a spread is also cut on sparse pages and under a few crossing words.
+
+Note: parsing the page content stream into `page.chars` (pdfminer) stays the dominant cost on
+pages with large vector drawings; see `scripts.benchmarks.pdf_layout`.
+
+Requires:
+  - numpy (pip install -r requirements.txt)
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Any, Iterable
+
+try:
+    import numpy as np
+except ModuleNotFoundError:  # pragma: no cover
+    np = None  # type: ignore
+
+# pdfplumber's defaults for `extract_words` (utils.text.DEFAULT_X_TOLERANCE / _Y_TOLERANCE).
+DEFAULT_X_TOLERANCE = 3.0
+DEFAULT_Y_TOLERANCE = 3.0
+# Column detection (points): narrowest vertical gutter, narrowest horizontal gap between bands,
+# and the fewest lines a column needs (so a wide gap inside a line is not a gutter).
+COLUMN_MIN_GAP = 12.0
+ROW_MIN_GAP = 8.0
+COLUMN_MIN_LINES = 3
+# Page fold (spreads): split at the page centre when at most this share of the words crosses it
+# (e.g. map labels) and each side holds at least FOLD_MIN_SIDE_SHARE of the words.
+FOLD_MAX_CROSSING_SHARE = 0.05
+FOLD_MIN_SIDE_SHARE = 0.2
+# Same expansions pdfplumber applies to ligature glyphs.
+LIGATURES = {"ﬀ": "ff", "ﬃ": "ffi", "ﬄ": "ffl", "ﬁ": "fi", "ﬂ": "fl", "ﬆ": "st", "ﬅ": "st"}
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise RuntimeError("Missing dependency: numpy. Install requirements.txt (pip install -r requirements.txt).")
+
+
+@dataclass(frozen=True)
+class Words:
+    """
+    Words of a page as parallel arrays (in pdfplumber's extraction order).
+    """
+
+    text: list[str]
+    x0: "np.ndarray"
+    x1: "np.ndarray"
+    top: "np.ndarray"
+    bottom: "np.ndarray"
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def take(self, idx: "np.ndarray") -> "Words":
+        """
+        Subset by index array or boolean mask (order as given).
+        """
+        if idx.dtype == bool:
+            idx = np.flatnonzero(idx)
+        return Words([self.text[i] for i in idx.tolist()], self.x0[idx], self.x1[idx], self.top[idx], self.bottom[idx])
+
+    def to_dicts(self) -> list[dict[str, Any]]:
+        return [
+            {"text": t, "x0": a, "x1": b, "top": c, "bottom": d}
+            for t, a, b, c, d in zip(self.text, self.x0.tolist(), self.x1.tolist(), self.top.tolist(), self.bottom.tolist(), strict=True)
+        ]
+
+    @classmethod
+    def from_dicts(cls, words: Iterable[dict[str, Any]]) -> "Words":
+        _require_numpy()
+        words = list(words)
+
+        def col(name: str) -> "np.ndarray":
+            return np.fromiter((float(w.get(name, 0) or 0) for w in words), dtype=np.float64, count=len(words))
+
+        return cls([str(w.get("text") or "") for w in words], col("x0"), col("x1"), col("top"), col("bottom"))
+
+
+def extract_words(
+    chars: list[dict[str, Any]],
+    *,
+    x_tolerance: float = DEFAULT_X_TOLERANCE,
+    y_tolerance: float = DEFAULT_Y_TOLERANCE,
+) -> Words:
+    """
+    pdfplumber `WordExtractor` (default settings) over arrays.
+
+    Per run of equally oriented chars: cluster lines (chained `top` within y_tolerance; rotated
+    text: `x0` within x_tolerance), order each line along the text direction, then start a
+    new word at whitespace, a backwards step, a gap > tolerance, or a line jump > tolerance.
+    """
+    _require_numpy()
+    n = len(chars)
+    if n == 0:
+        empty = np.zeros(0, dtype=np.float64)
+        return Words([], empty, empty, empty, empty)
+
+    texts = [str(c.get("text") or "") for c in chars]
+    x0 = np.fromiter((c["x0"] for c in chars), dtype=np.float64, count=n)
+    x1 = np.fromiter((c["x1"] for c in chars), dtype=np.float64, count=n)
+    top = np.fromiter((c["top"] for c in chars), dtype=np.float64, count=n)
+    bottom = np.fromiter((c["bottom"] for c in chars), dtype=np.float64, count=n)
+    upright = np.fromiter((bool(c.get("upright", True)) for c in chars), dtype=bool, count=n)
+    space = np.fromiter((t.isspace() for t in texts), dtype=bool, count=n)
+
+    # Runs of equal orientation, in content-stream order (like itertools.groupby on "upright").
+    run_starts = np.flatnonzero(np.r_[True, upright[1:] != upright[:-1]])
+    run_ends = np.r_[run_starts[1:], n]
+
+    order_parts: list["np.ndarray"] = []
+    break_parts: list["np.ndarray"] = []
+    for s, e in zip(run_starts.tolist(), run_ends.tolist(), strict=True):
+        idx = np.arange(s, e)
+        if upright[s]:
+            line_key, line_tol = top[idx], y_tolerance
+            along0, along1, across = x0, x1, top
+            intra_tol, inter_tol = x_tolerance, y_tolerance
+            # char sort key (x0, x0)
+            sort_keys: tuple["np.ndarray", ...] = (x0[idx],)
+        else:
+            line_key, line_tol = x0[idx], x_tolerance
+            along0, along1, across = top, bottom, x0
+            intra_tol, inter_tol = y_tolerance, x_tolerance
+            # char sort key (top, bottom)
+            sort_keys = (bottom[idx], top[idx])
+
+        # Chained clustering of the distinct line keys (cluster_list): new line when a value
+        # exceeds the previous distinct value + tolerance.
+        uniq = np.unique(line_key)
+        cluster_of_uniq = np.r_[0, np.cumsum(uniq[1:] > uniq[:-1] + line_tol)]
+        line = cluster_of_uniq[np.searchsorted(uniq, line_key)]
+        # Lines in cluster order, chars by sort key, ties in original order (stable).
+        order = idx[np.lexsort((idx,) + sort_keys + (line,))]
+        line_sorted = line[order - s]
+
+        prev, cur = order[:-1], order[1:]
+        brk = np.ones(len(order), dtype=bool)
+        brk[1:] = (
+            (line_sorted[1:] != line_sorted[:-1])
+            | space[prev]
+            | (along0[cur] < along0[prev])
+            | (along0[cur] > along1[prev] + intra_tol)
+            | (np.abs(across[cur] - across[prev]) > inter_tol)
+        )
+        order_parts.append(order)
+        break_parts.append(brk)
+
+    order = np.concatenate(order_parts)
+    brk = np.concatenate(break_parts)
+    keep = ~space[order]
+    order, brk = order[keep], brk[keep]
+    if len(order) == 0:
+        empty = np.zeros(0, dtype=np.float64)
+        return Words([], empty, empty, empty, empty)
+
+    starts = np.flatnonzero(brk)
+    bounds = np.r_[starts, len(order)].tolist()
+    ordered_text = [LIGATURES.get(texts[i], texts[i]) for i in order.tolist()]
+    word_text = ["".join(ordered_text[a:b]) for a, b in zip(bounds[:-1], bounds[1:], strict=True)]
+    return Words(
+        word_text,
+        np.minimum.reduceat(x0[order], starts),
+        np.maximum.reduceat(x1[order], starts),
+        np.minimum.reduceat(top[order], starts),
+        np.maximum.reduceat(bottom[order], starts),
+    )
+
+
+def render_lines(words: Words) -> str:
+    """
+    Words grouped into lines by rounded `top` (half to even, like `round()`), lines top to
+    bottom, words left to right (ties keep extraction order).
+    """
+    if len(words) == 0:
+        return ""
+    line = np.rint(words.top)
+    order = np.lexsort((np.arange(len(words)), words.x0, line))
+    line_sorted = line[order]
+    cuts = (np.flatnonzero(line_sorted[1:] != line_sorted[:-1]) + 1).tolist()
+    bounds = [0, *cuts, len(order)]
+    texts = [words.text[i] for i in order.tolist()]
+    out_lines = [" ".join(t.strip() for t in texts[a:b] if t) for a, b in zip(bounds[:-1], bounds[1:], strict=True)]
+    return "\n".join(out_lines).strip()
+
+
+def _gaps(lo: "np.ndarray", hi: "np.ndarray", min_gap: float) -> tuple["np.ndarray", "np.ndarray"]:
+    """
+    (starts, ends) of the empty stretches (>= min_gap) between the union of intervals [lo, hi].
+    """
+    if len(lo) < 2:
+        empty = np.zeros(0, dtype=np.float64)
+        return empty, empty
+    order = np.argsort(lo, kind="stable")
+    lo, hi = lo[order], hi[order]
+    reach = np.maximum.accumulate(hi)[:-1]
+    k = np.flatnonzero(lo[1:] - reach >= min_gap)
+    return reach[k], lo[1:][k]
+
+
+def _line_counts(top: "np.ndarray", group: "np.ndarray", n_groups: int) -> "np.ndarray":
+    # Distinct rendered lines (rounded `top`, as in `render_lines`) per group.
+    pairs = np.unique(np.stack([group, np.rint(top)]), axis=1)
+    return np.bincount(pairs[0].astype(np.int64), minlength=n_groups)
+
+
+def layout_blocks(
+    words: Words,
+    *,
+    min_gap: float = COLUMN_MIN_GAP,
+    min_row_gap: float = ROW_MIN_GAP,
+    min_lines: int = COLUMN_MIN_LINES,
+    width: float | None = None,
+) -> list["np.ndarray"]:
+    """
+    Word index arrays of the page's text blocks, in reading order.
+
+    Recursive XY-cut: split at vertical gutters (no word box crosses them) into columns, left
+    to right; where there is none, split into horizontal bands at empty rows and look for
+    columns inside each band (e.g. body text under a full-width title). Bands without columns
+    stay together as one block, so a plain column is a single block rendered as before.
+
+    With the page `width`, a gutter over the page centre (a spread's fold) counts however few
+    lines its sides have; failing that, a block is still split at the centre when only a few
+    words cross it and both sides hold a fair share of the words (words go by their centre).
+    """
+    _require_numpy()
+    mid = float(width) / 2.0 if width else None
+
+    def split(idx: "np.ndarray", centres: "np.ndarray", cuts: "np.ndarray") -> list["np.ndarray"]:
+        col = np.searchsorted(cuts, centres)
+        return [b for c in range(len(cuts) + 1) for b in cut(idx[col == c])]
+
+    def cut(idx: "np.ndarray") -> list["np.ndarray"]:
+        x0, x1 = words.x0[idx], words.x1[idx]
+        top, bottom = words.top[idx], words.bottom[idx]
+        centres = (x0 + x1) / 2.0
+
+        starts, ends = _gaps(x0, x1, min_gap)
+        if len(starts):
+            gutters = (starts + ends) / 2.0
+            col = np.searchsorted(gutters, centres)
+            lines = _line_counts(top, col, len(gutters) + 1)
+            # Only gutters with enough lines on both sides (or the fold); dropping one merges its neighbours.
+            keep = (lines[:-1] >= min_lines) & (lines[1:] >= min_lines)
+            if mid is not None:
+                keep |= (starts <= mid) & (ends >= mid)
+            if keep.any():
+                return split(idx, centres, gutters[keep])
+
+        if mid is not None and len(idx) > 1:
+            crossing = (x0 < mid) & (x1 > mid)
+            left, right = ~crossing & (x1 <= mid), ~crossing & (x0 >= mid)
+            # Without the crossing words there must still be a gutter at the fold.
+            fold_gap = (x0[right].min() - x1[left].max()) if left.any() and right.any() else 0.0
+            n_left = int((centres < mid).sum())
+            share = min(n_left, len(idx) - n_left) / len(idx)
+            if (
+                fold_gap >= min_gap
+                and int(crossing.sum()) <= FOLD_MAX_CROSSING_SHARE * len(idx)
+                and share >= FOLD_MIN_SIDE_SHARE
+            ):
+                return split(idx, centres, np.array([mid]))
+
+        row_starts, row_ends = _gaps(top, bottom, min_row_gap)
+        if not len(row_starts):
+            return [idx]
+        rows = (row_starts + row_ends) / 2.0
+        band = np.searchsorted(rows, (top + bottom) / 2.0)
+        bands = [cut(idx[band == b]) for b in range(len(rows) + 1)]
+        if all(len(b) == 1 for b in bands):
+            return [idx]
+        # Keep runs of single-block bands together; only bands that have columns are split up.
+        out: list["np.ndarray"] = []
+        run: list["np.ndarray"] = []
+        for blocks in bands:
+            if len(blocks) == 1:
+                run.append(blocks[0])
+                continue
+            if run:
+                out.append(np.sort(np.concatenate(run)))
+                run = []
+            out.extend(blocks)
+        if run:
+            out.append(np.sort(np.concatenate(run)))
+        return out
+
+    if len(words) == 0:
+        return []
+    return cut(np.arange(len(words)))
+
+
+def render_columns(words: Words, **kwargs: Any) -> str:
+    """
+    `render_lines` per block of `layout_blocks`, blocks separated by a blank line.
+    """
+    blocks = layout_blocks(words, **kwargs)
+    if len(blocks) <= 1:
+        return render_lines(words)
+    rendered = (render_lines(words.take(b)) for b in blocks)
+    return "\n\n".join(t for t in rendered if t).strip()
@@ -0,0 +1,178 @@
+"""
+Content-addressed on-disk cache of PDF page layouts (`scripts.pdf_text`).
+
+Why:
+- Every run of `extract_shelters_structured` (also `--only-dump-pages` debugging runs)
+  re-ran pdfplumber on every page, which dominates the run time before any LLM call.
+- Per page we keep the pdfplumber results (layout text, `extract_words` boxes, page size)
+  and the rendered page text. Repeated runs skip PDF parsing; when only the rendering
+  (column heuristics) changes, the text is re-rendered from the cached words.
+
+Key:
+- sha256 of the PDF bytes, page number, and a digest of the extraction parameters
+  (extractor version, pdfplumber version, tolerances). A changed PDF or extractor never
+  hits an old entry; stale files are simply never read again (delete the folder to reclaim).
+
+Format (one file per page, `<root>/<pdf sha256>/p0001-<params digest>.bin`):
+  b"PDFPC" + u8 format + zlib(payload); payload (little-endian):
+    header  `<HddI` render_version, width, height (NaN = unknown), word count N
+    3 UTF-8 strings (u32 length + bytes): layout text, rendered text, words' text joined by "\\0"
+    float64[4 * N]: x0, x1, top, bottom per word
+
+Usage:
+  cache = PdfPageCache("scripts/pdf_page_cache")
+  digest = cache.pdf_digest("shelter.pdf")
+  hit = cache.load(digest, 5, params=params)
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import os
+import struct
+import sys
+import zlib
+from array import array
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+logger = logging.getLogger("pdf_page_cache")
+
+_MAGIC = b"PDFPC"
+_FORMAT = 1
+_HEADER = struct.Struct("<HddI")
+_U32 = struct.Struct("<I")
+# Word fields kept from pdfplumber's `extract_words` (besides "text").
+WORD_BOX_FIELDS = ("x0", "x1", "top", "bottom")
+
+
+@dataclass(frozen=True)
+class PageLayout:
+    """
+    What pdfplumber produced for one page; everything the text rendering needs.
+    """
+
+    page_number: int
+    width: float | None
+    height: float | None
+    layout_text: str
+    words: list[dict[str, Any]]
+
+
+@dataclass(frozen=True)
+class CachedPage:
+    layout: PageLayout
+    text: str
+    render_version: int
+
+
+def params_digest(params: dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(params, sort_keys=True, separators=(",", ":")).encode("utf-8")).hexdigest()[:16]
+
+
+def _pack_str(out: bytearray, value: str) -> None:
+    data = value.encode("utf-8")
+    out += _U32.pack(len(data))
+    out += data
+
+
+def _unpack_str(buf: bytes, offset: int) -> tuple[str, int]:
+    (n,) = _U32.unpack_from(buf, offset)
+    offset += _U32.size
+    return buf[offset : offset + n].decode("utf-8"), offset + n
+
+
+def encode_page(layout: PageLayout, text: str, *, render_version: int) -> bytes:
+    words = layout.words
+    boxes = array("d", (float(w.get(f, 0.0) or 0.0) for w in words for f in WORD_BOX_FIELDS))
+    if sys.byteorder != "little":  # pragma: no cover
+        boxes.byteswap()
+    payload = bytearray(
+        _HEADER.pack(
+            render_version,
+            math.nan if layout.width is None else float(layout.width),
+            math.nan if layout.height is None else float(layout.height),
+            len(words),
+        )
+    )
+    _pack_str(payload, layout.layout_text)
+    _pack_str(payload, text)
+    _pack_str(payload, "\0".join(str(w.get("text") or "").replace("\0", "") for w in words))
+    payload += boxes.tobytes()
+    return _MAGIC + bytes([_FORMAT]) + zlib.compress(bytes(payload), 6)
+
+
+def decode_page(data: bytes, *, page_number: int) -> CachedPage:
+    if not data.startswith(_MAGIC) or len(data) <= len(_MAGIC) or data[len(_MAGIC)] != _FORMAT:
+        raise ValueError("Not a pdf page cache entry (or unsupported format)")
+    buf = zlib.decompress(data[len(_MAGIC) + 1 :])
+    render_version, width, height, n_words = _HEADER.unpack_from(buf, 0)
+    offset = _HEADER.size
+    layout_text, offset = _unpack_str(buf, offset)
+    text, offset = _unpack_str(buf, offset)
+    joined, offset = _unpack_str(buf, offset)
+    boxes = array("d")
+    boxes.frombytes(buf[offset : offset + 8 * len(WORD_BOX_FIELDS) * n_words])
+    if sys.byteorder != "little":  # pragma: no cover
+        boxes.byteswap()
+
+    texts = joined.split("\0") if n_words else []
+    if len(texts) != n_words or len(boxes) != len(WORD_BOX_FIELDS) * n_words:
+        raise ValueError("Truncated pdf page cache entry")
+    k = len(WORD_BOX_FIELDS)
+    words = [{"text": t, **dict(zip(WORD_BOX_FIELDS, boxes[i * k : (i + 1) * k], strict=True))} for i, t in enumerate(texts)]
+    layout = PageLayout(
+        page_number=page_number,
+        width=None if math.isnan(width) else width,
+        height=None if math.isnan(height) else height,
+        layout_text=layout_text,
+        words=words,
+    )
+    return CachedPage(layout=layout, text=text, render_version=render_version)
+
+
+class PdfPageCache:
+    """
+    Safe to use from several processes at once: entries are written atomically, one file per page.
+    """
+
+    def __init__(self, root: str | Path) -> None:
+        self.root = Path(root)
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def pdf_digest(pdf_path: str | Path) -> str:
+        h = hashlib.sha256()
+        with open(pdf_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                h.update(block)
+        return h.hexdigest()
+
+    def path_for(self, digest: str, page_number: int, *, params: dict[str, Any]) -> Path:
+        return self.root / digest / f"p{page_number:04d}-{params_digest(params)}.bin"
+
+    def load(self, digest: str, page_number: int, *, params: dict[str, Any]) -> CachedPage | None:
+        path = self.path_for(digest, page_number, params=params)
+        try:
+            entry = decode_page(path.read_bytes(), page_number=page_number)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError, zlib.error, struct.error) as ex:
+            logger.warning("Ignoring unreadable pdf page cache entry %s: %s", path, ex)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def store(self, digest: str, layout: PageLayout, text: str, *, params: dict[str, Any], render_version: int) -> None:
+        path = self.path_for(digest, layout.page_number, params=params)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(encode_page(layout, text, render_version=render_version))
+        tmp.replace(path)
@@ -1,86 +1,174 @@
 from __future__ import annotations
 
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
+from typing import Any, Iterable
 
 import pdfplumber
 
+# Allow running as module or directly
+try:
+    from scripts.pdf_layout import DEFAULT_X_TOLERANCE, DEFAULT_Y_TOLERANCE, Words, extract_words, render_columns, render_lines
+    from scripts.pdf_page_cache import PageLayout, PdfPageCache
+except ModuleNotFoundError:  # pragma: no cover
+    import sys
 
-def _extract_page_text(page: pdfplumber.page.Page) -> str:
+    repo_root = Path(__file__).resolve().parents[1]
+    if str(repo_root) not in sys.path:
+        sys.path.insert(0, str(repo_root))
+    from scripts.pdf_layout import DEFAULT_X_TOLERANCE, DEFAULT_Y_TOLERANCE, Words, extract_words, render_columns, render_lines
+    from scripts.pdf_page_cache import PageLayout, PdfPageCache
+
+
+# Bump when `_page_layout` changes what it derives from pdfplumber (invalidates the page cache).
+LAYOUT_VERSION = 2
+# Bump when `_render_page_text` changes; cached layouts are then re-rendered, not re-parsed.
+RENDER_VERSION = 3
+
+
+def _layout_params() -> dict[str, Any]:
+    return {
+        "layout_version": LAYOUT_VERSION,
+        "pdfplumber": getattr(pdfplumber, "__version__", "?"),
+        "extract_words": {"x_tolerance": DEFAULT_X_TOLERANCE, "y_tolerance": DEFAULT_Y_TOLERANCE},
+    }
+
+
+def _page_layout(page: pdfplumber.page.Page) -> PageLayout:
     """
-    pdfplumber can return sparse/None text depending on layout.
-    We try a layout-aware extraction first; then fallback to word-based reconstruction.
-    For multi-column pages, we reconstruct text column-wise (left then right) to avoid
-    interleaving that hurts downstream extraction.
+    One pass over the page's characters: word boxes plus a plain line-by-line fallback text.
     """
     try:
-        txt = page.extract_text(layout=True, x_tolerance=2, y_tolerance=2) or ""
-    except TypeError:
-        # older pdfplumber versions may not support these kwargs
-        txt = page.extract_text() or ""
+        words = extract_words(page.chars)
+    except Exception:
+        words = Words.from_dicts([])
 
-    txt = txt.strip()
+    width = getattr(page, "width", None)
+    height = getattr(page, "height", None)
+    return PageLayout(
+        page_number=int(getattr(page, "page_number", 0) or 0),
+        width=float(width) if width else None,
+        height=float(height) if height else None,
+        layout_text=render_lines(words),
+        words=words.to_dicts(),
+    )
 
-    # Word-based reconstruction (more robust, and lets us fix column reading order)
-    try:
-        words = page.extract_words() or []
-    except Exception:
-        return txt
 
-    if not words:
+def _render_page_text(layout: PageLayout) -> str:
+    """
+    pdfplumber can return sparse/None text depending on layout.
+    We reconstruct the text from word boxes (fallback: the plain line text of the page).
+    For multi-column pages (any number of columns, gutters wherever they are), we render
+    block by block in reading order to avoid interleaving that hurts downstream extraction.
+    """
+    txt = layout.layout_text.strip()
+
+    words = Words.from_dicts(layout.words)
+    if not len(words):
         return txt
 
-    width = getattr(page, "width", None)
-    mid_x = (float(width) / 2.0) if width else None
-
-    def render_word_block(block_words: list[dict]) -> str:
-        # Group by approximate line (y/top)
-        lines: dict[int, list[dict]] = {}
-        for w in block_words:
-            top = int(round(float(w.get("top", 0))))
-            lines.setdefault(top, []).append(w)
-
-        out_lines: list[str] = []
-        for top in sorted(lines.keys()):
-            line_words = sorted(lines[top], key=lambda w: float(w.get("x0", 0)))
-            out_lines.append(" ".join(w.get("text", "").strip() for w in line_words if w.get("text")))
-        return "\n".join(out_lines).strip()
-
-    # If we can detect words on both halves, render left column then right column.
-    if mid_x is not None:
-        left = [w for w in words if float(w.get("x0", 0)) < mid_x]
-        right = [w for w in words if float(w.get("x0", 0)) >= mid_x]
-        total = len(words) or 1
-        if len(left) / total > 0.2 and len(right) / total > 0.2:
-            left_txt = render_word_block(left)
-            right_txt = render_word_block(right)
-            combined = (left_txt + "\n\n" + right_txt).strip()
-            if combined:
-                return combined
-
-    # Single column: render all words in reading order
-    rendered = render_word_block(words)
+    rendered = render_columns(words, width=layout.width)
     return rendered if rendered else txt
 
 
-def pdf_to_text(pdf_path: str | Path) -> str:
-    path = Path(pdf_path)
-    pages: list[str] = []
-    with pdfplumber.open(str(path)) as pdf:
+def _extract_page_text(page: pdfplumber.page.Page) -> str:
+    return _render_page_text(_page_layout(page))
+
+
+def pdf_page_count(pdf_path: str | Path) -> int:
+    with pdfplumber.open(str(pdf_path)) as pdf:
+        return len(pdf.pages)
+
+
+def _extract_pages_worker(
+    pdf_path: str,
+    page_numbers: list[int],
+    cache_root: str | None = None,
+    pdf_digest: str | None = None,
+) -> list[tuple[int, str]]:
+    """
+    Open only `page_numbers` (1-indexed) and extract them one by one, dropping each page's
+    object/layout caches right after, so memory stays at about one page.
+    With `cache_root`, each page's layout + text is stored in the page cache.
+    """
+    cache = PdfPageCache(cache_root) if cache_root and pdf_digest else None
+    params = _layout_params()
+    out: list[tuple[int, str]] = []
+    with pdfplumber.open(pdf_path, pages=page_numbers) as pdf:
         for page in pdf.pages:
-            pages.append(_extract_page_text(page))
+            layout = _page_layout(page)
+            text = _render_page_text(layout)
+            if cache is not None:
+                cache.store(pdf_digest, layout, text, params=params, render_version=RENDER_VERSION)  # type: ignore[arg-type]
+            out.append((page.page_number, text))
+            page.close()
+    return out
+
+
+def extract_pages_text(
+    pdf_path: str | Path,
+    page_numbers: Iterable[int],
+    *,
+    workers: int | None = None,
+    cache: PdfPageCache | None = None,
+) -> dict[int, str]:
+    """
+    Extract only the given pages (1-indexed); returns {page_number: text} in page order.
+
+    `workers` > 1 spreads the pages over a process pool (pdfplumber layout is CPU-bound and
+    holds the GIL). One task per page, so a single slow page (maps, many glyphs) doesn't hold
+    back a whole chunk. Default: one worker per CPU, capped at the number of pages.
+    With `cache`, pages already extracted from the same PDF bytes are not parsed again.
+    Page numbers outside the PDF are ignored.
+    """
+    path = str(Path(pdf_path))
+    total = pdf_page_count(path)
+    wanted = sorted({int(n) for n in page_numbers if 1 <= int(n) <= total})
+    if not wanted:
+        return {}
+
+    out: dict[int, str] = {}
+    digest: str | None = None
+    if cache is not None:
+        digest = cache.pdf_digest(path)
+        params = _layout_params()
+        for n in wanted:
+            hit = cache.load(digest, n, params=params)
+            if hit is None:
+                continue
+            if hit.render_version == RENDER_VERSION:
+                out[n] = hit.text
+            else:
+                out[n] = _render_page_text(hit.layout)
+                cache.store(digest, hit.layout, out[n], params=params, render_version=RENDER_VERSION)
+    missing = [n for n in wanted if n not in out]
+    cache_root = str(cache.root) if cache is not None else None
+
+    n_workers = min(len(missing), workers if workers is not None else (os.cpu_count() or 1))
+    if n_workers <= 1:
+        if missing:
+            out.update(_extract_pages_worker(path, missing, cache_root, digest))
+    else:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            tasks = [[n] for n in missing]
+            n_tasks = len(tasks)
+            for chunk in pool.map(_extract_pages_worker, [path] * n_tasks, tasks, [cache_root] * n_tasks, [digest] * n_tasks):
+                out.update(chunk)
+    return {n: out[n] for n in wanted}
+
+
+def pdf_to_text(pdf_path: str | Path, *, workers: int | None = None, cache: PdfPageCache | None = None) -> str:
+    pages = pdf_to_pages_text(pdf_path, workers=workers, cache=cache)
     return "\n\n".join(pages).strip()
 
 
-def pdf_to_pages_text(pdf_path: str | Path) -> list[str]:
+def pdf_to_pages_text(pdf_path: str | Path, *, workers: int | None = None, cache: PdfPageCache | None = None) -> list[str]:
     """
     Returns a list of per-page texts (1:1 with PDF pages).
     """
-    path = Path(pdf_path)
-    out: list[str] = []
-    with pdfplumber.open(str(path)) as pdf:
-        for page in pdf.pages:
-            out.append(_extract_page_text(page))
-    return out
+    texts = extract_pages_text(pdf_path, range(1, pdf_page_count(pdf_path) + 1), workers=workers, cache=cache)
+    return list(texts.values())
 
 
 def chunk_text(text: str, *, max_chars: int = 40_000, overlap_chars: int = 1_000) -> list[str]:
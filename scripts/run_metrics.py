@@ -0,0 +1,262 @@
+"""
+Per-run timings and counters for the scripts (phases, pages, HTTP latency per host).
+
+Why:
+- The capacity scraper only logged `updated/unmatched/failed`; nothing showed where a run's
+  time budget goes (listing fetches, parsing, DB read, matching, writes) or when an external
+  host got slower.
+
+Model:
+- `phase(name)`: wall time of a code section; sections may run in several threads at once, so
+  both the summed time (`seconds`) and the covered span (`wall_seconds`) are reported.
+- `page(key)`: one listing/detail page; HTTP observations and parse phases of the same thread
+  inside the block are attributed to it (bytes, status, fetch/parse time).
+- `observe_http(url, seconds, ...)`: one request; latency histogram per host.
+- One process-wide instance (`metrics()`); `reset_metrics()` starts a new run (daemon cycle).
+
+Output:
+- `write_json(path)`: machine-readable run report.
+- `write_prometheus(path)`: node_exporter textfile collector format (atomic replace).
+
+Usage:
+  from scripts.run_metrics import metrics
+
+  with metrics().phase("db_read"):
+      rows = fetch_rows()
+  metrics().write_json("tmp_logs/run.json")
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import threading
+import time as time_mod
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator
+from urllib.parse import urlsplit
+
+# Upper bounds (seconds) of the latency histogram buckets.
+HTTP_BUCKETS_S: tuple[float, ...] = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, math.inf)
+
+
+class _Phase:
+    __slots__ = ("count", "seconds", "max_seconds", "first_start", "last_end")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.first_start: float | None = None
+        self.last_end: float | None = None
+
+    def add(self, start: float, end: float) -> None:
+        d = max(0.0, end - start)
+        self.count += 1
+        self.seconds += d
+        self.max_seconds = max(self.max_seconds, d)
+        self.first_start = start if self.first_start is None else min(self.first_start, start)
+        self.last_end = end if self.last_end is None else max(self.last_end, end)
+
+
+class _HostStats:
+    __slots__ = ("buckets", "count", "seconds", "bytes", "statuses")
+
+    def __init__(self) -> None:
+        self.buckets = [0] * len(HTTP_BUCKETS_S)
+        self.count = 0
+        self.seconds = 0.0
+        self.bytes = 0
+        self.statuses: Counter[str] = Counter()
+
+
+class RunMetrics:
+    """
+    Thread-safe; every method may be called from any worker thread.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.started_at = datetime.now(timezone.utc)
+        self._t0 = time_mod.perf_counter()
+        self.phases: dict[str, _Phase] = {}
+        self.hosts: dict[str, _HostStats] = {}
+        self.counters: Counter[str] = Counter()
+        self.pages: list[dict[str, Any]] = []
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time_mod.perf_counter()
+        try:
+            yield
+        finally:
+            end = time_mod.perf_counter()
+            with self._lock:
+                self.phases.setdefault(name, _Phase()).add(start, end)
+            page = getattr(self._local, "page", None)
+            if page is not None:
+                page[f"{name}_s"] = page.get(f"{name}_s", 0.0) + (end - start)
+
+    @contextmanager
+    def page(self, key: str, **fields: Any) -> Iterator[dict[str, Any]]:
+        """
+        Record one page; the yielded dict may be extended by the caller (e.g. offers=10).
+        """
+        record: dict[str, Any] = {"key": key, "bytes": 0, **fields}
+        outer = getattr(self._local, "page", None)
+        self._local.page = record
+        start = time_mod.perf_counter()
+        try:
+            yield record
+        finally:
+            record["seconds"] = time_mod.perf_counter() - start
+            record["start_s"] = start - self._t0
+            self._local.page = outer
+            with self._lock:
+                self.pages.append(record)
+
+    def observe_http(self, url: str, seconds: float, *, status: int | None, nbytes: int = 0) -> None:
+        host = urlsplit(url).netloc or url
+        with self._lock:
+            h = self.hosts.setdefault(host, _HostStats())
+            for i, bound in enumerate(HTTP_BUCKETS_S):
+                if seconds <= bound:
+                    h.buckets[i] += 1
+                    break
+            h.count += 1
+            h.seconds += seconds
+            h.bytes += nbytes
+            h.statuses[str(status) if status is not None else "error"] += 1
+        page = getattr(self._local, "page", None)
+        if page is not None:
+            page["bytes"] += nbytes
+            page["http_s"] = page.get("http_s", 0.0) + seconds
+            page["status"] = status
+
+    def incr(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[name] += n
+
+    # --- output ---------------------------------------------------------------------------
+
+    def report(self, **extra: Any) -> dict[str, Any]:
+        with self._lock:
+            phases = {
+                name: {
+                    "count": p.count,
+                    "seconds": round(p.seconds, 6),
+                    "wall_seconds": round((p.last_end or 0.0) - (p.first_start or 0.0), 6),
+                    "max_seconds": round(p.max_seconds, 6),
+                }
+                for name, p in sorted(self.phases.items())
+            }
+            hosts = {
+                host: {
+                    "requests": h.count,
+                    "seconds": round(h.seconds, 6),
+                    "bytes": h.bytes,
+                    "statuses": dict(h.statuses),
+                    "buckets": {("+Inf" if math.isinf(b) else str(b)): n for b, n in zip(HTTP_BUCKETS_S, h.buckets, strict=True)},
+                }
+                for host, h in sorted(self.hosts.items())
+            }
+            pages = sorted((dict(p) for p in self.pages), key=lambda p: p.get("start_s", 0.0))
+            counters = dict(sorted(self.counters.items()))
+        return {
+            "started_at": self.started_at.isoformat(),
+            "duration_s": round(time_mod.perf_counter() - self._t0, 6),
+            "phases": phases,
+            "hosts": hosts,
+            "counters": counters,
+            "pages": pages,
+            **extra,
+        }
+
+    def write_json(self, path: str | Path, **extra: Any) -> None:
+        _atomic_write(Path(path), json.dumps(self.report(**extra), ensure_ascii=False, indent=2))
+
+    def write_prometheus(self, path: str | Path, *, prefix: str = "kaeltehilfe", labels: dict[str, str] | None = None) -> None:
+        _atomic_write(Path(path), self.prometheus_text(prefix=prefix, labels=labels))
+
+    def prometheus_text(self, *, prefix: str = "kaeltehilfe", labels: dict[str, str] | None = None) -> str:
+        rep = self.report()
+        base = dict(labels or {})
+        lines: list[str] = []
+
+        def _labels(**kv: str) -> str:
+            merged = {**base, **kv}
+            if not merged:
+                return ""
+            body = ",".join(f'{k}="{_escape(str(v))}"' for k, v in merged.items())
+            return "{" + body + "}"
+
+        def _metric(name: str, mtype: str, help_text: str) -> str:
+            full = f"{prefix}_{name}"
+            lines.append(f"# HELP {full} {help_text}")
+            lines.append(f"# TYPE {full} {mtype}")
+            return full
+
+        m = _metric("run_duration_seconds", "gauge", "Wall time of the last run")
+        lines.append(f"{m}{_labels()} {rep['duration_s']}")
+        m = _metric("run_timestamp_seconds", "gauge", "Start of the last run (unix time)")
+        lines.append(f"{m}{_labels()} {self.started_at.timestamp():.3f}")
+
+        m = _metric("phase_seconds", "gauge", "Summed time spent in a phase during the last run")
+        for name, p in rep["phases"].items():
+            lines.append(f"{m}{_labels(phase=name)} {p['seconds']}")
+        m = _metric("phase_wall_seconds", "gauge", "First start to last end of a phase during the last run")
+        for name, p in rep["phases"].items():
+            lines.append(f"{m}{_labels(phase=name)} {p['wall_seconds']}")
+        m = _metric("phase_count", "gauge", "Times a phase ran during the last run")
+        for name, p in rep["phases"].items():
+            lines.append(f"{m}{_labels(phase=name)} {p['count']}")
+
+        m = _metric("http_request_duration_seconds", "histogram", "HTTP request latency per host (last run)")
+        for host, h in rep["hosts"].items():
+            cumulative = 0
+            for le, n in h["buckets"].items():
+                cumulative += n
+                lines.append(f"{m}_bucket{_labels(host=host, le=le)} {cumulative}")
+            lines.append(f"{m}_sum{_labels(host=host)} {h['seconds']}")
+            lines.append(f"{m}_count{_labels(host=host)} {h['requests']}")
+        m = _metric("http_response_bytes", "gauge", "Response body bytes per host (last run)")
+        for host, h in rep["hosts"].items():
+            lines.append(f"{m}{_labels(host=host)} {h['bytes']}")
+
+        m = _metric("run_counter", "gauge", "Counters of the last run")
+        for name, n in rep["counters"].items():
+            lines.append(f"{m}{_labels(name=name)} {n}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _atomic_write(path: Path, text: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    tmp.replace(path)
+
+
+_current = RunMetrics()
+_current_lock = threading.Lock()
+
+
+def metrics() -> RunMetrics:
+    return _current
+
+
+def reset_metrics() -> RunMetrics:
+    """
+    Start a new run (e.g. a daemon cycle); returns the fresh instance.
+    """
+    global _current
+    with _current_lock:
+        _current = RunMetrics()
+        return _current
@@ -9,8 +9,36 @@ Why:
   - plenty (green)
 - It can also differentiate by gender (men/women/diverse) and an overall status.
 
-Source list (Notübernachtung only):
-  https://kaeltehilfe-berlin.de/angebote/filter/1?start=0
+Writes:
+- Listing pages are fetched with conditional GETs (`scripts/kaeltehilfe_http_cache.json`);
+  if nothing changed since the last committed run, the DB is not read or written.
+- Only rows whose Kaeltehilfe columns changed are updated (bulk RPC `apply_kaeltehilfe_capacity`).
+- Fetching, matching and writing run as a streaming pipeline (`scripts.kaeltehilfe_sync`): rows
+  are matched and written while later listing pages are still being fetched.
+- Each --commit run records one row in `public.scrape_runs` (`partial` if some row updates
+  failed); the map derives "checked at" from the latest finished full run of the source
+  (view `scrape_source_freshness`), not from every shelter row.
+- `--schedule` refreshes only shelters whose intake window (opening hours columns, see
+  `scripts.kaeltehilfe_schedule`) is open or about to open, fetching just the listing pages
+  their offers were on in the last full scan; a full scan still runs every --full-scan-min.
+  Scheduled runs are recorded as source `kaeltehilfe:<typ>:scheduled`.
+- Every run's per-offer statuses are appended to a local history (`scripts/kaeltehilfe_history/`,
+  see `scripts.kaeltehilfe_history` for the query CLI); the DB only keeps the latest state.
+- `--details` (opt-in) additionally fetches the offer page of every matched row (concurrent,
+  token-bucket rate limit, conditional GET; see `scripts.kaeltehilfe_details`) and bulk-writes
+  changed documents to `unterkuenfte.kaeltehilfe_details` (RPC `apply_kaeltehilfe_details`).
+  `--details --commit` is refused until the parser passes against a saved real offer page
+  (`python -m scripts.benchmarks.parse_details`).
+
+Source lists (one per DB typ, see `KAELTEHILFE_CATEGORY_FILTERS`):
+  https://kaeltehilfe-berlin.de/angebote/filter/1?start=0   (notuebernachtung)
+  Further categories are mapped in `scripts/kaeltehilfe_categories.json` or with
+  `--category typ=<filter id>`; `--typ all` scrapes every mapped category concurrently.
+
+Modules: listing fetch/pagination `scripts.kaeltehilfe_listing`, Supabase reads/writes
+`scripts.kaeltehilfe_db`, the sync pipeline `scripts.kaeltehilfe_sync`, `--daemon`
+`scripts.kaeltehilfe_daemon`; card parsing and name matching live in `scripts.kaeltehilfe_parse`
+and `scripts.kaeltehilfe_match`.
 
 Usage:
   # Dry-run (no DB writes)
@@ -19,584 +47,240 @@ Usage:
   # Actually update Supabase
   python -m scripts.scrape_kaeltehilfe_capacity --commit
 
+  # Every mapped category in one process
+  python -m scripts.scrape_kaeltehilfe_capacity --commit --typ all
+
+  # Also refresh the detail pages (max. 4 requests/s)
+  python -m scripts.scrape_kaeltehilfe_capacity --commit --details --details-rate 4
+
+  # Keep running; poll every 2-5 min in the evening intake hours, up to 30 min otherwise
+  python -m scripts.scrape_kaeltehilfe_capacity --commit --daemon
+
+  # ... and per shelter: only those in (or 30 min before) their intake window, full scan hourly
+  python -m scripts.scrape_kaeltehilfe_capacity --commit --daemon --schedule
+
+  # Run report: time per phase/page, HTTP latency per host (JSON + Prometheus textfile)
+  python -m scripts.scrape_kaeltehilfe_capacity --commit --metrics-json tmp_logs/run.json --metrics-prom /var/lib/node_exporter/kaeltehilfe.prom
+
 Requires:
-  - requests, beautifulsoup4 (pip install -r requirements.txt)
+  - requests, lxml or beautifulsoup4 (pip install -r requirements.txt)
   - NEXT_PUBLIC_SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY (from scripts/.env or exported)
 """
 
 from __future__ import annotations
 
 import argparse
-import difflib
-import json
 import logging
-import os
-import re
-import time as time_mod
-import unicodedata
-from dataclasses import dataclass
-from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any
-from urllib.parse import urljoin
-
-try:
-    import requests
-except ModuleNotFoundError:  # pragma: no cover
-    requests = None  # type: ignore
-
-try:
-    from bs4 import BeautifulSoup  # type: ignore
-except ModuleNotFoundError:  # pragma: no cover
-    BeautifulSoup = None  # type: ignore
 
 # Allow running both as module and directly.
 try:
-    from scripts.env import load_dotenv
+    from scripts.http_resilience import add_resilience_arguments, configure_from_args
+    from scripts.kaeltehilfe_daemon import DEFAULT_INTAKE_HOURS, parse_hour_range, run_daemon
+    from scripts.kaeltehilfe_db import get_supabase_config
+    from scripts.kaeltehilfe_details import (
+        DEFAULT_BURST as DEFAULT_DETAILS_BURST,
+        DEFAULT_CONCURRENCY as DEFAULT_DETAILS_CONCURRENCY,
+        DEFAULT_RATE_PER_S as DEFAULT_DETAILS_RATE,
+        fixture_problems,
+    )
+    from scripts.kaeltehilfe_history import HISTORY_DIR
+    from scripts.kaeltehilfe_listing import resolve_categories
+    from scripts.kaeltehilfe_match import FUZZY_BACKENDS, default_fuzzy_backend
+    from scripts.kaeltehilfe_parse import PARSER_BACKENDS, default_parser_backend
+    from scripts.kaeltehilfe_schedule import DEFAULT_LEAD_MINUTES
+    from scripts.kaeltehilfe_sync import sync_categories, write_run_report
 except ModuleNotFoundError:  # pragma: no cover
     import sys
 
     repo_root = Path(__file__).resolve().parents[1]
     if str(repo_root) not in sys.path:
         sys.path.insert(0, str(repo_root))
-    from scripts.env import load_dotenv
-
-logger = logging.getLogger("scrape_kaeltehilfe_capacity")
-
-KAEHLTEHILFE_BASE = "https://kaeltehilfe-berlin.de"
-NOTUEBERNACHTUNG_LIST_URL = f"{KAEHLTEHILFE_BASE}/angebote/filter/1"
-
-# Words that are very common in offer names and don't help matching.
-_MATCH_STOPWORDS: set[str] = {
-    "notuebernachtung",
-    "notubernaechtiung",
-    "notubernachtung",
-    "nachtcafe",
-    "tagesangebote",
-    "beratung",
-    "hygiene",
-    "medizinische",
-    "hilfen",
-    "essen",
-    "verpflegung",
-    "kleiderkammer",
-    "suchtangebote",
-    "fuer",
-    "fur",
-    "in",
-    "am",
-    "an",
-    "im",
-    "bei",
-    "auf",
-    "der",
-    "die",
-    "das",
-    "und",
-    "oder",
-    "vom",
-    "von",
-    "zum",
-    "zur",
-    "des",
-    "den",
-    "mit",
-    "ohne",
-    "nur",
-    "alle",
-    "frauen",
-    "maenner",
-    "manner",
-    "divers",
-    "geschlechter",
-    "familien",
-    "wohnungslose",
-    "wohnungslosem",
-    "obdachlose",
-    "obdachlosen",
-}
-
-
-CapacityStatus = str  # "none" | "little" | "plenty"
-
-
-@dataclass(frozen=True)
-class ScrapedOffer:
-    name: str
-    url: str | None
-    status_all: CapacityStatus | None
-    status_men: CapacityStatus | None
-    status_women: CapacityStatus | None
-    status_diverse: CapacityStatus | None
-
-
-def _now_iso() -> str:
-    return datetime.now(timezone.utc).isoformat()
-
-
-def _repo_root() -> Path:
-    return Path(__file__).resolve().parents[1]
-
-
-def _load_overrides() -> dict[str, str]:
-    """
-    Load manual overrides from `scripts/kaeltehilfe_overrides.json`.
-
-    Format:
-      {
-        "by_unterkunft_id": {
-          "<uuid>": "https://kaeltehilfe-berlin.de/kaeltehilfe-angebot/<slug>"
-        }
-      }
-    """
-    path = _repo_root() / "scripts" / "kaeltehilfe_overrides.json"
-    if not path.exists():
-        return {}
-    try:
-        raw = json.loads(path.read_text(encoding="utf-8"))
-    except Exception as ex:  # pragma: no cover
-        logger.warning("Failed to parse overrides JSON (%s): %s", path, ex)
-        return {}
-
-    if not isinstance(raw, dict):
-        return {}
-    by_id = raw.get("by_unterkunft_id")
-    if not isinstance(by_id, dict):
-        return {}
-    out: dict[str, str] = {}
-    for k, v in by_id.items():
-        kid = str(k).strip()
-        url = str(v).strip() if v is not None else ""
-        if kid and url:
-            out[kid] = url
-    return out
-
-
-def _normalize_name(name: str) -> str:
-    """
-    Normalize names for stable matching between our DB and Kaeltehilfe listing.
-    """
-    s = (name or "").strip().lower()
-    if not s:
-        return ""
-
-    # German-specific replacements before stripping diacritics.
-    s = (
-        s.replace("ä", "ae")
-        .replace("ö", "oe")
-        .replace("ü", "ue")
-        .replace("ß", "ss")
+    from scripts.http_resilience import add_resilience_arguments, configure_from_args
+    from scripts.kaeltehilfe_daemon import DEFAULT_INTAKE_HOURS, parse_hour_range, run_daemon
+    from scripts.kaeltehilfe_db import get_supabase_config
+    from scripts.kaeltehilfe_details import (
+        DEFAULT_BURST as DEFAULT_DETAILS_BURST,
+        DEFAULT_CONCURRENCY as DEFAULT_DETAILS_CONCURRENCY,
+        DEFAULT_RATE_PER_S as DEFAULT_DETAILS_RATE,
+        fixture_problems,
     )
+    from scripts.kaeltehilfe_history import HISTORY_DIR
+    from scripts.kaeltehilfe_listing import resolve_categories
+    from scripts.kaeltehilfe_match import FUZZY_BACKENDS, default_fuzzy_backend
+    from scripts.kaeltehilfe_parse import PARSER_BACKENDS, default_parser_backend
+    from scripts.kaeltehilfe_schedule import DEFAULT_LEAD_MINUTES
+    from scripts.kaeltehilfe_sync import sync_categories, write_run_report
 
-    # Remove remaining diacritics.
-    s = unicodedata.normalize("NFKD", s)
-    s = "".join(ch for ch in s if not unicodedata.combining(ch))
-
-    # Normalize punctuation/whitespace.
-    s = re.sub(r"[^a-z0-9]+", " ", s)
-    s = re.sub(r"\s+", " ", s).strip()
-    return s
-
-
-def _match_tokens(name: str) -> set[str]:
-    n = _normalize_name(name)
-    if not n:
-        return set()
-    toks = {t for t in n.split(" ") if t}
-    # Remove very common boilerplate words.
-    toks = {t for t in toks if t not in _MATCH_STOPWORDS}
-    return toks
-
-
-def _best_offer_match(*, db_name: str, offers: list[ScrapedOffer], offers_by_norm: dict[str, ScrapedOffer]) -> tuple[ScrapedOffer | None, str]:
-    """
-    Match a DB name to a Kaeltehilfe offer.
-
-    Strategy:
-    1) exact match on normalized full name
-    2) token containment match on "significant" tokens (stopwords removed)
-    3) fuzzy match (SequenceMatcher) as a last resort
-    """
-    db_norm = _normalize_name(db_name)
-    if not db_norm:
-        return None, "empty"
-
-    direct = offers_by_norm.get(db_norm)
-    if direct is not None:
-        return direct, "direct"
-
-    db_tokens = _match_tokens(db_name)
-    if db_tokens:
-        candidates: list[ScrapedOffer] = []
-        for o in offers:
-            o_tokens = _match_tokens(o.name)
-            if db_tokens.issubset(o_tokens):
-                candidates.append(o)
-        if len(candidates) == 1:
-            return candidates[0], "tokens"
-        if len(candidates) > 1:
-            # Pick the closest by fuzzy ratio on the normalized full string.
-            best = max(
-                candidates,
-                key=lambda o: difflib.SequenceMatcher(None, db_norm, _normalize_name(o.name)).ratio(),
-            )
-            return best, "tokens_ambiguous"
-
-    # Last resort fuzzy match on full normalized name.
-    best_offer: ScrapedOffer | None = None
-    best_ratio = 0.0
-    for o in offers:
-        r = difflib.SequenceMatcher(None, db_norm, _normalize_name(o.name)).ratio()
-        if r > best_ratio:
-            best_ratio = r
-            best_offer = o
-    if best_offer is not None and best_ratio >= 0.78:
-        return best_offer, f"fuzzy:{best_ratio:.2f}"
-
-    return None, "none"
-
-
-def _parse_status_from_alt(alt: str | None) -> CapacityStatus | None:
-    if not alt:
-        return None
-    a = alt.strip().lower()
-    if not a:
-        return None
-    if "keine plätze" in a:
-        return "none"
-    if "wenige plätze" in a:
-        return "little"
-    if "viele plätze" in a:
-        return "plenty"
-    return None
-
-
-def _scrape_page(html: str) -> list[ScrapedOffer]:
-    if BeautifulSoup is None:
-        raise RuntimeError("Missing dependency: beautifulsoup4. Install requirements.txt (pip install -r requirements.txt).")
-
-    soup = BeautifulSoup(html, "html.parser")
-
-    # Cards have class "el-item ... uk-card ..."
-    def _is_card_class(c: Any) -> bool:
-        if not c:
-            return False
-        if isinstance(c, str):
-            parts = c.split()
-        elif isinstance(c, list):
-            parts = [str(x) for x in c]
-        else:
-            return False
-        return ("el-item" in parts) and ("uk-card" in parts)
-
-    cards = soup.find_all("div", class_=_is_card_class)
-    out: list[ScrapedOffer] = []
-
-    for card in cards:
-        a = card.select_one("h3.el-title a")
-        if not a:
-            continue
-
-        name = a.get_text(" ", strip=True)
-        href = a.get("href")
-        url = urljoin(KAEHLTEHILFE_BASE, str(href)) if href else None
-
-        status_all: CapacityStatus | None = None
-        status_men: CapacityStatus | None = None
-        status_women: CapacityStatus | None = None
-        status_diverse: CapacityStatus | None = None
-
-        for img in card.select("div.fs-grid-nested-2 img"):
-            alt = img.get("alt")
-            status = _parse_status_from_alt(alt)
-            if status is None:
-                continue
-
-            alt_l = str(alt).lower() if alt is not None else ""
-            if "männer" in alt_l or "maenner" in alt_l:
-                status_men = status
-            elif "frauen" in alt_l:
-                status_women = status
-            elif "divers" in alt_l:
-                status_diverse = status
-            else:
-                status_all = status
-
-        out.append(
-            ScrapedOffer(
-                name=name,
-                url=url,
-                status_all=status_all,
-                status_men=status_men,
-                status_women=status_women,
-                status_diverse=status_diverse,
-            )
-        )
-
-    return out
-
-
-def _http_get(url: str, *, params: dict[str, str] | None = None, timeout_s: int = 30) -> str:
-    if requests is None:
-        raise RuntimeError("Missing dependency: requests. Install requirements.txt (pip install -r requirements.txt).")
-
-    logger.debug("HTTP GET %s params=%s timeout_s=%s", url, params, timeout_s)
-    headers = {
-        "user-agent": "warmebetten.berlin (kaeltehilfe capacity scraper; once daily)",
-        "accept-language": "de",
-        "accept": "text/html,application/xhtml+xml",
-    }
-    resp = requests.get(url, params=params, headers=headers, timeout=timeout_s)
-    resp.raise_for_status()
-    return resp.text
-
-
-def scrape_all_offers(*, sleep_ms: int = 200, page_size: int = 10, max_pages: int = 200) -> list[ScrapedOffer]:
-    """
-    Paginate through the Notübernachtung listing by increasing `start`.
-
-    Kaeltehilfe uses `start` as an offset (start=0,10,20,30,...) so we advance
-    by a fixed page_size (default 10) and stop when a page returns no cards.
-    """
-    offers: list[ScrapedOffer] = []
-    start = 0
-    seen_offer_keys: set[str] = set()
-    prev_page_signature: tuple[str, ...] | None = None
-
-    for _page in range(max_pages):
-        if start == 0:
-            logger.info("Fetching first page (start=%s)...", start)
-        else:
-            logger.debug("Fetching page (start=%s)...", start)
-        html = _http_get(NOTUEBERNACHTUNG_LIST_URL, params={"start": str(start)})
-        page_offers = _scrape_page(html)
-        if not page_offers:
-            logger.info("Pagination finished at start=%s (no more cards).", start)
-            break
-
-        if start == 0:
-            logger.info("First page parsed: %s offers", len(page_offers))
-        else:
-            logger.debug("Page parsed (start=%s): %s offers", start, len(page_offers))
-
-        # Detect pagination "clamping" / repeats: sometimes start>last_page repeats the last page.
-        # We stop if the whole page is identical to the previous page OR if it contains no new offers.
-        page_keys: list[str] = []
-        for o in page_offers:
-            # Prefer stable url; fall back to normalized name.
-            key = (o.url or "").strip().lower()
-            if not key:
-                key = _normalize_name(o.name)
-            page_keys.append(key)
-        page_signature = tuple(page_keys)
-
-        if prev_page_signature is not None and page_signature == prev_page_signature:
-            logger.info("Pagination stopped at start=%s (page repeats previous page).", start)
-            break
-
-        new_count = 0
-        for o, key in zip(page_offers, page_keys, strict=False):
-            if not key:
-                # Extremely defensive: if we can't key it, still keep it.
-                offers.append(o)
-                new_count += 1
-                continue
-            if key in seen_offer_keys:
-                continue
-            seen_offer_keys.add(key)
-            offers.append(o)
-            new_count += 1
-
-        if new_count == 0:
-            logger.info("Pagination stopped at start=%s (no new unique offers; likely clamped to last page).", start)
-            break
-
-        prev_page_signature = page_signature
-        start += max(1, int(page_size))
-
-        time_mod.sleep(max(0, sleep_ms) / 1000.0)
-
-    return offers
-
-
-def get_supabase_config() -> tuple[str, str]:
-    try:
-        load_dotenv()
-    except FileNotFoundError:  # pragma: no cover
-        pass
-    except PermissionError:  # pragma: no cover
-        pass
-
-    url = os.getenv("NEXT_PUBLIC_SUPABASE_URL") or ""
-    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or ""
-    if not url or not key:
-        raise RuntimeError("Missing NEXT_PUBLIC_SUPABASE_URL or SUPABASE_SERVICE_ROLE_KEY")
-    return url, key
-
-
-def fetch_db_unterkuenfte(url: str, key: str, *, typ: str = "notuebernachtung") -> list[dict[str, Any]]:
-    if requests is None:
-        raise RuntimeError("Missing dependency: requests. Install requirements.txt (pip install -r requirements.txt).")
-
-    endpoint = f"{url.rstrip('/')}/rest/v1/unterkuenfte"
-    params: dict[str, str] = {
-        "select": "id,name,typ",
-        "order": "name.asc",
-        "limit": "10000",
-    }
-    if typ:
-        params["typ"] = f"eq.{typ}"
-
-    headers = {
-        "apikey": key,
-        "Authorization": f"Bearer {key}",
-        "Content-Type": "application/json",
-    }
-    resp = requests.get(endpoint, params=params, headers=headers, timeout=60)
-    resp.raise_for_status()
-    rows = resp.json()
-    return rows if isinstance(rows, list) else []
-
-
-def patch_unterkunft(url: str, key: str, unterkunft_id: str, payload: dict[str, Any]) -> None:
-    if requests is None:
-        raise RuntimeError("Missing dependency: requests. Install requirements.txt (pip install -r requirements.txt).")
+logger = logging.getLogger("scrape_kaeltehilfe_capacity")
 
-    endpoint = f"{url.rstrip('/')}/rest/v1/unterkuenfte"
-    params = {"id": f"eq.{unterkunft_id}"}
-    headers = {
-        "apikey": key,
-        "Authorization": f"Bearer {key}",
-        "Content-Type": "application/json",
-        "Prefer": "return=minimal",
-    }
-    resp = requests.patch(endpoint, params=params, headers=headers, json=payload, timeout=60)
-    if resp.status_code >= 400:
-        raise RuntimeError(f"Update failed ({resp.status_code}): {resp.text}")
+MATCH_CACHE_PATH = Path(__file__).resolve().parent / "kaeltehilfe_match_cache.json"
+HTTP_CACHE_PATH = Path(__file__).resolve().parent / "kaeltehilfe_http_cache.json"
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description=__doc__)
     parser.add_argument("--commit", action="store_true", help="Actually update rows (default: dry-run)")
-    parser.add_argument("--typ", default="notuebernachtung", help="DB typ to update (default: notuebernachtung)")
-    parser.add_argument("--sleep-ms", type=int, default=200, help="Sleep between list page fetches")
+    parser.add_argument(
+        "--typ",
+        default="notuebernachtung",
+        help="DB typ(s) to update: comma-separated, or 'all' mapped categories (default: notuebernachtung)",
+    )
+    parser.add_argument(
+        "--category",
+        action="append",
+        default=[],
+        metavar="TYP=FILTER_ID",
+        help="Map a DB typ to a Kaeltehilfe /angebote/filter/<id> listing (repeatable)",
+    )
+    parser.add_argument("--sleep-ms", type=int, default=200, help="Sleep between list page fetches (concurrent: min gap between request starts)")
     parser.add_argument("--page-size", type=int, default=10, help="Kaeltehilfe pagination step for start=0,10,20,...")
     parser.add_argument("--max-pages", type=int, default=200, help="Safety limit for pagination")
+    parser.add_argument("--concurrency", type=int, default=4, help="Parallel list page fetches (1 = sequential)")
+    parser.add_argument("--per-host-limit", type=int, default=2, help="Max in-flight requests to kaeltehilfe-berlin.de")
     parser.add_argument("--limit", type=int, default=None, help="Limit number of DB rows processed")
+    parser.add_argument("--batch-size", type=int, default=200, help="Rows per bulk capacity update request")
+    parser.add_argument(
+        "--fuzzy-backend",
+        default=default_fuzzy_backend(),
+        choices=list(FUZZY_BACKENDS),
+        help="Last-resort name matching: trigram TF-IDF (needs numpy) or difflib",
+    )
+    parser.add_argument(
+        "--match-cache",
+        default=str(MATCH_CACHE_PATH),
+        help="Persisted unterkunft_id -> offer URL matches (reused while both names are unchanged)",
+    )
+    parser.add_argument("--no-match-cache", action="store_true", help="Match every row from scratch")
+    parser.add_argument(
+        "--http-cache",
+        default=str(HTTP_CACHE_PATH),
+        help="Conditional-GET cache for listing pages (ETag/Last-Modified/body hash + parsed offers)",
+    )
+    parser.add_argument("--no-http-cache", action="store_true", help="Always download and parse every listing page")
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Run matching/writes even if the listing is unchanged since the last committed run",
+    )
+    parser.add_argument(
+        "--fuzzy-threshold",
+        type=float,
+        default=None,
+        help="Minimum fuzzy score (default: 0.65 for tfidf, 0.78 for difflib)",
+    )
+    parser.add_argument(
+        "--parser",
+        default=default_parser_backend(),
+        choices=list(PARSER_BACKENDS),
+        help="Listing HTML parser: lxml (needs lxml), stream (stdlib tokenizer) or bs4",
+    )
+    parser.add_argument(
+        "--details",
+        action="store_true",
+        help="Also fetch the offer detail page of every matched row and update unterkuenfte.kaeltehilfe_details",
+    )
+    parser.add_argument("--details-rate", type=float, default=DEFAULT_DETAILS_RATE, help="Detail page requests per second (token bucket)")
+    parser.add_argument("--details-burst", type=int, default=DEFAULT_DETAILS_BURST, help="Detail page requests allowed back-to-back")
+    parser.add_argument("--details-concurrency", type=int, default=DEFAULT_DETAILS_CONCURRENCY, help="Parallel detail page fetches")
+    parser.add_argument(
+        "--details-unverified",
+        action="store_true",
+        help="Allow --details --commit before the parser passes a saved offer page (load tests against scripts.fake_upstreams only)",
+    )
+    parser.add_argument(
+        "--history",
+        default=str(HISTORY_DIR),
+        help="Directory of the append-only status history (one columnar file per day)",
+    )
+    parser.add_argument("--no-history", action="store_true", help="Do not record statuses in the local history")
+    parser.add_argument(
+        "--schedule",
+        action="store_true",
+        help="Only refresh shelters whose intake window (opening hours) is open or about to open",
+    )
+    parser.add_argument(
+        "--schedule-lead-min",
+        type=int,
+        default=DEFAULT_LEAD_MINUTES,
+        help="--schedule: start refreshing a shelter this many minutes before its intake opens",
+    )
+    parser.add_argument(
+        "--full-scan-min",
+        type=float,
+        default=60,
+        help="--schedule: scan the whole listing (new/moved offers) at least this often; one-shot runs go by the last full run in scrape_runs",
+    )
+    parser.add_argument("--daemon", action="store_true", help="Keep running and poll on an adaptive interval (see scripts.kaeltehilfe_daemon)")
+    parser.add_argument("--min-interval-s", type=float, default=120, help="Daemon: poll interval right after a change")
+    parser.add_argument("--max-interval-s", type=float, default=1800, help="Daemon: longest interval while statuses are stable")
+    parser.add_argument(
+        "--intake-hours",
+        default=DEFAULT_INTAKE_HOURS,
+        help="Daemon: Berlin local hours START-END with faster polling (shelter intake; default: %(default)s)",
+    )
+    parser.add_argument(
+        "--intake-max-interval-s",
+        type=float,
+        default=300,
+        help="Daemon: longest interval during the intake hours",
+    )
+    parser.add_argument("--refresh-rows-min", type=float, default=60, help="Daemon: re-read DB rows after this many minutes")
+    parser.add_argument(
+        "--details-interval-min",
+        type=float,
+        default=360,
+        help="Daemon with --details: refresh detail pages at most this often",
+    )
+    parser.add_argument("--max-cycles", type=int, default=0, help="Daemon: stop after N cycles (0 = run until SIGTERM/SIGINT)")
+    parser.add_argument(
+        "--metrics-json",
+        default=None,
+        help="Write a run report (phase timings, per-page fetches, HTTP latency per host, counters) to this JSON file",
+    )
+    parser.add_argument(
+        "--metrics-prom",
+        default=None,
+        help="Write the run's metrics to this Prometheus textfile (node_exporter textfile collector)",
+    )
+    add_resilience_arguments(parser)
     parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"])
     args = parser.parse_args()
+    if args.details and args.details_rate <= 0:
+        parser.error("--details-rate must be > 0")
+    if args.details and args.commit and not args.details_unverified:
+        problems = fixture_problems()
+        if problems:
+            parser.error(
+                "--details --commit: the detail page parser is not verified against a saved offer page yet "
+                "(dry runs work):\n  " + "\n  ".join(problems)
+            )
+    if args.daemon:
+        try:
+            args.intake_hours = parse_hour_range(args.intake_hours)
+        except ValueError as ex:
+            parser.error(str(ex))
+        if not 0 < args.min_interval_s <= args.max_interval_s:
+            parser.error("--min-interval-s must be > 0 and <= --max-interval-s")
 
     logging.basicConfig(level=getattr(logging, args.log_level), format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    configure_from_args(args)
 
     url, key = get_supabase_config()
 
-    logger.info("Scraping Kaeltehilfe list: %s", NOTUEBERNACHTUNG_LIST_URL)
-    offers = scrape_all_offers(sleep_ms=args.sleep_ms, page_size=args.page_size, max_pages=args.max_pages)
-    logger.info("Scraped %s offers from Kaeltehilfe", len(offers))
-
-    # Index offers by normalized name.
-    offers_by_norm: dict[str, ScrapedOffer] = {}
-    offers_by_url: dict[str, ScrapedOffer] = {}
-    dupes = 0
-    for o in offers:
-        if o.url:
-            u = o.url.strip().lower()
-            if u and u not in offers_by_url:
-                offers_by_url[u] = o
-        k = _normalize_name(o.name)
-        if not k:
-            continue
-        if k in offers_by_norm:
-            dupes += 1
-            continue
-        offers_by_norm[k] = o
-    if dupes:
-        logger.warning("Kaeltehilfe listing contained %s duplicate normalized names; keeping first occurrence", dupes)
-
-    overrides_by_id = _load_overrides()
-    if overrides_by_id:
-        logger.info("Loaded %s manual overrides from scripts/kaeltehilfe_overrides.json", len(overrides_by_id))
-
-    rows = fetch_db_unterkuenfte(url, key, typ=args.typ)
-    if args.limit is not None:
-        rows = rows[: max(0, args.limit)]
-    logger.info("DB targets: %s rows (typ=%s)", len(rows), args.typ)
-
-    updated = 0
-    unmatched = 0
-    failed = 0
-    checked_at = _now_iso()
-
-    for i, r in enumerate(rows, start=1):
-        uid = str(r.get("id") or "")
-        name = str(r.get("name") or "").strip()
-        if not uid or not name:
-            continue
-
-        # 1) Manual override by unterkunft_id -> Kaeltehilfe URL
-        override_url = overrides_by_id.get(uid)
-        offer: ScrapedOffer | None = None
-        match_kind = "none"
-        if override_url:
-            offer = offers_by_url.get(override_url.strip().lower())
-            if offer is None:
-                logger.warning(
-                    "(%s/%s) Override URL not found in scraped offers: id=%s name=%r url=%r",
-                    i,
-                    len(rows),
-                    uid,
-                    name,
-                    override_url,
-                )
-            else:
-                match_kind = "override"
-
-        # 2) Automatic match (name-based)
-        if offer is None:
-            offer, match_kind = _best_offer_match(db_name=name, offers=offers, offers_by_norm=offers_by_norm)
-
-        if offer is None:
-            unmatched += 1
-            logger.warning("(%s/%s) No Kaeltehilfe match for: %r (norm=%r)", i, len(rows), name, _normalize_name(name))
-            continue
-
-        if match_kind != "direct":
-            logger.info("(%s/%s) Matched via %s: %r -> %r", i, len(rows), match_kind, name, offer.name)
-
-        payload: dict[str, Any] = {
-            "kaeltehilfe_capacity_status": offer.status_all,
-            "kaeltehilfe_capacity_status_men": offer.status_men,
-            "kaeltehilfe_capacity_status_women": offer.status_women,
-            "kaeltehilfe_capacity_status_diverse": offer.status_diverse,
-            "kaeltehilfe_capacity_url": offer.url,
-            "kaeltehilfe_capacity_checked_at": checked_at,
-        }
-
-        logger.info(
-            "(%s/%s) %s -> all=%s men=%s women=%s diverse=%s",
-            i,
-            len(rows),
-            name,
-            offer.status_all,
-            offer.status_men,
-            offer.status_women,
-            offer.status_diverse,
-        )
-
-        if args.commit:
-            try:
-                patch_unterkunft(url, key, uid, payload)
-                updated += 1
-            except Exception as ex:
-                failed += 1
-                logger.error("Update failed for %s (%s): %s", name, uid, ex)
-        else:
-            updated += 1
-
-    logger.info("Done. updated=%s unmatched=%s failed=%s commit=%s", updated, unmatched, failed, args.commit)
+    try:
+        categories = resolve_categories([args.typ], args.category)
+    except ValueError as ex:
+        parser.error(str(ex))
+    logger.info("Categories: %s", ", ".join(f"{t} (filter {fid})" for t, fid in categories.items()))
+    if args.daemon:
+        run_daemon(args, url, key, categories)
+        return
+    try:
+        sync_categories(args, url, key, categories, scheduled=args.schedule, full_scan_min=args.full_scan_min)
+    finally:
+        write_run_report(args)
 
 
 if __name__ == "__main__":
     main()
-
-
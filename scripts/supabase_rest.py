@@ -0,0 +1,207 @@
+"""
+Shared Supabase PostgREST client for the scripts in this folder.
+
+Why:
+- Every script used to call `requests.get/patch/post` directly, paying a fresh TCP/TLS
+  handshake per request (hundreds per run for the scraper/backfill/import).
+- This module keeps one pooled keep-alive `requests.Session` per (url, key) and
+  centralizes headers, gzip and timeouts; retries, backoff and the circuit breaker come from
+  `scripts.http_resilience`.
+
+Usage:
+  from scripts.supabase_rest import get_client
+
+  client = get_client(url, key)
+  rows = client.select("unterkuenfte", {"select": "id,name", "typ": "eq.notuebernachtung"})
+  client.update("unterkuenfte", {"id": f"eq.{uid}"}, {"lat": 52.5, "lng": 13.4})
+
+Requires:
+  - requests (pip install -r requirements.txt)
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any
+
+try:
+    import requests
+    from requests.adapters import HTTPAdapter
+except ModuleNotFoundError:  # pragma: no cover
+    requests = None  # type: ignore
+    HTTPAdapter = None  # type: ignore
+
+try:
+    from scripts.http_resilience import send
+except ModuleNotFoundError:  # pragma: no cover
+    import sys
+    from pathlib import Path
+
+    repo_root = Path(__file__).resolve().parents[1]
+    if str(repo_root) not in sys.path:
+        sys.path.insert(0, str(repo_root))
+    from scripts.http_resilience import send
+
+logger = logging.getLogger("supabase_rest")
+
+DEFAULT_TIMEOUT_S = 60
+DEFAULT_POOL_MAXSIZE = 16
+
+# POST (inserts, RPCs) is only retried when it certainly was not processed (connect timeout, 429);
+# see scripts/http_resilience.py.
+_RETRY_METHODS = frozenset({"GET", "HEAD", "PATCH", "PUT", "DELETE"})
+
+
+class SupabaseRestError(RuntimeError):
+    def __init__(self, message: str, *, status_code: int | None = None, body: str | None = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+        self.body = body
+
+
+class SupabaseRest:
+    """
+    Thin PostgREST wrapper around a pooled `requests.Session`.
+
+    Filters/params are passed through as PostgREST query params, e.g. `{"id": "eq.<uuid>"}`.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        key: str,
+        *,
+        timeout_s: int = DEFAULT_TIMEOUT_S,
+        retries: int | None = None,
+        pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+    ) -> None:
+        if requests is None:
+            raise RuntimeError("Missing dependency: requests. Install requirements.txt (pip install -r requirements.txt).")
+
+        self.base_url = url.rstrip("/")
+        self.timeout_s = timeout_s
+        # None = the process-wide retry policy (scripts.http_resilience).
+        self.retries = retries
+
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_maxsize))
+
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(
+            {
+                "apikey": key,
+                "Authorization": f"Bearer {key}",
+                "Content-Type": "application/json",
+                "Accept": "application/json",
+                "Accept-Encoding": "gzip, deflate",
+                "Connection": "keep-alive",
+            }
+        )
+
+    def _endpoint(self, path: str) -> str:
+        return f"{self.base_url}/rest/v1/{path.lstrip('/')}"
+
+    def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        what: str,
+        params: dict[str, str] | None = None,
+        json: Any = None,
+        headers: dict[str, str] | None = None,
+        timeout_s: int | None = None,
+    ) -> "requests.Response":
+        endpoint = self._endpoint(path)
+        logger.debug("%s %s params=%s", method, endpoint, params)
+        resp = send(
+            method,
+            endpoint,
+            session=self.session,
+            idempotent=method in _RETRY_METHODS,
+            retries=self.retries,
+            params=params,
+            json=json,
+            headers=headers,
+            timeout=timeout_s or self.timeout_s,
+        )
+        if resp.status_code >= 400:
+            raise SupabaseRestError(f"{what} failed ({resp.status_code}): {resp.text}", status_code=resp.status_code, body=resp.text)
+        return resp
+
+    def select(self, table: str, params: dict[str, str], *, timeout_s: int | None = None) -> list[dict[str, Any]]:
+        resp = self.request("GET", table, what="Select", params=params, timeout_s=timeout_s)
+        rows = resp.json()
+        return rows if isinstance(rows, list) else []
+
+    def update(self, table: str, filters: dict[str, str], payload: dict[str, Any], *, timeout_s: int | None = None) -> None:
+        self.request(
+            "PATCH",
+            table,
+            what="Update",
+            params=filters,
+            json=payload,
+            headers={"Prefer": "return=minimal"},
+            timeout_s=timeout_s,
+        )
+
+    def insert(
+        self,
+        table: str,
+        rows: dict[str, Any] | list[dict[str, Any]],
+        *,
+        returning: bool = False,
+        timeout_s: int | None = None,
+    ) -> list[dict[str, Any]]:
+        """
+        Insert one row (dict) or many rows (list) in a single request.
+        Returns the inserted rows if `returning=True`, else an empty list.
+        """
+        resp = self.request(
+            "POST",
+            table,
+            what="Insert",
+            json=rows,
+            headers={"Prefer": "return=representation" if returning else "return=minimal"},
+            timeout_s=timeout_s,
+        )
+        if not returning:
+            return []
+        try:
+            data = resp.json()
+        except ValueError:
+            return []
+        if isinstance(data, dict):
+            return [data]
+        return data if isinstance(data, list) else []
+
+    def rpc(self, fn: str, args: dict[str, Any], *, timeout_s: int | None = None) -> Any:
+        """
+        Call a Postgres function exposed by PostgREST (`POST /rest/v1/rpc/<fn>`).
+        """
+        resp = self.request("POST", f"rpc/{fn}", what=f"RPC {fn}", json=args, timeout_s=timeout_s)
+        if not resp.content:
+            return None
+        return resp.json()
+
+    def close(self) -> None:
+        self.session.close()
+
+
+_clients: dict[tuple[str, str], SupabaseRest] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(url: str, key: str) -> SupabaseRest:
+    """
+    Return the process-wide client for (url, key), creating it on first use.
+    """
+    cache_key = (url.rstrip("/"), key)
+    with _clients_lock:
+        client = _clients.get(cache_key)
+        if client is None:
+            client = SupabaseRest(url, key)
+            _clients[cache_key] = client
+        return client
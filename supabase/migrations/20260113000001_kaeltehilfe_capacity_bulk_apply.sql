@@ -0,0 +1,78 @@
+-- Bulk-apply Kaeltehilfe capacity payloads (used by scripts/scrape_kaeltehilfe_capacity.py).
+--
+-- Problem:
+-- - The scraper PATCHed one row per HTTP request (N shelters = N round trips).
+--
+-- Input: jsonb array of objects, e.g.
+--   [{ "id": "<uuid>",
+--      "kaeltehilfe_capacity_status": "little",
+--      "kaeltehilfe_capacity_status_men": null,
+--      "kaeltehilfe_capacity_status_women": null,
+--      "kaeltehilfe_capacity_status_diverse": null,
+--      "kaeltehilfe_capacity_url": "https://kaeltehilfe-berlin.de/kaeltehilfe-angebot/<slug>",
+--      "kaeltehilfe_capacity_checked_at": "2026-01-13T04:17:00Z" }]
+--
+-- Rules:
+-- - Keys that are missing from an element leave the column untouched (explicit null clears it).
+-- - Every element is applied with its own row UPDATE, so the BEFORE UPDATE trigger
+--   `set_kaeltehilfe_capacity_updated_at` fires exactly as it did for the per-row PATCH.
+-- - A failing element does not abort the batch; it is reported as ok=false with the error.
+
+create or replace function public.apply_kaeltehilfe_capacity(updates jsonb)
+returns table (unterkunft_id uuid, ok boolean, error text)
+language plpgsql
+set search_path = public
+as $$
+declare
+  u jsonb;
+  n integer;
+begin
+  for u in select value from jsonb_array_elements(coalesce(updates, '[]'::jsonb))
+  loop
+    unterkunft_id := null;
+    begin
+      unterkunft_id := (u ->> 'id')::uuid;
+
+      update public.unterkuenfte t
+      set
+        kaeltehilfe_capacity_status = case when u ? 'kaeltehilfe_capacity_status'
+          then (u ->> 'kaeltehilfe_capacity_status')::public.kaeltehilfe_capacity_status
+          else t.kaeltehilfe_capacity_status end,
+        kaeltehilfe_capacity_status_men = case when u ? 'kaeltehilfe_capacity_status_men'
+          then (u ->> 'kaeltehilfe_capacity_status_men')::public.kaeltehilfe_capacity_status
+          else t.kaeltehilfe_capacity_status_men end,
+        kaeltehilfe_capacity_status_women = case when u ? 'kaeltehilfe_capacity_status_women'
+          then (u ->> 'kaeltehilfe_capacity_status_women')::public.kaeltehilfe_capacity_status
+          else t.kaeltehilfe_capacity_status_women end,
+        kaeltehilfe_capacity_status_diverse = case when u ? 'kaeltehilfe_capacity_status_diverse'
+          then (u ->> 'kaeltehilfe_capacity_status_diverse')::public.kaeltehilfe_capacity_status
+          else t.kaeltehilfe_capacity_status_diverse end,
+        kaeltehilfe_capacity_url = case when u ? 'kaeltehilfe_capacity_url'
+          then u ->> 'kaeltehilfe_capacity_url'
+          else t.kaeltehilfe_capacity_url end,
+        kaeltehilfe_capacity_checked_at = case when u ? 'kaeltehilfe_capacity_checked_at'
+          then coalesce((u ->> 'kaeltehilfe_capacity_checked_at')::timestamptz, now())
+          else t.kaeltehilfe_capacity_checked_at end
+      where t.id = unterkunft_id;
+
+      get diagnostics n = row_count;
+      if n = 0 then
+        ok := false;
+        error := 'unterkunft not found';
+      else
+        ok := true;
+        error := null;
+      end if;
+    exception
+      when others then
+        ok := false;
+        error := sqlerrm;
+    end;
+    return next;
+  end loop;
+end;
+$$;
+
+-- Writes are server-side only (scraper runs with service_role).
+revoke all on function public.apply_kaeltehilfe_capacity(jsonb) from public, anon, authenticated;
+grant execute on function public.apply_kaeltehilfe_capacity(jsonb) to service_role;
@@ -0,0 +1,66 @@
+-- Run-level freshness for scrapers (one row per run) instead of bumping a column on every shelter.
+--
+-- Problem:
+-- - `unterkuenfte.kaeltehilfe_capacity_checked_at` was written for EVERY shelter on EVERY scrape,
+--   creating a new tuple version per row (table bloat, autovacuum churn) and firing the
+--   capacity triggers just to record "we looked".
+--
+-- Now:
+-- - The scraper inserts one `scrape_runs` row per run and finishes it with counts/status.
+-- - Only rows whose capacity actually changed are updated on `unterkuenfte`.
+-- - "Checked at" for a source = finished_at of its latest succeeded run
+--   (view `scrape_source_freshness`). For Kaeltehilfe the source is `kaeltehilfe:<typ>`.
+-- - `unterkuenfte.kaeltehilfe_capacity_checked_at` is kept for compatibility but no longer written.
+
+create table if not exists public.scrape_runs (
+  id bigint generated always as identity primary key,
+  source text not null,
+  status text not null default 'running' check (status in ('running', 'succeeded', 'failed')),
+  started_at timestamptz not null default now(),
+  finished_at timestamptz null,
+
+  offers_count integer null,
+  matched_count integer null,
+  changed_count integer null,
+  failed_count integer null,
+  error text null
+);
+
+create index if not exists scrape_runs_source_succeeded_idx
+on public.scrape_runs (source, finished_at desc)
+where status = 'succeeded';
+
+-- Latest succeeded run per source.
+create or replace view public.scrape_source_freshness
+with (security_invoker = true)
+as
+select distinct on (r.source)
+  r.source,
+  r.id as run_id,
+  r.started_at,
+  r.finished_at as checked_at
+from public.scrape_runs r
+where r.status = 'succeeded'
+order by r.source, r.finished_at desc;
+
+comment on column public.unterkuenfte.kaeltehilfe_capacity_checked_at is
+  'Deprecated: no longer written by the scraper. Use public.scrape_source_freshness (source = kaeltehilfe:<typ>).';
+
+-- ---------------------------------------------------------------------------
+-- Permissions
+-- ---------------------------------------------------------------------------
+
+-- Public read (map shows freshness); writes via service_role only.
+alter table public.scrape_runs enable row level security;
+
+drop policy if exists "scrape_runs_public_read" on public.scrape_runs;
+create policy "scrape_runs_public_read"
+on public.scrape_runs
+for select
+using (true);
+
+grant select on public.scrape_runs to anon, authenticated;
+revoke insert, update, delete on public.scrape_runs from anon, authenticated;
+grant all on public.scrape_runs to service_role;
+
+grant select on public.scrape_source_freshness to anon, authenticated, service_role;
@@ -0,0 +1,64 @@
+-- Structured data from Kaeltehilfe offer detail pages (scripts/scrape_kaeltehilfe_capacity.py --details).
+--
+-- Why:
+-- - Listing cards only carry the traffic lights; the offer page behind `kaeltehilfe_capacity_url`
+--   also has opening hours, address, phone, number of places, Träger, audience and features.
+-- - Stored as one jsonb document next to the capacity columns; curated columns
+--   (adresse, telefon, oeffnungszeiten, ...) are never overwritten by the scraper.
+--
+-- Example:
+--   { "traeger": "SkF e.V.", "opening_hours": "01.10.25 - 30.4.26 I täglich I 18-08 Uhr",
+--     "address": "Müllerstraße 126, 13349 Berlin", "phone": "030 46 23 279",
+--     "places": 20, "places_text": "... 20 Plätze.", "audience": ["nur Frauen"],
+--     "services": ["Schlafplatz", "Essen", "Hygiene"] }
+
+alter table public.unterkuenfte
+  add column if not exists kaeltehilfe_details jsonb,
+  add column if not exists kaeltehilfe_details_updated_at timestamptz;
+
+-- Bulk apply, same contract as `apply_kaeltehilfe_capacity`:
+--   [{ "id": "<uuid>", "kaeltehilfe_details": {...} }]
+-- A failing element does not abort the batch; it is reported as ok=false with the error.
+create or replace function public.apply_kaeltehilfe_details(updates jsonb)
+returns table (unterkunft_id uuid, ok boolean, error text)
+language plpgsql
+set search_path = public
+as $$
+declare
+  u jsonb;
+  n integer;
+begin
+  for u in select value from jsonb_array_elements(coalesce(updates, '[]'::jsonb))
+  loop
+    unterkunft_id := null;
+    begin
+      unterkunft_id := (u ->> 'id')::uuid;
+
+      update public.unterkuenfte t
+      set
+        kaeltehilfe_details = u -> 'kaeltehilfe_details',
+        kaeltehilfe_details_updated_at = now()
+      where t.id = unterkunft_id
+        and t.kaeltehilfe_details is distinct from u -> 'kaeltehilfe_details';
+
+      get diagnostics n = row_count;
+      if n = 0 and not exists (select 1 from public.unterkuenfte where id = unterkunft_id) then
+        ok := false;
+        error := 'unterkunft not found';
+      else
+        ok := true;
+        error := null;
+      end if;
+    exception
+      when others then
+        ok := false;
+        error := sqlerrm;
+    end;
+    return next;
+  end loop;
+end;
+$$;
+
+-- Writes are server-side only (scraper runs with service_role).
+revoke all on function public.apply_kaeltehilfe_details(jsonb) from public, anon, authenticated;
+grant execute on function public.apply_kaeltehilfe_details(jsonb) to service_role;
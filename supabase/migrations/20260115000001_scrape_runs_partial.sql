@@ -0,0 +1,39 @@
+-- Run statuses that don't hide partial runs (follow-up to 20260113000002_scrape_runs.sql).
+--
+-- Problem:
+-- - One failed row update marked the whole run `failed`, and the freshness view only reads
+--   `succeeded` runs, so "checked at" stopped moving for the whole category.
+-- - A run whose process died stayed `running` forever.
+--
+-- Now:
+-- - Status `partial`: the run finished but some row updates failed (`failed_count`); the view
+--   counts it like a succeeded one.
+-- - The scraper writes a run row once the run has finished (succeeded, partial or failed), so no
+--   row is left `running`. Consecutive daemon cycles that change nothing move `finished_at` of
+--   the previous row instead of adding one.
+-- - Scheduled cycles (only the shelters in their intake window) are recorded under the source
+--   `kaeltehilfe:<typ>:scheduled`, so `kaeltehilfe:<typ>` in the view is always a full scan.
+
+alter table public.scrape_runs drop constraint if exists scrape_runs_status_check;
+alter table public.scrape_runs
+  add constraint scrape_runs_status_check check (status in ('running', 'succeeded', 'partial', 'failed'));
+
+drop index if exists public.scrape_runs_source_succeeded_idx;
+create index if not exists scrape_runs_source_finished_idx
+on public.scrape_runs (source, finished_at desc)
+where status in ('succeeded', 'partial');
+
+-- Latest finished run per source.
+create or replace view public.scrape_source_freshness
+with (security_invoker = true)
+as
+select distinct on (r.source)
+  r.source,
+  r.id as run_id,
+  r.started_at,
+  r.finished_at as checked_at
+from public.scrape_runs r
+where r.status in ('succeeded', 'partial')
+order by r.source, r.finished_at desc;
+
+grant select on public.scrape_source_freshness to anon, authenticated, service_role;